@@ -1,3 +1,3 @@
 __version__ = "1.0.2"
 
-from .api import built_house, build_multi_hh
+from .api import built_house, build_multi_hh, iter_multi_hh, accumulate_multi_hh
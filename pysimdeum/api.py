@@ -1,30 +1,204 @@
-from pysimdeum.core.statistics import Statistics
+import hashlib
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Iterator
+from pysimdeum.core.statistics import get_statistics
 from pysimdeum.core.house import Property, HousePattern, House
 
 
-def built_house(house_type: str = "", duration: str = '1 day', country: str = None, simulate_discharge=False, spillover=False) -> House:
+def built_house(house_type: str = "", duration: str = '1 day', country: str = None, simulate_discharge=False, spillover=False, sparse=False, seed=None,
+                dtype=np.float64, flowtypes=None, dischargetypes=None, resolution='1s') -> House:
 
     country = country or 'NL'
-    stats = Statistics(country=country)
-    prop = Property(statistics=stats)
+    stats = get_statistics(country=country)
+    prop = Property(statistics=stats, seed=seed)
     house = prop.built_house(house_type=house_type)
     house.populate_house()
     house.furnish_house()
     for user in house.users:
         user.compute_presence(statistics=stats)
-    house.simulate(duration=duration, num_patterns=1, simulate_discharge=simulate_discharge, spillover=spillover)
+    house.simulate(duration=duration, num_patterns=1, simulate_discharge=simulate_discharge, spillover=spillover, sparse=sparse,
+                   dtype=dtype, flowtypes=flowtypes, dischargetypes=dischargetypes, resolution=resolution)
 
     return house
 
 
-def build_multi_hh(household_data: dict, duration: str = '1 day', country: str = None, simulate_discharge=False, spillover=False) -> dict:
+def _house_seed(seed: int, household_id) -> np.random.SeedSequence:
+    """Derives the seed sequence of a single house from a root seed and the household id.
 
-    houses = {}
+    The seed sequence only depends on the root seed and the household id, so a house gets the same random streams no
+    matter in which order, process or chunk it is simulated.
 
-    for household_id, house_type in household_data.items():
-        # generate and simulate the hh
-        house_instance = built_house(house_type=house_type, duration=duration, country=country, simulate_discharge=simulate_discharge, spillover=spillover)
-        # store the resulting House instance in the houses dictionary
-        houses[household_id] = house_instance
+    Args:
+        seed (int): root seed of the simulation.
+        household_id: identifier of the household.
 
-    return houses
\ No newline at end of file
+    Returns:
+        np.random.SeedSequence: seed sequence of the house.
+    """
+    # 256 bit key from the full id, so different ids do not share a stream (as with a 32 bit checksum)
+    key = np.frombuffer(hashlib.sha256(str(household_id).encode()).digest(), dtype='<u4')
+    return np.random.SeedSequence([seed, *key.tolist()])
+
+
+def _built_house_task(task):
+    """Builds and simulates a single house and reduces its output (top-level function so it can be sent to a worker process)."""
+
+    household_id, house_type, seed, reducer, kwargs = task
+    house = built_house(house_type=house_type, seed=seed, **kwargs)
+    return household_id, (house if reducer is None else reducer(house))
+
+
+def _built_house_chunk(tasks: list) -> list:
+    """Builds and simulates a chunk of houses in a worker process."""
+
+    return [_built_house_task(task) for task in tasks]
+
+
+def total_flow(house: House) -> np.ndarray:
+    """Reducer that returns the total flow of a house summed over users and end-uses (time x patterns).
+
+    Args:
+        house (House): simulated house.
+
+    Returns:
+        np.ndarray: total flow of the house per time step and pattern
+    """
+    consumption = house.consumption if house.events is None else house.dense_consumption()
+    return consumption.sel(flowtypes='totalflow').sum(['user', 'enduse']).values
+
+
+@dataclass
+class SumAccumulator:
+    """Accumulator that sums the reduced outputs of houses per group (e.g., per subcatchment).
+
+    Args:
+        groups (dict, optional): household ids as keys and group ids (or lists of group ids, if a house belongs to
+            several groups) as values. Houses without group are summed under the group None. Defaults to None (all
+            houses in one group).
+    """
+
+    groups: dict = None
+    totals: dict = field(default_factory=dict)  # summed output per group
+    counts: dict = field(default_factory=dict)  # number of houses per group
+
+    def __call__(self, household_id, result) -> None:
+        groups = None if self.groups is None else self.groups.get(household_id)
+        for group in (groups if isinstance(groups, (list, tuple)) else [groups]):
+            if group in self.totals:
+                self.totals[group] += result
+            else:
+                self.totals[group] = np.array(result, copy=True)
+            self.counts[group] = self.counts.get(group, 0) + 1
+
+
+def iter_multi_hh(household_data, reducer: Callable = total_flow, duration: str = '1 day', country: str = None, simulate_discharge=False, spillover=False,
+                  sparse=False, seed: int = None, n_workers: int = 1, chunksize: int = 1, dtype=np.float64, flowtypes=None, dischargetypes=None,
+                  resolution='1s') -> Iterator:
+    """Simulates multiple houses one after the other and yields the reduced output of every house.
+
+    Only the output of the reducer is kept, the house itself is dropped once it is reduced, so memory does not grow
+    with the number of houses. In parallel runs the reducer is applied in the worker processes and only a bounded
+    number of chunks is in flight at any time.
+
+    Args:
+        household_data (dict | iterable): household ids as keys and house types as values, or (household id, house type) pairs.
+        reducer (Callable, optional): function that reduces a simulated House to the output to keep. Has to be a
+            top-level function for parallel runs. If None, the House itself is yielded; in parallel runs every House
+            (with its full consumption and discharge arrays) is then pickled and sent back to the main process.
+            Defaults to `total_flow`.
+        duration, country, simulate_discharge, spillover, sparse, seed, n_workers, chunksize, dtype, flowtypes,
+        dischargetypes, resolution: see `build_multi_hh`.
+
+    Yields:
+        tuple: household id and reduced output of the house, in the order of `household_data`.
+    """
+
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+
+    # load the statistics once, so they are shared by all houses (and inherited by forked worker processes)
+    get_statistics(country=country or 'NL')
+
+    kwargs = dict(duration=duration, country=country, simulate_discharge=simulate_discharge, spillover=spillover, sparse=sparse,
+                  dtype=dtype, flowtypes=flowtypes, dischargetypes=dischargetypes, resolution=resolution)
+
+    items = household_data.items() if isinstance(household_data, dict) else household_data
+    tasks = ((household_id, house_type, _house_seed(seed, household_id), reducer, kwargs) for household_id, house_type in items)
+
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            pending = deque()
+            while True:
+                chunk = list(islice(tasks, chunksize))
+                if chunk:
+                    pending.append(executor.submit(_built_house_chunk, chunk))
+                # keep a limited number of chunks in flight and yield results in order
+                while pending and (not chunk or len(pending) >= 2 * n_workers):
+                    yield from pending.popleft().result()
+                if not chunk:
+                    break
+    else:
+        for task in tasks:
+            yield _built_house_task(task)
+
+
+def accumulate_multi_hh(household_data, accumulator: Callable = None, reducer: Callable = total_flow, **kwargs):
+    """Simulates multiple houses and hands the reduced output of every house to an accumulator.
+
+    Args:
+        household_data (dict | iterable): household ids as keys and house types as values, or (household id, house type) pairs.
+        accumulator (Callable, optional): called with the household id and the reduced output of every house.
+            Defaults to None (a new `SumAccumulator` summing all houses).
+        reducer (Callable, optional): function that reduces a simulated House, see `iter_multi_hh`. Defaults to `total_flow`.
+        **kwargs: simulation options, see `build_multi_hh`.
+
+    Returns:
+        the accumulator
+    """
+    accumulator = SumAccumulator() if accumulator is None else accumulator
+    for household_id, result in iter_multi_hh(household_data, reducer=reducer, **kwargs):
+        accumulator(household_id, result)
+
+    return accumulator
+
+
+def build_multi_hh(household_data: dict, duration: str = '1 day', country: str = None, simulate_discharge=False, spillover=False, sparse=False,
+                   seed: int = None, n_workers: int = 1, chunksize: int = 1, dtype=np.float64, flowtypes=None, dischargetypes=None,
+                   resolution='1s', reducer: Callable = None) -> dict:
+    """Builds and simulates multiple houses.
+
+    All simulated houses are kept in memory; use `iter_multi_hh` or `accumulate_multi_hh` for large populations.
+    With `n_workers` > 1 and no reducer, every House is pickled in its worker process and sent back to the main
+    process, which can cost more than simulating it; pass a reducer (e.g. `total_flow`) if only part of the output
+    is needed.
+
+    Args:
+        household_data (dict): household ids as keys and house types as values.
+        duration (str, optional): duration of the simulation. Defaults to '1 day'.
+        country (str, optional): country of the statistics. Defaults to None ('NL').
+        simulate_discharge (bool, optional): simulate discharge. Defaults to False.
+        spillover (bool, optional): wrap events that run past the end of the simulation. Defaults to False.
+        sparse (bool, optional): record consumption as event logs, see `House.simulate`. Defaults to False.
+        seed (int, optional): root seed. Every house is simulated with its own random stream derived from the root
+            seed and its household id (see `_house_seed`), so the result does not depend on `n_workers` or `chunksize`.
+            If None, a random root seed is drawn. Defaults to None.
+        n_workers (int, optional): number of worker processes. Defaults to 1 (sequential simulation).
+        chunksize (int, optional): number of houses sent to a worker process at once. Defaults to 1.
+        dtype (optional): data type of the consumption and discharge arrays, see `House.simulate`. Defaults to np.float64.
+        flowtypes (list, optional): flow channels of the consumption to allocate, see `House.simulate`. Defaults to None (all).
+        dischargetypes (list, optional): discharge channels to allocate, see `House.simulate`. Defaults to None (all).
+        resolution (str, optional): time step of the output, see `House.simulate`. Defaults to '1s'.
+        reducer (Callable, optional): function that reduces every House in the process that simulated it, see
+            `iter_multi_hh`. Defaults to None (the House instances are returned).
+
+    Returns:
+        dict: household ids as keys and simulated House instances (or their reduced output) as values.
+    """
+
+    return dict(iter_multi_hh(household_data, reducer=reducer, duration=duration, country=country, simulate_discharge=simulate_discharge,
+                              spillover=spillover, sparse=sparse, seed=seed, n_workers=n_workers, chunksize=chunksize, dtype=dtype,
+                              flowtypes=flowtypes, dischargetypes=dischargetypes, resolution=resolution))
@@ -1,12 +1,38 @@
-import copy
 import pandas as pd
 import numpy as np
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pysimdeum.utils.probability import chooser, duration_decorator, normalize, to_timedelta
-from pysimdeum.utils.patterns import handle_spillover_consumption, handle_discharge_spillover, sample_start_time, offset_simultaneous_discharge
+from pysimdeum.utils.patterns import handle_spillover_consumption, handle_discharge_spillover, sample_start_time, sample_start_times, offset_simultaneous_discharge, StartTimeSampler, Occupancy
+from pysimdeum.utils.events import EventLog, record_consumption
 from pysimdeum.core.statistics import Statistics	
 
 
+@lru_cache(maxsize=None)
+def _uniform_usage_pdf() -> np.ndarray:
+    """Uniform usage probability per second of the day as read-only numpy array, see `EndUse.usage_probability`."""
+
+    pdf = EndUse.usage_probability().values.copy()
+    pdf.flags.writeable = False
+    return pdf
+
+
+_daily_usage_pdfs = {}  # ... id of the daily pattern of the statistics: (daily pattern, read-only pdf)
+
+
+def _daily_usage_pdf(daily_pattern: pd.Series) -> np.ndarray:
+    """Daily usage pattern of the statistics as read-only numpy array, cached per pattern, see `EndUse.usage_pdf`.
+
+    The statistics are shared by all houses, so the pdf is a copy that can not be changed instead of a view into them.
+    """
+    cached = _daily_usage_pdfs.get(id(daily_pattern))
+    if cached is None or cached[0] is not daily_pattern:
+        pdf = np.array(daily_pattern.values, copy=True)
+        pdf.flags.writeable = False
+        cached = _daily_usage_pdfs[id(daily_pattern)] = (daily_pattern, pdf)
+    return cached[1]
+
+
 #TODO: Specific EndUse __post_init__ calls can be replaced by directly using the class name instead of setting the name attributes
 
 @dataclass
@@ -15,6 +41,8 @@ class EndUse:
     
     statistics: Statistics = field(repr=False)  # ... statistic object associated with end-use
     name: str = "EndUse"  # ... name of the end-use
+    rng: np.random.Generator = field(default_factory=np.random.default_rng, repr=False)  # ... random number generator of the end-use
+    _samplers: dict = field(default_factory=dict, init=False, repr=False)  # ... start-time samplers per (group of) users
     cold_water_temp = 10
     hot_water_temp = 60
     discharge_events = []
@@ -63,6 +91,39 @@ class EndUse:
 
         return prob
 
+    def usage_pdf(self) -> np.ndarray:
+        """Usage probability of the end-use per second of the day as read-only numpy array.
+
+        End-uses with a daily usage pattern (washing machine, kitchen tap, dishwasher) overload this function.
+        """
+        return _uniform_usage_pdf()
+
+    def start_time_sampler(self, users: list, household: bool = False) -> StartTimeSampler:
+        """Start-time sampler of the joint probability of the presence of the users and the usage of the end-use.
+
+        The sampler is computed once per (group of) users and shared by all patterns and days. It is computed again if
+        the presence of one of the users has changed (e.g., after `User.compute_presence`).
+
+        Args:
+            users (list): users whose presence is summed for the joint probability.
+            household (bool, optional): normalize the summed presence, as for end-uses shared by the household. Defaults to False.
+
+        Returns:
+            StartTimeSampler: sampler of the start times
+        """
+        presences = tuple(user.presence for user in users)
+        key = (household,) + tuple(map(id, presences))
+
+        cached = self._samplers.get(key)
+        if cached is None or any(a is not b for a, b in zip(cached[0], presences)):
+            prob_user = sum(presence.values for presence in presences)
+            if household:
+                prob_user = normalize(prob_user)
+            cached = (presences, StartTimeSampler(normalize(prob_user * self.usage_pdf())))
+            self._samplers[key] = cached
+
+        return cached[1]
+
     def fct_frequency(self):
         """Placeholder for specific frequency probability function defined in specific EndUse"""
 
@@ -92,6 +153,105 @@ class EndUse:
 
         return duration, intensity, temperature
 
+    def draw_events(self, users=None, num_patterns=1, total_days=1):
+        """Placeholder for the batched draw of all events defined in specific EndUse.
+
+        Returns:
+            events (dict): numpy arrays 'pattern', 'day', 'user', 'duration', 'intensity' and 'temperature' with one
+                entry per event.
+            probabilities (dict): joint probability distribution of the start times per user index.
+        """
+
+        raise NotImplementedError('Batched event draw is not implemented yet!')
+
+    @staticmethod
+    def _expand_frequencies(freq, j, duration=0, intensity=0.0, temperature=0.0):
+        """Turns an array (patterns x days) of event counts of user `j` into an event table with one entry per event."""
+
+        freq = np.asarray(freq, dtype=int)
+        pattern, day = np.meshgrid(np.arange(freq.shape[0]), np.arange(freq.shape[1]), indexing='ij')
+        counts = freq.ravel()
+        n = counts.sum()
+
+        return {'pattern': np.repeat(pattern.ravel(), counts),
+                'day': np.repeat(day.ravel(), counts),
+                'user': np.full(n, j),
+                'duration': np.broadcast_to(duration, n).astype(int),
+                'intensity': np.broadcast_to(intensity, n).astype(float),
+                'temperature': np.broadcast_to(temperature, n).astype(float)}
+
+    @staticmethod
+    def _concat_events(tables):
+        """Concatenates event tables of several users."""
+
+        return {key: np.concatenate([table[key] for table in tables]) for key in tables[0]}
+
+    def _subtype_duration_intensity_temperature(self, subtypes, rounding=np.round):
+        """Vectorised counterpart of `fct_duration_intensity_temperature` for end-uses with subtypes."""
+
+        duration = np.zeros(len(subtypes), dtype=int)
+        intensity = np.zeros(len(subtypes))
+        temperature = np.zeros(len(subtypes))
+
+        for subtype in np.unique(subtypes):
+            selection = subtypes == subtype
+            size = np.count_nonzero(selection)
+            d_stats = self.statistics['subtype'][subtype]['duration']
+            i_stats = self.statistics['subtype'][subtype]['intensity']
+
+            dist = getattr(self.rng, d_stats['distribution'].lower())
+            mean = np.log(pd.Timedelta(d_stats['average']).total_seconds()) - 0.5
+            duration[selection] = rounding(dist(mean=mean, size=size))
+
+            dist = getattr(self.rng, i_stats['distribution'].lower())
+            intensity[selection] = dist(low=i_stats['low'], high=i_stats['high'], size=size)
+            temperature[selection] = self.statistics['subtype'][subtype]['temperature']
+
+        return duration, intensity, temperature
+
+    def record_event(self, consumption, start, end, j, ind_enduse, pattern_num, day_num, total_days, intensity, temperature_fraction, spillover=False):
+        """Writes a single event of the end-use into the consumption."""
+
+        return record_consumption(consumption, start, end, j, ind_enduse, pattern_num, intensity, temperature_fraction)
+
+    def simulate_batch(self, consumption, users=None, ind_enduse=None, num_patterns=1, total_days=1, spillover=False):
+        """Simulates all patterns and days of the end-use in a single pass.
+
+        Instead of calling `simulate` for every pattern and day, frequencies, durations, intensities and start times
+        of all events are drawn as numpy arrays (see `draw_events` and `sample_start_times`). Events of constant
+        intensity are added to an `EventLog` in bulk. Only the consumption is simulated, discharge requires the
+        sequential `simulate`.
+
+        Args:
+            consumption (numpy.ndarray | EventLog): consumption of the house.
+            users (list): users of the house.
+            ind_enduse (int): index of the end-use in the consumption.
+            num_patterns (int, optional): number of patterns. Defaults to 1.
+            total_days (int, optional): number of simulated days. Defaults to 1.
+            spillover (bool, optional): wrap events that run past the end of the simulation. Defaults to False.
+
+        Returns:
+            numpy.ndarray | EventLog: the updated consumption.
+        """
+
+        events, probabilities = self.draw_events(users=users, num_patterns=num_patterns, total_days=total_days)
+        if len(events['duration']) == 0:
+            return consumption
+
+        group = events['pattern'] * total_days + events['day']
+        start, end = sample_start_times(probabilities, events['user'], group, events['day'], events['duration'], rng=self.rng)
+        temperature_fraction = (events['temperature'] - self.cold_water_temp) / (self.hot_water_temp - self.cold_water_temp)
+
+        if isinstance(consumption, EventLog) and type(self).record_event is EndUse.record_event:
+            consumption.record_many(start, end, events['user'], ind_enduse, events['pattern'], events['intensity'], temperature_fraction)
+            return consumption
+
+        for i in range(len(start)):
+            consumption = self.record_event(consumption, start[i], end[i], events['user'][i], ind_enduse, events['pattern'][i], events['day'][i],
+                                            total_days, events['intensity'][i], temperature_fraction[i], spillover=spillover)
+
+        return consumption
+
 @dataclass
 class Bathtub(EndUse):
     """Class for Bathtub end-use."""
@@ -108,21 +268,22 @@ class Bathtub(EndUse):
         self.wastewater_type = "greywater"
         #self.discharge_events = []
 
-    def fct_frequency(self, age=None):
+    def fct_frequency(self, age=None, size=None):
         """Random function computing the frequency of use for the Bathtub end-use class.
 
         Args:
             age: age of the user in years.
+            size: shape of the drawn frequencies, a single frequency if None.
 
         Returns:
             distribution function from `numpy.random` to compute frequency of use.
 
         """
         f_stats = self.statistics['frequency']
-        distribution = getattr(np.random, f_stats['distribution'].lower())
+        distribution = getattr(self.rng, f_stats['distribution'].lower())
         average = f_stats['average'][age]
 
-        return distribution(average)
+        return distribution(average, size=size)
 
     def fct_duration(self):
         """Function to compute the duration of Bathtub end-use.
@@ -161,13 +322,13 @@ class Bathtub(EndUse):
 
         # Sample a usage_delay from a uniform distribution
         usage_delay_stats = self.statistics['usage_delay']
-        usage_delay = np.random.uniform(usage_delay_stats['low'], usage_delay_stats['high']) * 60
+        usage_delay = self.rng.uniform(usage_delay_stats['low'], usage_delay_stats['high']) * 60
 
         start = int(end + usage_delay)
 
         # Sample a value from the discharge_intensity distribution
         discharge_intensity_stats = self.statistics['discharge_intensity']
-        dist = getattr(np.random, discharge_intensity_stats['distribution'].lower())
+        dist = getattr(self.rng, discharge_intensity_stats['distribution'].lower())
         low = discharge_intensity_stats['low']
         high = discharge_intensity_stats['high']
         discharge_flow_rate = dist(low=low, high=high)
@@ -190,28 +351,37 @@ class Bathtub(EndUse):
         return discharge
 
 
-    def simulate(self, consumption, discharge=None, users=None, ind_enduse=None, pattern_num=1, day_num=0, total_days=1, simulate_discharge=False, spillover=False):
+    def draw_events(self, users=None, num_patterns=1, total_days=1):
 
-        prob_usage = self.usage_probability().values
+        size = (num_patterns, total_days)
 
-        previous_events = []
+        tables = []
+        probabilities = {}
+        for j, user in enumerate(users):
+            freq = self.fct_frequency(age=user.age, size=size)
+            tables.append(self._expand_frequencies(freq, j, self.fct_duration(), self.fct_intensity(), self.temperature()))
+            probabilities[j] = self.start_time_sampler([user])
+
+        return self._concat_events(tables), probabilities
+
+    def simulate(self, consumption, discharge=None, users=None, ind_enduse=None, pattern_num=1, day_num=0, total_days=1, simulate_discharge=False, spillover=False):
+
+        previous_events = Occupancy()
 
         for j, user in enumerate(users):
             freq = self.fct_frequency(age=user.age)
-            prob_user = user.presence.values
+            sampler = self.start_time_sampler([user])
 
             for i in range(freq):
 
                 duration, intensity, temperature = self.fct_duration_intensity_temperature()
                 temperature = self.statistics['temperature']
-                prob_joint = normalize(prob_user * prob_usage)
 
-                start, end = sample_start_time(prob_joint, day_num, duration, previous_events)
-                previous_events.append((start, end))
+                start, end = sample_start_time(sampler, day_num, duration, previous_events, rng=self.rng)
+                previous_events.add(start, end)
 
-                consumption[start:end, j, ind_enduse, pattern_num, 0] = intensity
                 temperature_fraction = (temperature - self.cold_water_temp)/(self.hot_water_temp - self.cold_water_temp)
-                consumption[start:end, j, ind_enduse, pattern_num, 1] = intensity*temperature_fraction
+                consumption = record_consumption(consumption, start, end, j, ind_enduse, pattern_num, intensity, temperature_fraction)
 
                 if simulate_discharge:
                     if discharge is None:
@@ -230,25 +400,25 @@ class BathroomTap(EndUse):
         self.wastewater_type = "greywater"
         #self.discharge_events = []
 
-    def fct_frequency(self):
+    def fct_frequency(self, size=None):
 
         f_stats = self.statistics['frequency']
-        distribution = getattr(np.random, f_stats['distribution'].lower())
+        distribution = getattr(self.rng, f_stats['distribution'].lower())
         average = f_stats['average']
-        return distribution(average)
+        return distribution(average, size=size)
 
     def fct_duration_intensity_temperature(self):
 
-        self.subtype = chooser(self.statistics['subtype'], 'penetration')
+        self.subtype = chooser(self.statistics['subtype'], 'penetration', rng=self.rng)
 
         d_stats = self.statistics['subtype'][self.subtype]['duration']
         i_stats = self.statistics['subtype'][self.subtype]['intensity']
 
-        dist = duration_decorator(getattr(np.random, d_stats['distribution'].lower()))
+        dist = duration_decorator(getattr(self.rng, d_stats['distribution'].lower()))
         mean = to_timedelta(np.log(to_timedelta(d_stats['average']).total_seconds()) - 0.5)
         duration = dist(mean=mean).total_seconds()
 
-        dist = getattr(np.random, i_stats['distribution'].lower())
+        dist = getattr(self.rng, i_stats['distribution'].lower())
         low = i_stats['low']
         high = i_stats['high']
 
@@ -262,7 +432,7 @@ class BathroomTap(EndUse):
 
         # Sample a value from the discharge_intensity distribution
         discharge_intensity_stats = self.statistics['subtype'][self.subtype]['discharge_intensity']
-        dist = getattr(np.random, discharge_intensity_stats['distribution'].lower())
+        dist = getattr(self.rng, discharge_intensity_stats['distribution'].lower())
         low = discharge_intensity_stats['low']
         high = discharge_intensity_stats['high']
         discharge_flow_rate = dist(low=low, high=high)
@@ -291,27 +461,37 @@ class BathroomTap(EndUse):
         return discharge
 
 
+    def draw_events(self, users=None, num_patterns=1, total_days=1):
+
+        size = (num_patterns, total_days)
+
+        tables = []
+        probabilities = {}
+        for j, user in enumerate(users):
+            table = self._expand_frequencies(self.fct_frequency(size=size), j)
+            subtypes = chooser(self.statistics['subtype'], 'penetration', size=len(table['user']), rng=self.rng)
+            table['duration'], table['intensity'], table['temperature'] = self._subtype_duration_intensity_temperature(subtypes)
+            tables.append(table)
+            probabilities[j] = self.start_time_sampler([user])
+
+        return self._concat_events(tables), probabilities
+
     def simulate(self, consumption, discharge, users=None, ind_enduse=None, pattern_num=1, day_num=0, total_days=1, simulate_discharge=False, spillover=False):
-        prob_usage = self.usage_probability().values
-        
-        previous_events = []
+        previous_events = Occupancy()
 
         for j, user in enumerate(users):
             freq = self.fct_frequency()
-            prob_user = user.presence.values
+            sampler = self.start_time_sampler([user])
 
             for i in range(freq):
 
                 duration, intensity, temperature = self.fct_duration_intensity_temperature()
 
-                prob_joint = normalize(prob_user * prob_usage)
-
-                start, end = sample_start_time(prob_joint, day_num, duration, previous_events)
-                previous_events.append((start, end))
+                start, end = sample_start_time(sampler, day_num, duration, previous_events, rng=self.rng)
+                previous_events.add(start, end)
 
-                consumption[start:end, j, ind_enduse, pattern_num, 0] = intensity
                 temperature_fraction = (temperature - self.cold_water_temp)/(self.hot_water_temp - self.cold_water_temp)
-                consumption[start:end, j, ind_enduse, pattern_num, 1] = intensity*temperature_fraction
+                consumption = record_consumption(consumption, start, end, j, ind_enduse, pattern_num, intensity, temperature_fraction)
 
                 if simulate_discharge:
                     if discharge is None:
@@ -329,14 +509,14 @@ class Dishwasher(EndUse):
         self.wastewater_type = "blackwater"
         #self.discharge_events = []
 
-    def fct_frequency(self, numusers=None):
+    def fct_frequency(self, numusers=None, size=None):
 
         f_stats = self.statistics['frequency']
-        distribution = getattr(np.random, f_stats['distribution'].lower())
+        distribution = getattr(self.rng, f_stats['distribution'].lower())
 
         df = pd.Series(f_stats['average'])
         average = df[str(numusers)]  * numusers
-        return distribution(average)
+        return distribution(average, size=size)
 
     def fct_duration_pattern(self, start=None):
         pattern = self.statistics['enduse_pattern']
@@ -366,7 +546,7 @@ class Dishwasher(EndUse):
         if isinstance(discharge_temperature, (int, float)):
             discharge_temperatures = [discharge_temperature] * len(cycle_times)
         elif isinstance(discharge_temperature, dict):
-            dist = getattr(np.random, discharge_temperature['distribution'].lower())
+            dist = getattr(self.rng, discharge_temperature['distribution'].lower())
             low = discharge_temperature['low']
             high = discharge_temperature['high']
             discharge_temperatures = dist(low=low, high=high, size=len(cycle_times)).tolist()
@@ -383,44 +563,54 @@ class Dishwasher(EndUse):
 
         return discharge
 
-    def simulate(self, consumption, discharge=None, users=None, ind_enduse=None, pattern_num=1, day_num=0, total_days=1, simulate_discharge=False, spillover=False):
+    def usage_pdf(self) -> np.ndarray:
+        return _daily_usage_pdf(self.statistics['daily_pattern'])
 
-        prob_usage = copy.deepcopy(self.statistics['daily_pattern'].values)
-        freq = self.fct_frequency(numusers=len(users))
+    def draw_events(self, users=None, num_patterns=1, total_days=1):
 
-        for j, user in enumerate(users):
-            if j == 0:
-                prob_user = copy.deepcopy(user.presence)
-            else:
-                prob_user += user.presence
+        j = len(users)
+
+        freq = self.fct_frequency(numusers=len(users), size=(num_patterns, total_days))
+        events = self._expand_frequencies(freq, j, len(self.fct_duration_pattern()), temperature=self.cold_water_temp)
+
+        return events, {j: self.start_time_sampler(users, household=True)}
+
+    def record_event(self, consumption, start, end, j, ind_enduse, pattern_num, day_num, total_days, intensity, temperature_fraction, spillover=False):
+
+        pattern = self.fct_duration_pattern().values
+
+        end_of_day = 24 * 60 * 60 * (day_num + 1)
+        if end > end_of_day and spillover:
+            consumption = handle_spillover_consumption(consumption, pattern, start, end, j, ind_enduse, pattern_num, end_of_day, self.name, total_days)
+        elif ((day_num + 1) == total_days) and (end > end_of_day):
+            difference = end_of_day - start
+            consumption = record_consumption(consumption, start, end_of_day, j, ind_enduse, pattern_num, pattern[:difference])
+        else:
+            difference = end - start
+            consumption = record_consumption(consumption, start, end, j, ind_enduse, pattern_num, pattern[:difference])
+
+        return consumption
+
+    def simulate(self, consumption, discharge=None, users=None, ind_enduse=None, pattern_num=1, day_num=0, total_days=1, simulate_discharge=False, spillover=False):
 
-        prob_user = normalize(prob_user.values)
+        freq = self.fct_frequency(numusers=len(users))
         j = len(users)
 
-        prob_joint = normalize(prob_user * prob_usage)
+        sampler = self.start_time_sampler(users, household=True)
 
         pattern = self.fct_duration_pattern().values
         duration = len(pattern)
 
-        previous_events = []
+        previous_events = Occupancy()
 
         for i in range(freq):
-            start, end = sample_start_time(prob_joint, day_num, duration, previous_events)
+            start, end = sample_start_time(sampler, day_num, duration, previous_events, rng=self.rng)
 
             # add event times to list of previous events
-            previous_events.append((start, end))
+            previous_events.add(start, end)
 
             end_of_day = 24 * 60 * 60 * (day_num + 1)
-            if end > end_of_day and spillover:
-                consumption = handle_spillover_consumption(consumption, pattern, start, end, j, ind_enduse, pattern_num, end_of_day, self.name, total_days)
-            elif ((day_num + 1) == total_days) and (end > end_of_day):
-                difference = end_of_day - start
-                consumption[start:end_of_day, j, ind_enduse, pattern_num, 0] = pattern[:difference]
-                consumption[start:end_of_day, j, ind_enduse, pattern_num, 1] = 0
-            else:
-                difference = end - start
-                consumption[start:end, j, ind_enduse, pattern_num, 0] = pattern[:difference]
-                consumption[start:end, j, ind_enduse, pattern_num, 1] = 0
+            consumption = self.record_event(consumption, start, end, j, ind_enduse, pattern_num, day_num, total_days, intensity=None, temperature_fraction=0, spillover=spillover)
 
             if simulate_discharge:
                 if discharge is None:
@@ -438,10 +628,10 @@ class KitchenTap(EndUse):
         self.wastewater_type = "blackwater"
         #self.discharge_events = []
 
-    def fct_frequency(self, numusers=None):
+    def fct_frequency(self, numusers=None, size=None):
 
         f_stats = self.statistics['frequency']
-        distribution = getattr(np.random, f_stats['distribution'].lower())
+        distribution = getattr(self.rng, f_stats['distribution'].lower())
 
         df = pd.Series(f_stats['average'])
         average = df[str(numusers)]
@@ -459,21 +649,21 @@ class KitchenTap(EndUse):
         p = average / sigma ** 2
         r = p * average / (1 - p)
 
-        return distribution(r, p)
+        return distribution(r, p, size=size)
 
     def fct_duration_intensity_temperature(self):
 
-        self.subtype = chooser(self.statistics['subtype'], 'penetration')
+        self.subtype = chooser(self.statistics['subtype'], 'penetration', rng=self.rng)
 
         d_stats = self.statistics['subtype'][self.subtype]['duration']
         i_stats = self.statistics['subtype'][self.subtype]['intensity']
 
-        dist = getattr(np.random, d_stats['distribution'].lower())
+        dist = getattr(self.rng, d_stats['distribution'].lower())
         mean = np.log(pd.Timedelta(d_stats['average']).total_seconds()) - 0.5
 
         duration = int(pd.Timedelta(seconds=dist(mean=mean)).total_seconds())
 
-        dist = getattr(np.random, i_stats['distribution'].lower())
+        dist = getattr(self.rng, i_stats['distribution'].lower())
         low = i_stats['low']
         high = i_stats['high']
 
@@ -488,7 +678,7 @@ class KitchenTap(EndUse):
 
         # Sample a value from the discharge_intensity distribution
         discharge_intensity_stats = self.statistics['subtype'][self.subtype]['discharge_intensity']
-        dist = getattr(np.random, discharge_intensity_stats['distribution'].lower())
+        dist = getattr(self.rng, discharge_intensity_stats['distribution'].lower())
         low = discharge_intensity_stats['low']
         high = discharge_intensity_stats['high']
         discharge_flow_rate = 0
@@ -523,23 +713,28 @@ class KitchenTap(EndUse):
 
         return discharge
 
-    def simulate(self, consumption, discharge=None, users=None, ind_enduse=None, pattern_num=1, day_num=0, total_days=1, simulate_discharge=False, spillover=False):
+    def usage_pdf(self) -> np.ndarray:
+        return _daily_usage_pdf(self.statistics['daily_pattern'])
 
-        prob_usage = copy.deepcopy(self.statistics['daily_pattern'].values)
+    def draw_events(self, users=None, num_patterns=1, total_days=1):
 
-        for j, user in enumerate(users):
-            if j == 0:  # ToDo: Add function that computes usage probability for all users
-                prob_user = copy.deepcopy(user.presence)
-            else:
-                prob_user += user.presence
+        j = len(users)
+
+        events = self._expand_frequencies(self.fct_frequency(numusers=len(users), size=(num_patterns, total_days)), j)
+        subtypes = chooser(self.statistics['subtype'], 'penetration', size=len(events['user']), rng=self.rng)
+        events['duration'], events['intensity'], events['temperature'] = self._subtype_duration_intensity_temperature(subtypes, rounding=np.trunc)
 
-        prob_user = normalize(prob_user).values
+        return events, {j: self.start_time_sampler(users, household=True)}
+
+    def simulate(self, consumption, discharge=None, users=None, ind_enduse=None, pattern_num=1, day_num=0, total_days=1, simulate_discharge=False, spillover=False):
+
+        sampler = self.start_time_sampler(users, household=True)
 
         j = len(users)
 
         freq = self.fct_frequency(numusers=len(users))
 
-        previous_events = []
+        previous_events = Occupancy()
 
         for i in range(freq):
 
@@ -548,14 +743,11 @@ class KitchenTap(EndUse):
             # assign usage type (based on subtype)
             usage = self.subtype
             
-            prob_joint = normalize(prob_user * prob_usage)  # ToDo: Check if joint probability can be computed outside of for loop for all functions
-            
-            start, end = sample_start_time(prob_joint, day_num, duration, previous_events)
-            previous_events.append((start, end))
+            start, end = sample_start_time(sampler, day_num, duration, previous_events, rng=self.rng)
+            previous_events.add(start, end)
 
-            consumption[start:end, j, ind_enduse, pattern_num, 0] = intensity
             temperature_fraction = (temperature - self.cold_water_temp)/(self.hot_water_temp - self.cold_water_temp)
-            consumption[start:end, j, ind_enduse, pattern_num, 1] = intensity*temperature_fraction
+            consumption = record_consumption(consumption, start, end, j, ind_enduse, pattern_num, intensity, temperature_fraction)
 
             if simulate_discharge:
                 if discharge is None:
@@ -570,26 +762,26 @@ class OutsideTap(EndUse):
     def __post_init__(self):
         self.name = "OutsideTap"
 
-    def fct_frequency(self):
+    def fct_frequency(self, size=None):
 
         f_stats = self.statistics['frequency']
-        distribution = getattr(np.random, f_stats['distribution'].lower())
+        distribution = getattr(self.rng, f_stats['distribution'].lower())
         average = f_stats['average']
-        return distribution(average)
+        return distribution(average, size=size)
 
     def fct_duration_intensity_temperature(self):
 
-        subtype = chooser(self.statistics['subtype'], 'penetration')
+        subtype = chooser(self.statistics['subtype'], 'penetration', rng=self.rng)
 
         d_stats = self.statistics['subtype'][subtype]['duration']
         i_stats = self.statistics['subtype'][subtype]['intensity']
 
-        dist = getattr(np.random, d_stats['distribution'].lower())
+        dist = getattr(self.rng, d_stats['distribution'].lower())
         mean = np.log(pd.Timedelta(d_stats['average']).total_seconds()) - 0.5
 
         duration = int(pd.Timedelta(seconds=dist(mean=mean)).total_seconds())
 
-        dist = getattr(np.random, i_stats['distribution'].lower())
+        dist = getattr(self.rng, i_stats['distribution'].lower())
         low = i_stats['low']
         high = i_stats['high']
 
@@ -598,36 +790,38 @@ class OutsideTap(EndUse):
 
         return duration, intensity, temperature
 
-    def simulate(self, consumption, discharge=None, users=None, ind_enduse=None, pattern_num=1, day_num=0, total_days=1, simulate_discharge=False, spillover=False):
+    def draw_events(self, users=None, num_patterns=1, total_days=1):
 
-        prob_usage = self.usage_probability().values
+        j = len(users)
+
+        freq = sum(self.fct_frequency(size=(num_patterns, total_days)) for user in users)
+        events = self._expand_frequencies(freq, j)
+        subtypes = chooser(self.statistics['subtype'], 'penetration', size=len(events['user']), rng=self.rng)
+        events['duration'], events['intensity'], events['temperature'] = self._subtype_duration_intensity_temperature(subtypes, rounding=np.trunc)
+
+        return events, {j: self.start_time_sampler(users, household=True)}
+
+    def simulate(self, consumption, discharge=None, users=None, ind_enduse=None, pattern_num=1, day_num=0, total_days=1, simulate_discharge=False, spillover=False):
 
         freq = 0
-        for j, user in enumerate(users):
-            if j == 0:
-                prob_user = copy.deepcopy(user.presence)
-            else:
-                prob_user += user.presence
+        for user in users:
             freq += self.fct_frequency()
 
-        prob_user = normalize(prob_user).values
+        sampler = self.start_time_sampler(users, household=True)
 
         j = len(users)
 
-        previous_events = []
+        previous_events = Occupancy()
 
         for i in range(freq):
 
             duration, intensity, temperature = self.fct_duration_intensity_temperature()
 
-            prob_joint = normalize(prob_user * prob_usage)
-            
-            start, end = sample_start_time(prob_joint, day_num, duration, previous_events)
-            previous_events.append((start, end))
+            start, end = sample_start_time(sampler, day_num, duration, previous_events, rng=self.rng)
+            previous_events.add(start, end)
 
-            consumption[start:end, j, ind_enduse, pattern_num, 0] = intensity
             temperature_fraction = (temperature - self.cold_water_temp)/(self.hot_water_temp - self.cold_water_temp)
-            consumption[start:end, j, ind_enduse, pattern_num, 1] = intensity*temperature_fraction
+            consumption = record_consumption(consumption, start, end, j, ind_enduse, pattern_num, intensity, temperature_fraction)
 
         return consumption, (discharge if simulate_discharge else None)
 
@@ -640,19 +834,19 @@ class Shower(EndUse):
         self.wastewater_type = "greywater"
         #self.discharge_events = []
 
-    def fct_frequency(self, age=None):
+    def fct_frequency(self, age=None, size=None):
 
         f_stats = self.statistics['frequency']
-        distribution = getattr(np.random, f_stats['distribution'].lower())
+        distribution = getattr(self.rng, f_stats['distribution'].lower())
         n = f_stats['n']
         p = f_stats['p'][age]
 
-        return distribution(n, p)
+        return distribution(n, p, size=size)
 
     def fct_duration_intensity_temperature(self, age=None):
 
         d_stats = self.statistics['duration']
-        distribution = getattr(np.random, d_stats['distribution'].lower())
+        distribution = getattr(self.rng, d_stats['distribution'].lower())
         df = to_timedelta(d_stats['df'][age])
 
         df = int(df.total_seconds() / 60)
@@ -695,26 +889,43 @@ class Shower(EndUse):
 
         return discharge
 
-    def simulate(self, consumption, discharge=None, users=None, ind_enduse=None, pattern_num=1, day_num=0, total_days=1, simulate_discharge=False, spillover=False):
+    def draw_events(self, users=None, num_patterns=1, total_days=1):
+
+        size = (num_patterns, total_days)
+
+        tables = []
+        probabilities = {}
+        for j, user in enumerate(users):
+            table = self._expand_frequencies(self.fct_frequency(age=user.age, size=size), j,
+                                             intensity=self.statistics['subtype'][self.name]['intensity'],
+                                             temperature=self.statistics['temperature'])
+
+            d_stats = self.statistics['duration']
+            distribution = getattr(self.rng, d_stats['distribution'].lower())
+            df = int(to_timedelta(d_stats['df'][user.age]).total_seconds() / 60)
+            table['duration'] = np.round(distribution(df, size=len(table['user']))).astype(int) * 60
 
-        prob_usage = self.usage_probability().values
+            tables.append(table)
+            probabilities[j] = self.start_time_sampler([user])
 
-        previous_events = []
+        return self._concat_events(tables), probabilities
+
+    def simulate(self, consumption, discharge=None, users=None, ind_enduse=None, pattern_num=1, day_num=0, total_days=1, simulate_discharge=False, spillover=False):
+
+        previous_events = Occupancy()
 
         for j, user in enumerate(users):
             freq = self.fct_frequency(age=user.age)
-            prob_user = user.presence.values
+            sampler = self.start_time_sampler([user])
 
             for i in range(freq):
                 duration, intensity, temperature = self.fct_duration_intensity_temperature(age=user.age)
 
-                prob_joint = normalize(prob_user * prob_usage)
-                start, end = sample_start_time(prob_joint, day_num, duration, previous_events)
-                previous_events.append((start, end))
+                start, end = sample_start_time(sampler, day_num, duration, previous_events, rng=self.rng)
+                previous_events.add(start, end)
 
-                consumption[start:end, j, ind_enduse, pattern_num, 0] = intensity
                 temperature_fraction = (temperature - self.cold_water_temp)/(self.hot_water_temp - self.cold_water_temp)
-                consumption[start:end, j, ind_enduse, pattern_num, 1] = intensity*temperature_fraction
+                consumption = record_consumption(consumption, start, end, j, ind_enduse, pattern_num, intensity, temperature_fraction)
 
                 if simulate_discharge:
                     if discharge is None:
@@ -745,14 +956,14 @@ class WashingMachine(EndUse):
         self.wastewater_type = "blackwater"
         #self.discharge_events = []
 
-    def fct_frequency(self, numusers=None):
+    def fct_frequency(self, numusers=None, size=None):
 
         f_stats = self.statistics['frequency']
-        distribution = getattr(np.random, f_stats['distribution'].lower())
+        distribution = getattr(self.rng, f_stats['distribution'].lower())
 
         df = pd.Series(f_stats['average'])
         average = df[str(numusers)] * numusers
-        return distribution(average)
+        return distribution(average, size=size)
 
     def fct_duration_pattern(self, start=None):
         pattern = self.statistics['enduse_pattern']
@@ -783,7 +994,7 @@ class WashingMachine(EndUse):
         if isinstance(discharge_temperature, (int, float)):
             discharge_temperatures = [discharge_temperature] * len(cycle_times)
         elif isinstance(discharge_temperature, dict):
-            dist = getattr(np.random, discharge_temperature['distribution'].lower())
+            dist = getattr(self.rng, discharge_temperature['distribution'].lower())
             low = discharge_temperature['low']
             high = discharge_temperature['high']
             discharge_temperatures = dist(low=low, high=high, size=len(cycle_times)).tolist()
@@ -800,46 +1011,54 @@ class WashingMachine(EndUse):
 
         return discharge
 
-    def simulate(self, consumption, discharge=None, users=None, ind_enduse=None, pattern_num=1, day_num=0, total_days=1, simulate_discharge=False, spillover=False):
+    def usage_pdf(self) -> np.ndarray:
+        return _daily_usage_pdf(self.statistics['daily_pattern'])
 
-        prob_usage = copy.deepcopy(self.statistics['daily_pattern'].values)
+    def draw_events(self, users=None, num_patterns=1, total_days=1):
 
-        # for j, user in enumerate(users):
-        freq = self.fct_frequency(numusers=len(users))
+        j = len(users)
 
-        for j, user in enumerate(users):
-            if j == 0:
-                prob_user = copy.deepcopy(user.presence)
-            else:
-                prob_user += user.presence
+        freq = self.fct_frequency(numusers=len(users), size=(num_patterns, total_days))
+        events = self._expand_frequencies(freq, j, len(self.fct_duration_pattern()), temperature=self.cold_water_temp)
+
+        return events, {j: self.start_time_sampler(users, household=True)}
 
-        prob_user = normalize(prob_user).values
+    def record_event(self, consumption, start, end, j, ind_enduse, pattern_num, day_num, total_days, intensity, temperature_fraction, spillover=False):
+
+        pattern = self.fct_duration_pattern().values
+
+        end_of_day = 24 * 60 * 60 * (day_num + 1)
+        if end > end_of_day and spillover:
+            consumption = handle_spillover_consumption(consumption, pattern, start, end, j, ind_enduse, pattern_num, end_of_day, "WashingMachine", total_days)
+        elif ((day_num + 1) == total_days) and (end > end_of_day):
+            difference = end_of_day - start
+            consumption = record_consumption(consumption, start, end_of_day, j, ind_enduse, pattern_num, pattern[:difference])
+        else:
+            difference = end - start
+            consumption = record_consumption(consumption, start, end, j, ind_enduse, pattern_num, pattern[:difference])
+
+        return consumption
+
+    def simulate(self, consumption, discharge=None, users=None, ind_enduse=None, pattern_num=1, day_num=0, total_days=1, simulate_discharge=False, spillover=False):
+
+        freq = self.fct_frequency(numusers=len(users))
         j = len(users)
 
-        prob_joint = normalize(prob_user * prob_usage)
+        sampler = self.start_time_sampler(users, household=True)
 
         pattern = self.fct_duration_pattern()
         duration = len(pattern)
 
-        previous_events = []
+        previous_events = Occupancy()
 
         for i in range(freq):
-            start, end = sample_start_time(prob_joint, day_num, duration, previous_events)
+            start, end = sample_start_time(sampler, day_num, duration, previous_events, rng=self.rng)
             
             # add event times to list of previous events
-            previous_events.append((start, end))
+            previous_events.add(start, end)
 
             end_of_day = 24 * 60 * 60 * (day_num + 1)
-            if end > end_of_day and spillover:
-                consumption = handle_spillover_consumption(consumption, pattern, start, end, j, ind_enduse, pattern_num, end_of_day, "WashingMachine", total_days)
-            elif ((day_num + 1) == total_days) and (end > end_of_day):
-                difference = end_of_day - start
-                consumption[start:end_of_day, j, ind_enduse, pattern_num, 0] = pattern[:difference]
-                consumption[start:end_of_day, j, ind_enduse, pattern_num, 1] = 0
-            else:
-                difference = end - start
-                consumption[start:end, j, ind_enduse, pattern_num, 0] = pattern[:difference]
-                consumption[start:end, j, ind_enduse, pattern_num, 1] = 0
+            consumption = self.record_event(consumption, start, end, j, ind_enduse, pattern_num, day_num, total_days, intensity=None, temperature_fraction=0, spillover=spillover)
 
             if simulate_discharge:
                 if discharge is None:
@@ -858,13 +1077,13 @@ class Wc(EndUse):
         self.discharge_events = []
     
 
-    def fct_frequency(self, age=None, gender=None):
+    def fct_frequency(self, age=None, gender=None, size=None):
         f_stats = self.statistics['frequency']
-        distribution = getattr(np.random, f_stats['distribution'].lower())
+        distribution = getattr(self.rng, f_stats['distribution'].lower())
 
         average = f_stats['average'][age][gender]
 
-        return distribution(average)
+        return distribution(average, size=size)
 
     def fct_duration_intensity_temperature(self):
 
@@ -875,11 +1094,11 @@ class Wc(EndUse):
         temperature = self.statistics['temperature']
         average = to_timedelta(self.statistics['subtype'][self.name]['duration'])
 
-        # dist = duration_decorator(getattr(np.random, d_stats['distribution'].lower()))
+        # dist = duration_decorator(getattr(self.rng, d_stats['distribution'].lower()))
 
         # add water savings option
         if flush_interuption:
-            v = np.random.random() * 100
+            v = self.rng.random() * 100
             if v < prob_flush_interuption:
                 average /= 2.0
 
@@ -913,30 +1132,49 @@ class Wc(EndUse):
         return discharge
 
 
-    def simulate(self, consumption, discharge=None, users=None, ind_enduse=None, pattern_num=1, day_num=0, total_days=1, simulate_discharge=False, spillover=False):
+    def draw_events(self, users=None, num_patterns=1, total_days=1):
+
+        size = (num_patterns, total_days)
 
-        prob_usage = self.usage_probability().values
+        average = int(to_timedelta(self.statistics['subtype'][self.name]['duration']).total_seconds())
+        flush_interuption = self.statistics['subtype'][self.name]['flush_interuption']
+
+        tables = []
+        probabilities = {}
+        for j, user in enumerate(users):
+            table = self._expand_frequencies(self.fct_frequency(age=user.age, gender=user.gender, size=size), j, average,
+                                             self.statistics['intensity'], self.statistics['temperature'])
+
+            # add water savings option
+            if flush_interuption:
+                interrupted = self.rng.random(len(table['user'])) * 100 < self.statistics['prob_flush_interuption']
+                table['duration'][interrupted] = int(to_timedelta(average / 2.0).total_seconds())
+
+            tables.append(table)
+            probabilities[j] = self.start_time_sampler([user])
+
+        return self._concat_events(tables), probabilities
+
+    def simulate(self, consumption, discharge=None, users=None, ind_enduse=None, pattern_num=1, day_num=0, total_days=1, simulate_discharge=False, spillover=False):
 
-        previous_events = []
+        previous_events = Occupancy()
 
         for j, user in enumerate(users):
             freq = self.fct_frequency(age=user.age, gender=user.gender)
-            prob_user = user.presence.values
+            sampler = self.start_time_sampler([user])
 
             for i in range(freq):
 
                 duration, intensity, temperature = self.fct_duration_intensity_temperature()
 
                 # assign usage type (urine or faeces)
-                usage = "urine" if np.random.random() * 100 < self.statistics['prob_urine'] else "faeces"
+                usage = "urine" if self.rng.random() * 100 < self.statistics['prob_urine'] else "faeces"
                 #print(prob_user)
-                prob_joint = normalize(prob_user * prob_usage)
-                start, end = sample_start_time(prob_joint, day_num, duration, previous_events)
-                previous_events.append((start, end))
+                start, end = sample_start_time(sampler, day_num, duration, previous_events, rng=self.rng)
+                previous_events.add(start, end)
 
-                consumption[start:end, j, ind_enduse, pattern_num, 0] = intensity
                 temperature_fraction = (temperature - self.cold_water_temp)/(self.hot_water_temp - self.cold_water_temp)
-                consumption[start:end, j, ind_enduse, pattern_num, 1] = intensity*temperature_fraction
+                consumption = record_consumption(consumption, start, end, j, ind_enduse, pattern_num, intensity, temperature_fraction)
 
                 if simulate_discharge:
                     if discharge is None:
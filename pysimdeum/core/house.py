@@ -2,11 +2,13 @@ import numpy as np
 import pandas as pd
 import xarray as xr
 import pickle
+import tempfile
 from datetime import datetime
 from typing import Any, Union
 from pysimdeum.utils.base import Base
-from pysimdeum.utils.probability import chooser, normalize
-from pysimdeum.core.statistics import Statistics
+from pysimdeum.utils.probability import chooser, normalize, seed_sequence, spawn_generators
+from pysimdeum.utils.events import EventLog, ChannelArray, allocate_channels, resolution_attrs, select_channels
+from pysimdeum.core.statistics import Statistics, get_statistics
 from pysimdeum.core.user import User
 import pysimdeum.core.end_use as EndUses
 from dataclasses import dataclass, field
@@ -29,6 +31,7 @@ class Property(Base):
     _house: Any = None
     statistics: Statistics = None
     country: str = "NL" # Default country
+    seed: Any = field(default=None, repr=False)  # seed (int or np.random.SeedSequence) of the random streams, fresh entropy if None
 
     # TODO: implement following quantities
     oopnet_id: str = ""
@@ -38,9 +41,11 @@ class Property(Base):
     y_coordinate: float = np.nan
 
 
-    def __post__init__(self):
-        if Statistics is None:
-            self.statistics = Statistics(country=self.country)
+    def __post_init__(self):
+        if self.statistics is None:
+            self.statistics = get_statistics(country=self.country)
+        self.seed_sequence = seed_sequence(self.seed)
+        self.rng = np.random.default_rng(self.seed_sequence)
 
 
     def _choose_type(self, statistics: Statistics=None) -> str:
@@ -48,7 +53,7 @@ class Property(Base):
         if not statistics:
             raise Exception('Statistics object has to be defined')
         else:
-            self.house_type = chooser(data=statistics.household, myproperty='households')
+            self.house_type = chooser(data=statistics.household, myproperty='households', rng=self.rng)
 
         return self.house_type
 
@@ -57,7 +62,7 @@ class Property(Base):
         # TODO: House chooser seems not to work if API:built_house does not specify a house_type
         if country:
             self.country = country
-            self.statistics = Statistics(country=self.country)
+            self.statistics = get_statistics(country=self.country)
 
         if housefile:
             with open(housefile, 'rb') as f:
@@ -76,7 +81,8 @@ class Property(Base):
                             lattitude=self.lattitude,
                             longitude=self.longitude,
                             x_coordinate=self.x_coordinate,
-                            y_coordinate=self.y_coordinate)
+                            y_coordinate=self.y_coordinate,
+                            seed=self.seed_sequence.spawn(1)[0])
 
         return self.house
 
@@ -93,6 +99,7 @@ class House(Property):
     appliances: list = field(default_factory=list)  # List of appliances/water end-use devices in the house
     consumption: xr.DataArray = field(default_factory=xr.DataArray)  # property to store the consumption of a house
     discharge: xr.DataArray = field(default_factory=xr.DataArray)  # property to store the discharge of a house
+    events: EventLog = field(default=None, repr=False)  # property to store the consumption events of a sparse simulation
 
     def __repr__(self) -> str:
         return f'{self.__class__.__name__}:\n\tid\t=\t{self.id}\n\ttype\t=' \
@@ -115,12 +122,12 @@ class House(Property):
 
         if self.house_type == 'one_person':
 
-            age = chooser(data=age_stats)
-            gender = chooser(data=gender_stats)
+            age = chooser(data=age_stats, rng=self.rng)
+            gender = chooser(data=gender_stats, rng=self.rng)
             job = False
 
             if age == 'adult':
-                u = np.random.uniform()
+                u = self.rng.uniform()
                 if u < job_stats[gender]:
                     job = True
 
@@ -130,17 +137,17 @@ class House(Property):
             # todo: implement same sex households
 
             # choose age
-            age1 = chooser(data=age_stats)
-            age2 = chooser(data=age_stats)
+            age1 = chooser(data=age_stats, rng=self.rng)
+            age2 = chooser(data=age_stats, rng=self.rng)
 
             # choose gender
-            gender = chooser(data=gender_stats)
+            gender = chooser(data=gender_stats, rng=self.rng)
             gender1, gender2 = gender.split('_')
 
             # choose job
             job1 = False
             job2 = False
-            u = np.random.uniform()
+            u = self.rng.uniform()
 
             # have a job
             if age1 == 'senior':
@@ -154,7 +161,7 @@ class House(Property):
                         job1 = True
 
             if (age1 == 'adult') and (age2 == 'adult'):
-                job = chooser(job_stats)
+                job = chooser(job_stats, rng=self.rng)
                 if job == 'both':
                     job1 = True
                     job2 = True
@@ -178,12 +185,12 @@ class House(Property):
             averagenumpeople = self.statistics.household[self.house_type]['people']
             minnum = 2
             maxnum = 5
-            rNum = np.random.binomial(n=maxnum - minnum, p=(averagenumpeople - minnum) / (maxnum - minnum)) + minnum
+            rNum = self.rng.binomial(n=maxnum - minnum, p=(averagenumpeople - minnum) / (maxnum - minnum)) + minnum
 
             if rNum == 2:  # mother and child/teen
 
                 # u = pm.Uniform.dist().random()
-                u = np.random.uniform()
+                u = self.rng.uniform()
 
                 # mother
                 job = False
@@ -193,8 +200,8 @@ class House(Property):
                 mother = User(id='user_1', age='adult', job=job, gender='female')
 
                 # child
-                gender = chooser(gender_stats)
-                age = chooser(age_stats[['child', 'teen']])
+                gender = chooser(gender_stats, rng=self.rng)
+                age = chooser(age_stats[['child', 'teen']], rng=self.rng)
                 child = User(id='user_2', age=age, job=False, gender=gender)
 
                 self.users = [mother, child]
@@ -202,7 +209,7 @@ class House(Property):
             elif rNum in [3, 4, 5]:
 
                 # Generate parents
-                job = chooser(job_stats)
+                job = chooser(job_stats, rng=self.rng)
                 if job == 'both':
                     f_job = True
                     m_job = True
@@ -221,8 +228,8 @@ class House(Property):
 
                 # add child/teen until family size is reached
                 for numchild in range(2, rNum):
-                    gender = chooser(gender_stats)
-                    age = chooser(age_stats[['child', 'teen']])
+                    gender = chooser(gender_stats, rng=self.rng)
+                    age = chooser(age_stats[['child', 'teen']], rng=self.rng)
                     family += [User(id='user_' + str(numchild+1), gender=gender, age=age, job=False)]  #
                     # additional
                     # child
@@ -235,15 +242,22 @@ class House(Property):
 
             raise NotImplementedError('Household type is not implemented')
 
+        # every user draws its presence from its own random stream
+        for user, rng in zip(self.users, spawn_generators(self.seed_sequence, len(self.users))):
+            user.rng = rng
+
     def furnish_house(self):
 
-        for key, appliances in self.statistics.end_uses.items():
+        # every end-use gets its own random stream, spawned whether or not the end-use is present in the house
+        rngs = spawn_generators(self.seed_sequence, len(self.statistics.end_uses))
+
+        for (key, appliances), rng in zip(self.statistics.end_uses.items(), rngs):
 
             penetration = appliances['penetration']
             classname = appliances['classname']
             inhabitants = str(len(self.users))
 
-            u = np.random.uniform() * 100  # probability in percent
+            u = self.rng.uniform() * 100  # probability in percent
 
             # penetration dependent on number of inhabitants
             if isinstance(penetration, dict):
@@ -251,13 +265,13 @@ class House(Property):
 
             if u <= penetration:
                 if classname == 'Shower':
-                    showertype = chooser(appliances['subtype'], 'penetration')
-                    eu_instance = getattr(EndUses, showertype)(statistics=appliances)
+                    showertype = chooser(appliances['subtype'], 'penetration', rng=self.rng)
+                    eu_instance = getattr(EndUses, showertype)(statistics=appliances, rng=rng)
                 elif classname == 'Wc':
-                    wctype = chooser(appliances['subtype'], 'penetration')
-                    eu_instance = getattr(EndUses, wctype)(statistics=appliances)
+                    wctype = chooser(appliances['subtype'], 'penetration', rng=self.rng)
+                    eu_instance = getattr(EndUses, wctype)(statistics=appliances, rng=rng)
                 else:
-                    eu_instance = getattr(EndUses, classname)(statistics=appliances)
+                    eu_instance = getattr(EndUses, classname)(statistics=appliances, rng=rng)
                 self.appliances.append(eu_instance)
 
     def init_consumption(self):
@@ -272,7 +286,42 @@ class House(Property):
                                         dims=['time', 'user', 'enduse'])
         return self.consumption
 
-    def simulate(self, date=None, duration='1 day', num_patterns=1, simulate_discharge=False, spillover=False):
+    def simulate(self, date=None, duration='1 day', num_patterns=1, simulate_discharge=False, spillover=False, sparse=False, batch=False,
+                 dtype=np.float64, flowtypes=None, dischargetypes=None, resolution='1s'):
+        """Simulates the water consumption (and optionally the discharge) of the house.
+
+        Args:
+            date (optional): start date of the simulation. Defaults to today.
+            duration (str, optional): duration of the simulation. Defaults to '1 day'.
+            num_patterns (int, optional): number of stochastic patterns to simulate. Defaults to 1.
+            simulate_discharge (bool, optional): simulate the discharge linked to the consumption. Defaults to False.
+            spillover (bool, optional): wrap events that run past the end of the simulation. Defaults to False.
+            sparse (bool, optional): record the consumption as an `EventLog` (one row per water-use event) in
+                `events` instead of allocating the dense consumption array. The dense array can be built afterwards
+                with `dense_consumption`. Discharge is always simulated densely. Defaults to False.
+            batch (bool, optional): draw the events of all patterns and days of an appliance in a single vectorised
+                pass (`EndUse.simulate_batch`) instead of one call per pattern and day. Can not be combined with
+                `simulate_discharge`. Defaults to False.
+            dtype (optional): data type of the consumption and discharge arrays. Defaults to np.float64.
+            flowtypes (list, optional): flow channels of the consumption to allocate, any of 'totalflow' and
+                'hotflow'. Defaults to None (both).
+            dischargetypes (list, optional): discharge channels to allocate, any of 'greywater' and 'blackwater'.
+                Defaults to None (both).
+            resolution (str, optional): time step of the output, e.g. '1min' or '15min'. Events are still placed
+                at second precision, but only their volume per time step is stored (`BinnedArray`), which equals
+                `consumption.resample(time=resolution).sum()` of a 1 s simulation. The time step (in seconds) and the
+                unit ('l/s' for 1 s flows, 'l' for volumes per time step) are stored in the attributes 'resolution'
+                and 'units' of the output. The wastewater quality post-processing requires 1 s output. Defaults to '1s'.
+
+        Raises:
+            ValueError: If `batch` is combined with `simulate_discharge`.
+
+        Returns:
+            consumption (xr.DataArray | EventLog) and discharge (xr.Dataset or None)
+        """
+
+        if batch and simulate_discharge:
+            raise ValueError('Batch simulation does not simulate discharge, use batch=False with simulate_discharge=True.')
 
         if date is None:
             date = datetime.now().date()
@@ -284,16 +333,26 @@ class House(Property):
         # time = pd.timedelta_range(start='00:00:00', end='24:00:00', freq='1s', closed='left')
         # time = pd.date_range(start=date, end=date + timedelta, freq='1s', closed='left')
         time = pd.date_range(start=date, end=date + timedelta, freq='1s')
+        binsize = pd.to_timedelta(resolution).total_seconds()
+        if binsize < 1 or binsize != int(binsize):
+            raise ValueError(f'Resolution {resolution} has to be a whole number of seconds.')
+        binsize = int(binsize)
         users = [x.id for x in self.users] + ['household']
         enduse = [x.statistics['classname'] for x in self.appliances]
         patterns = [x for x in range(0, num_patterns)]
+        shape = (len(time), len(users), len(enduse), num_patterns)
         flowtype = ['totalflow', 'hotflow']
-        consumption = np.zeros((len(time), len(users), len(enduse), num_patterns, len(flowtype)))
+        if sparse:
+            consumption = EventLog(time=time, users=users, enduses=enduse, patterns=patterns, flowtypes=select_channels(flowtype, flowtypes), dtype=dtype, binsize=binsize)
+        else:
+            consumption = allocate_channels(shape, flowtype, flowtypes, dtype=dtype, binsize=binsize)
+        flowtype = select_channels(flowtype, flowtypes)
         number_of_days = int(timedelta/pd.to_timedelta('1 day'))
         
         if simulate_discharge:
             dischargetype = ['greywater', 'blackwater']
-            discharge = np.zeros((len(time), len(users), len(enduse), num_patterns, len(dischargetype)))
+            discharge = allocate_channels(shape, dischargetype, dischargetypes, dtype=dtype, binsize=binsize)
+            dischargetype = select_channels(dischargetype, dischargetypes)
             # Clear discharge_events for all appliances
             for appliance in self.appliances:
                 if hasattr(appliance, 'discharge_events'):
@@ -301,17 +360,33 @@ class House(Property):
         else:
             discharge = None
 
-        for num in patterns:
+        if batch:
             for k, appliance in enumerate(self.appliances):
-                for day in range(0, number_of_days, 1):
-                    if simulate_discharge:
-                        consumption, discharge = appliance.simulate(consumption, discharge, users=self.users, ind_enduse=k, pattern_num=num, day_num=day, total_days=number_of_days, simulate_discharge=simulate_discharge, spillover=spillover)
-                    else:
-                        consumption, _ = appliance.simulate(consumption, None, users=self.users, ind_enduse=k, pattern_num=num, day_num=day, total_days=number_of_days, simulate_discharge=simulate_discharge, spillover=spillover)
+                consumption = appliance.simulate_batch(consumption, users=self.users, ind_enduse=k, num_patterns=num_patterns, total_days=number_of_days, spillover=spillover)
+        else:
+            for num in patterns:
+                for k, appliance in enumerate(self.appliances):
+                    for day in range(0, number_of_days, 1):
+                        if simulate_discharge:
+                            consumption, discharge = appliance.simulate(consumption, discharge, users=self.users, ind_enduse=k, pattern_num=num, day_num=day, total_days=number_of_days, simulate_discharge=simulate_discharge, spillover=spillover)
+                        else:
+                            consumption, _ = appliance.simulate(consumption, None, users=self.users, ind_enduse=k, pattern_num=num, day_num=day, total_days=number_of_days, simulate_discharge=simulate_discharge, spillover=spillover)
+
+        if sparse:
+            self.events = consumption
+            self.consumption = xr.DataArray()
+        else:
+            self.events = None
+            if isinstance(consumption, ChannelArray):
+                consumption = consumption.data
+            self.consumption = xr.DataArray(data=consumption, coords=[time[::binsize], users, enduse, patterns, flowtype], dims=['time', 'user', 'enduse', 'patterns', 'flowtypes'],
+                                            attrs=resolution_attrs(binsize))
 
         if simulate_discharge:
-            self.consumption = xr.DataArray(data=consumption, coords=[time, users, enduse, patterns, flowtype], dims=['time', 'user', 'enduse', 'patterns', 'flowtypes'])
-            self.discharge = xr.DataArray(data=discharge, coords=[time, users, enduse, patterns, dischargetype], dims=['time', 'user', 'enduse', 'patterns', 'dischargetypes'])
+            if isinstance(discharge, ChannelArray):
+                discharge = discharge.data
+            self.discharge = xr.DataArray(data=discharge, coords=[time[::binsize], users, enduse, patterns, dischargetype], dims=['time', 'user', 'enduse', 'patterns', 'dischargetypes'],
+                                          attrs=resolution_attrs(binsize))
 
             # discharge event metadata
             discharge_events = []
@@ -321,10 +396,23 @@ class House(Property):
 
             self.discharge = xr.Dataset({'discharge': self.discharge})
             self.discharge['discharge_events'] = xr.DataArray(discharge_events)
-        else:
-            self.consumption = xr.DataArray(data=consumption, coords=[time, users, enduse, patterns, flowtype], dims=['time', 'user', 'enduse', 'patterns', 'flowtypes'])
 
-        return self.consumption, (self.discharge if simulate_discharge else None)
+        return (self.events if sparse else self.consumption), (self.discharge if simulate_discharge else None)
+
+    def dense_consumption(self, dtype=None) -> xr.DataArray:
+        """Builds the dense consumption array from the event log of a sparse simulation and stores it in `consumption`.
+
+        Args:
+            dtype (optional): data type of the dense array. Defaults to None (`dtype` of the simulation).
+
+        Returns:
+            xr.DataArray: consumption with dimensions ['time', 'user', 'enduse', 'patterns', 'flowtypes']
+        """
+        if self.events is None:
+            raise Exception('No event log available, simulate the house with sparse=True first.')
+
+        self.consumption = self.events.to_dataarray(dtype=dtype)
+        return self.consumption
 
     def save_house(self, outputname):
 #        if self.consumption == None: #only save simulated houses
@@ -340,24 +428,41 @@ class House(Property):
 # user and appliance data is removed for now
 @dataclass
 class HousePattern:
+    """Compact pattern of a house for storage, with only the totals of the house.
+
+    The consumption (and discharge) is summed over the users and end-uses and stored as float32 per time step,
+    pattern and flow type. Only the ids of the users and the names of the appliances are kept, not the objects
+    themselves (nor the statistics). For a sparse simulation the totals are summed from the event log (see
+    `EventLog.totals`), the house itself is not changed.
+
+    Args:
+        house (House | str): simulated house, or path of a `.housepattern` file to load.
+    """
 
     house: Union[House, str]
-    users: list = field(default_factory=list, init=False)
-    appliances: list = field(default_factory=list, init=False)
-    consumption: list = field(default_factory=list, init=False)
-    discharge: list = field(default_factory=list, init=False)
-
-    def __post__init__(self, house):
-
-        if type(self.house) == House:
-            self.users = self.house.users
-            self.appliances = self.house.appliances 
-            self.consumption = self.house.consumption.sum('user').sum('enduse')
-            self.discharge = self.house.discharge.sum('user').sum('enduse')
-        
-        elif type(self.house) == str:
-            with open(house, 'rb') as f:
+    users: list = field(default_factory=list, init=False)  # ids of the users of the house
+    appliances: list = field(default_factory=list, init=False)  # names of the appliances of the house
+    consumption: xr.DataArray = field(default=None, init=False)  # total consumption ['time', 'patterns', 'flowtypes']
+    discharge: xr.DataArray = field(default=None, init=False)  # total discharge ['time', 'patterns', 'dischargetypes'] or None
+
+    def __post_init__(self):
+
+        if isinstance(self.house, House):
+            house = self.house
+            self.users = [x.id for x in house.users]
+            self.appliances = [x.statistics['classname'] for x in house.appliances]
+            if house.events is None:
+                self.consumption = house.consumption.sum(['user', 'enduse'], keep_attrs=True).astype(np.float32)
+            else:
+                self.consumption = house.events.totals().astype(np.float32)  # without building the dense array
+            if isinstance(house.discharge, xr.Dataset) and 'discharge' in house.discharge:
+                self.discharge = house.discharge['discharge'].sum(['user', 'enduse'], keep_attrs=True).astype(np.float32)
+            self.house = house.id  # keep only the id, so the house itself is not stored
+
+        elif isinstance(self.house, str):
+            with open(self.house, 'rb') as f:
                 new_house_pattern = pickle.load(f)
+                self.house = new_house_pattern.house
                 self.users = new_house_pattern.users
                 self.appliances = new_house_pattern.appliances
                 self.consumption = new_house_pattern.consumption
@@ -366,4 +471,59 @@ class HousePattern:
     def save_house_pattern(self, outputname):
         with open(outputname + '.housepattern', 'wb') as f:
             pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
-    
\ No newline at end of file
+
+
+def _as_house_pattern(house) -> HousePattern:
+    """Returns a HousePattern of a house, a HousePattern, a `.housepattern` file or a `.house` file."""
+
+    if isinstance(house, HousePattern):
+        return house
+    if isinstance(house, str) and not house.endswith('.housepattern'):
+        house = Property().built_house(housefile=house)
+    return HousePattern(house)
+
+
+def load_house_patterns(houses: list, flowtype: str = 'totalflow', filename: str = None) -> xr.DataArray:
+    """Loads the total flow of many houses into one memory-mapped float32 array.
+
+    The houses are loaded one after the other and written into a memory-mapped array, so only one house is in memory
+    at a time, no matter the number of houses. Per house, the patterns follow each other, so
+    `data.values.reshape(len(houses), -1)` is a 2-D (house x time) array of all patterns without a copy.
+
+    Args:
+        houses (list): simulated houses, HousePatterns, or paths of `.housepattern` or `.house` files.
+        flowtype (str, optional): flow type to load. Defaults to 'totalflow'.
+        filename (str, optional): file of the memory-mapped array. Defaults to None (a temporary file).
+
+    Raises:
+        ValueError: If no houses are given or the houses are not simulated over the same time steps, resolution and
+            number of patterns.
+
+    Returns:
+        xr.DataArray: total flow with dimensions ['house', 'patterns', 'time'], the house ids as coordinate 'house_id'
+        and the 'resolution' and 'units' of the houses as attributes (see `House.simulate`)
+    """
+    if len(houses) == 0:
+        raise ValueError('No houses given, at least one house is needed to load the patterns.')
+
+    data = None
+    ids = []
+    for i, house in enumerate(houses):
+        pattern = _as_house_pattern(house)
+        consumption = pattern.consumption.sel(flowtypes=flowtype).transpose('patterns', 'time')
+        attrs = {**resolution_attrs(), **consumption.attrs}
+        if data is None:
+            time, patterns, resolution = consumption['time'].values, consumption['patterns'].values, attrs
+            data = np.memmap(filename if filename else tempfile.TemporaryFile(), dtype=np.float32, mode='w+',
+                             shape=(len(houses),) + consumption.shape)
+        elif consumption.shape != data.shape[1:] or not np.array_equal(consumption['time'].values, time):
+            raise ValueError('All houses have to be simulated over the same time steps and number of patterns.')
+        elif attrs['resolution'] != resolution['resolution']:
+            raise ValueError('All houses have to be simulated at the same resolution.')
+        data[i] = consumption.values
+        ids.append(pattern.house)
+    data.flush()
+
+    return xr.DataArray(data=data, coords={'house': np.arange(len(ids)), 'patterns': patterns, 'time': time,
+                                           'house_id': ('house', ids)},
+                        dims=['house', 'patterns', 'time'], attrs=resolution)
@@ -2,13 +2,31 @@ import pandas as pd
 import geopandas as gpd
 import numpy as np
 import os
-from shapely.ops import unary_union
+import json
+import hashlib
+import importlib.util
+import xarray as xr
 from pysimdeum.data import DATA_DIR
-from pysimdeum.utils.probability import optimise_probabilities
-from pysimdeum.utils.misc import fix_invalid_geometries
+from pysimdeum.utils.probability import optimise_probabilities_batch
+from pysimdeum.utils.misc import fix_invalid_geometries, locate_points
 import pysimdeum.utils.wastewater_quality as wq
-from pysimdeum.api import build_multi_hh
-import toml
+from pysimdeum.core.statistics import load_toml
+from pysimdeum.api import iter_multi_hh, total_flow, SumAccumulator
+
+
+def _reduce_house(house) -> tuple:
+    """Reduces a simulated house to the output aggregated by `Population` (top-level function so it can be sent to a worker process).
+
+    The nutrients are sampled with a generator spawned from the seed sequence of the house, so they do not depend on
+    the process in which the house is reduced.
+
+    Returns:
+        tuple: total flow (time x patterns), first time step and nutrient DataFrame of the discharge (None without discharge)
+    """
+    nutrients = None
+    if isinstance(house.discharge, xr.Dataset):
+        nutrients = wq.hh_discharge_nutrients(house.discharge, rng=np.random.default_rng(house.seed_sequence.spawn(1)[0]))
+    return total_flow(house), house.consumption['time'].values[0], nutrients
 
 
 class DataPrep:
@@ -17,12 +35,17 @@ class DataPrep:
 
     This class reads datasets from specified file paths provided in a config file,
     renames columns based on the configuration, and prepares them for use in the Population class.
+    Only the mapped columns are read, geospatial datasets can be filtered by a bounding box, and the
+    preprocessed datasets are cached as (Geo)Parquet files, so repeated runs skip parsing the source files.
     """
 
     def __init__(
             self,
             config_path: str = None,
-            country: str = 'NL'
+            country: str = 'NL',
+            bbox: tuple = None,
+            cache_dir: str = None,
+            use_cache: bool = True
         ):
         """
         Initialises the DataPrep class by determining the configuration file location.
@@ -30,9 +53,14 @@ class DataPrep:
         Args:
             config_path (str): Path to the configuration file (TOML format). If None, the country folder is used.
             country (str): Country name (e.g., 'NL', 'UK') to locate the configuration file in the default data directory.
+            bbox (tuple): Bounding box (minx, miny, maxx, maxy) in the coordinate reference system of the source files;
+                only geometries intersecting it are read. Defaults to None (all geometries).
+            cache_dir (str): Directory of the cached datasets. Defaults to None (`~/.cache/pysimdeum`).
+            use_cache (bool): Read and write cached datasets. Requires `pyarrow`. Defaults to True.
         """
         if config_path and os.path.isfile(config_path):
             self.config_file = config_path
+            self.country = country
         elif os.path.isdir(country):
             self.config_file = os.path.join(country, 'spatial_config.toml')
             self.country = None
@@ -45,11 +73,25 @@ class DataPrep:
             raise FileNotFoundError(f"Configuration file not found: {self.config_file}")
 
         # Load the configuration
-        self.config = toml.load(self.config_file)
+        self.config = load_toml(self.config_file)
+
+        self.bbox = bbox
+        self.cache_dir = cache_dir or os.path.join(os.path.expanduser('~'), '.cache', 'pysimdeum')
+        self.use_cache = use_cache
         
         #self.datasets = {}
         self.load_datasets()
 
+    def _cache_file(self, dataset_key: str, dataset_path: str, column_mapping: dict) -> str:
+        """
+        Returns the path of the cached dataset, keyed by the source file (path and modification time),
+        the column mapping and the preprocessing options.
+        """
+        key = json.dumps([os.path.abspath(dataset_path), os.path.getmtime(dataset_path), column_mapping,
+                          self.bbox, self.country], sort_keys=True, default=str)
+        digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f'{dataset_key}_{digest}.parquet')
+
     def _load_and_preprocess(self, dataset_key: str, is_geospatial: bool = False):
         """
         Helper method to load and preprocess a dataset.
@@ -66,17 +108,29 @@ class DataPrep:
         column_mapping = self.config['columns'][dataset_key]
         column_mapping = {v: k for k, v in column_mapping.items()} # reverse mapping
 
-        # Load the dataset
+        cache_file = None
+        if self.use_cache and importlib.util.find_spec('pyarrow') is not None:
+            cache_file = self._cache_file(dataset_key, dataset_path, column_mapping)
+            if os.path.isfile(cache_file):
+                return gpd.read_parquet(cache_file) if is_geospatial else pd.read_parquet(cache_file)
+
+        # Load only the mapped columns of the dataset
         if is_geospatial:
-            dataset = gpd.read_file(dataset_path)
+            columns = [column for column in column_mapping if column != 'geometry']
+            dataset = gpd.read_file(dataset_path, columns=columns, bbox=self.bbox)
             if self.country == 'UK':
                 dataset = dataset.to_crs(epsg=27700)
+            dataset = fix_invalid_geometries(dataset)
         else:
-            dataset = pd.read_csv(dataset_path)
+            dataset = pd.read_csv(dataset_path, usecols=list(column_mapping))
 
         # Rename and select only the columns of interest
         dataset = dataset.rename(columns=column_mapping)[list(column_mapping.values())]
 
+        if cache_file is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            dataset.to_parquet(cache_file)
+
         return dataset
 
     def load_datasets(self):
@@ -110,8 +164,8 @@ class Population:
         boundaries_pop (pd.DataFrame): DataFrame containing population data for boundaries.
         houses (gpd.GeoDataFrame): GeoDataFrame containing house geometries and attributes.
         boundary_counts (pd.DataFrame): DataFrame containing household and population totals for each boundary.
-        results (dict): Dictionary containing household counts and probabilities for each boundary.
-        houses_instances (list): List of pysimdeum.House instances prepared for simulation.
+        results (pd.DataFrame): DataFrame containing household counts and probabilities for each boundary.
+        houses_instances (dict): Dictionary of simulated pysimdeum.House instances (empty if `keep_houses` is False).
         sample (bool): Whether to sample a subset of houses or proces the entire dataset.
     """
 
@@ -122,7 +176,11 @@ class Population:
             duration: str = '1 day',
             country: str = None,
             simulate_discharge: bool = False,
-            spillover: bool = False
+            spillover: bool = False,
+            seed: int = None,
+            n_workers: int = 1,
+            chunksize: int = 1,
+            keep_houses: bool = False
         ):
         """
         Initialises the Population class with preprocessed datasets.
@@ -133,6 +191,13 @@ class Population:
                 - 'boundaries': GeoDataFrame of boundaries.
                 - 'boundaries_pop': DataFrame of population data for boundaries.
                 - 'houses': GeoDataFrame of houses.
+            seed (int): Root seed from which the random stream of every house is derived (see `build_multi_hh`),
+                also used for the assignment of occupancy types to houses.
+            n_workers (int): Number of worker processes used to simulate the houses.
+            chunksize (int): Number of houses sent to a worker process at once.
+            keep_houses (bool): Keep the simulated House instances in `houses_instances`. If False, every house is
+                reduced in the process that simulated it (see `_reduce_house`) and only its aggregates are kept, so
+                parallel runs do not send whole houses between processes. Defaults to False.
         """
         
         self.subcatchments = fix_invalid_geometries(datasets['subcatchments'])
@@ -140,10 +205,13 @@ class Population:
         self.boundaries_pop = datasets['boundaries_pop']
         self.houses = datasets['houses']
         self.sample = sample
+        self.seed = seed
 
         self._prepare_data()
 
-        self.houses_instances = build_multi_hh(self.household_data, duration=duration, country=country, simulate_discharge=simulate_discharge, spillover=spillover)
+        self.keep_houses = keep_houses
+        self.simulate_houses(duration=duration, country=country, simulate_discharge=simulate_discharge, spillover=spillover,
+                             seed=seed, n_workers=n_workers, chunksize=chunksize)
         self.subcatchment_profiles = self.calculate_subcatchment_profiles()
         self.subcatchment_ww_profiles = self.calculate_subcatchment_ww_nutrient_profiles()
 
@@ -165,7 +233,7 @@ class Population:
         self.results = self.fit_hh_population(probabilities, household_sizes)
         
         self.houses['occupancy_type'] = None
-        self.houses = self.assign_occupancy_types()
+        self.houses = self.assign_occupancy_types(seed=self.seed)
         self.clip_houses_to_subs()
         self.household_data = self.household_data_prep()
 
@@ -174,11 +242,11 @@ class Population:
         """
         Clips boundaries to subcatchments and updates the boundaries GeoDataFrame.
 
-        This method uses the union of all subcatchment geometries to clip the boundaries
-        and retain only those that intersect with the subcatchments.
+        This method queries the spatial index (STRtree) of the subcatchments with the boundaries
+        and retains only those that intersect with a subcatchment.
         """
-        subs_outline = gpd.GeoDataFrame(geometry=[unary_union(self.subcatchments.geometry)], crs=self.subcatchments.crs)
-        self.boundaries = gpd.sjoin(self.boundaries, subs_outline, how='inner', predicate='intersects').drop(columns='index_right')
+        intersecting = self.subcatchments.sindex.query(self.boundaries.geometry, predicate='intersects')[0]
+        self.boundaries = self.boundaries.iloc[np.unique(intersecting)]
 
 
     def _filter_population_data(self):
@@ -191,15 +259,30 @@ class Population:
         self.boundaries_pop = self.boundaries_pop[self.boundaries_pop['boundary_id_code'].isin(self.boundaries['boundary_id'].unique())][['boundary_id_code', 'population']]
 
 
-    def _filter_houses(self):
+    def _filter_houses(self, chunksize: int = 100000):
         """
         Filters houses to include only those within the selected boundaries.
 
-        This method performs a spatial join to retain houses that intersect with the boundaries
-        and filters for houses with the `BaseFuncti` attribute set to 'DWELLING'.
+        This method filters for houses with the `BaseFuncti` attribute set to 'DWELLING' and locates the
+        representative point of every house in the boundaries and subcatchments in a single pass over the
+        houses (see `locate_points`). Houses outside the boundaries are dropped; houses outside the
+        subcatchments get no `subcatchment_id` (they count for the population of their boundary, but
+        are dropped by `clip_houses_to_subs`).
+
+        Args:
+            chunksize (int): Number of houses located at once. Defaults to 100000.
         """
-        self.houses = gpd.sjoin(self.houses, self.boundaries, how='inner', predicate='intersects').drop(columns='index_right').rename(columns={'boundary_id': 'hh_boundary_id'})
-        self.houses = self.houses[self.houses['function'] == 'DWELLING'][['house_id', 'hh_boundary_id', 'geometry']]
+        houses = self.houses[self.houses['function'] == 'DWELLING']
+        points = houses.geometry.representative_point()
+        boundary = locate_points(points, self.boundaries, chunksize=chunksize)
+        subcatchment = locate_points(points, self.subcatchments, chunksize=chunksize)
+
+        inside = boundary >= 0
+        houses = houses[inside].copy()
+        houses['hh_boundary_id'] = self.boundaries['boundary_id'].to_numpy()[boundary[inside]]
+        subcatchment_ids = np.append(self.subcatchments['subcatchment_id'].to_numpy().astype(object), None)
+        houses['subcatchment_id'] = subcatchment_ids[subcatchment[inside]]
+        self.houses = houses[['house_id', 'hh_boundary_id', 'subcatchment_id', 'geometry']]
 
     
     def spatial_clipping_and_pop_count(self):
@@ -237,78 +320,68 @@ class Population:
         Fits household probabilities and calculates household counts for each boundary
         in the input DataFrame.
 
+        The probabilities of all boundaries are optimised at once (see `optimise_probabilities_batch`).
+
         Args:
             probabilities (list): Initial probabilities for each household category.
             household_sizes (list): Average household sizes for each category.
 
         Returns:
-            dict: A dictionary where keys are boundary labels and values are nested dictionaries
-                with household counts for each category and the optimised probabilities.
-        """
-        results = {}
-
-        # Iterate through each row in the boundary_counts DataFrame
-        for _, row in self.boundary_counts.iterrows():
-            boundary_label = row['hh_boundary_id']
-            total_population = float(row['pop_tot'])
-            total_households = int(row['household_tots'])
-
-            # Optimise probabilities for the current boundary
-            optimised_probs = optimise_probabilities(
-                starting_probs=np.array(probabilities),
-                total_population=total_population,
-                total_households=total_households,
-                household_sizes=np.array(household_sizes)
-            )
+            pd.DataFrame: A DataFrame indexed by boundary label with the household counts of each category
+                ('one_person', 'two_person', 'family') and the optimised probabilities ('p_one_person',
+                'p_two_person', 'p_family').
+        """
+        categories = ['one_person', 'two_person', 'family']
+
+        # Optimise probabilities for all boundaries
+        optimised_probs = optimise_probabilities_batch(
+            starting_probs=np.array(probabilities),
+            total_population=self.boundary_counts['pop_tot'].to_numpy(dtype=float),
+            total_households=self.boundary_counts['household_tots'].to_numpy(dtype=int),
+            household_sizes=np.array(household_sizes)
+        )
+
+        # Calculate household counts based on the optimised probabilities
+        household_counts = (optimised_probs * self.boundary_counts['household_tots'].to_numpy(dtype=int)[:, None]).round().astype(int)
+
+        results = pd.DataFrame(household_counts, columns=categories, index=self.boundary_counts['hh_boundary_id'].to_numpy())
+        results[['p_' + category for category in categories]] = optimised_probs.round(3)
+        results.index.name = 'hh_boundary_id'
 
-            # Calculate household counts based on the optimised probabilities
-            household_counts = (optimised_probs * total_households).round().astype(int)
-            households_one_person, households_two_person, households_family = household_counts
-            optimised_probs = [float(round(prob, 3)) for prob in optimised_probs]
-
-            # Store the results in the dictionary
-            results[boundary_label] = {
-                "one_person": int(households_one_person),
-                "two_person": int(households_two_person),
-                "family": int(households_family),
-                "probabilities": optimised_probs
-            }
-        
         return results
     
 
-    def assign_occupancy_types(self):
+    def assign_occupancy_types(self, seed=None):
         """
-        Assigns occupancy types to houses based on the results dictionary.
+        Assigns occupancy types to houses based on the results DataFrame.
 
-        This method loops through the results dictionary, filters houses for each boundary,
-        shuffles the rows to ensure random assignment, and assigns occupancy types based on
-        the number of each type available.
+        The houses are shuffled once and numbered within their boundary (`groupby().cumcount()`); the first
+        houses of a boundary become 'one_person', the next 'two_person' and then 'family', according to the
+        household counts of the boundary. Houses beyond the counts keep no occupancy type.
+
+        Args:
+            seed (int, optional): Seed of the random order of the houses. Defaults to None (fresh entropy).
 
         Returns:
             pd.DataFrame: Updated houses GeoDataFrame with assigned occupancy types.
         """
+        categories = ['one_person', 'two_person', 'family']
         updated_houses = self.houses.copy()
 
-        for boundary_id, counts in self.results.items():
-            # Filter houses to rows where boundary_id matches the current key
-            filtered_houses = updated_houses[updated_houses['hh_boundary_id'] == boundary_id]
-
-            # Shuffle rows to ensure random assignment
-            shuffled_houses = filtered_houses.sample(frac=1, random_state=42)
-
-            # Get the number of each household type from the results dictionary
-            one_person_count = counts['one_person']
-            two_person_count = counts['two_person']
-            family_count = counts['family']
+        # Shuffle rows to ensure random assignment and number the houses within their boundary
+        order = np.random.default_rng(seed).permutation(len(updated_houses))
+        boundary_ids = updated_houses['hh_boundary_id'].iloc[order]
+        rank = boundary_ids.groupby(boundary_ids.to_numpy()).cumcount().to_numpy()
 
-            # Assign occupancy_type based on the counts using .iloc for positional slicing
-            shuffled_houses.iloc[:one_person_count, shuffled_houses.columns.get_loc('occupancy_type')] = 'one_person'
-            shuffled_houses.iloc[one_person_count:one_person_count + two_person_count, shuffled_houses.columns.get_loc('occupancy_type')] = 'two_person'
-            shuffled_houses.iloc[one_person_count + two_person_count:one_person_count + two_person_count + family_count, shuffled_houses.columns.get_loc('occupancy_type')] = 'family'
+        # Compare the numbers with the cumulative household counts of the boundary
+        counts = self.results[categories].reindex(boundary_ids.to_numpy())
+        known = counts.notna().all(axis=1).to_numpy()
+        category = (rank[:, None] >= counts.fillna(0).to_numpy().cumsum(axis=1)).sum(axis=1)
+        types = np.array(categories + [None], dtype=object)[np.where(known, category, len(categories))]
 
-            # Update the original DataFrame with the assigned occupancy types
-            updated_houses.loc[shuffled_houses.index, 'occupancy_type'] = shuffled_houses['occupancy_type']
+        occupancy_types = np.full(len(updated_houses), None, dtype=object)
+        occupancy_types[order] = types
+        updated_houses['occupancy_type'] = occupancy_types
 
         return updated_houses
     
@@ -317,9 +390,8 @@ class Population:
         """
         Clips houses to subcatchments.
         """
-        # filter to houses contained within subs
-        self.houses = self.houses[self.houses['geometry'].within(self.subcatchments.union_all())]
-        self.houses = self.houses.sjoin(self.subcatchments[['subcatchment_id', 'geometry']], predicate='within').drop(columns='index_right')[['house_id','hh_boundary_id','subcatchment_id','occupancy_type','geometry']] 
+        # filter to houses contained within subs (located by `_filter_houses`)
+        self.houses = self.houses[self.houses['subcatchment_id'].notna()][['house_id','hh_boundary_id','subcatchment_id','occupancy_type','geometry']]
 
 
     def household_data_prep(self):
@@ -343,6 +415,41 @@ class Population:
         return household_data
     
 
+    def simulate_houses(self, **kwargs):
+        """
+        Simulates the houses of `household_data` and aggregates them per subcatchment while they are simulated.
+
+        The total flow of every house is added to a NumPy buffer of its subcatchment and the nutrient data of its
+        discharge is kept, as soon as the house is simulated. The House instances themselves are only kept in
+        `houses_instances` if `keep_houses` is True; otherwise the houses are reduced by `_reduce_house` in the process
+        that simulated them.
+
+        Args:
+            **kwargs: simulation options, see `build_multi_hh`.
+        """
+        self.subcatchment_houses = self._house_subcatchment_mapping()
+        self._house_groups = groups = {}
+        for subcatchment_id, house_ids in self.subcatchment_houses.items():
+            for house_id in house_ids:
+                groups.setdefault(house_id, []).append(subcatchment_id)
+
+        self.houses_instances = {}
+        self._subcatchment_flows = SumAccumulator(groups=groups)
+        self._house_nutrients = []
+        self._start_time = None
+
+        for house_id, result in iter_multi_hh(self.household_data, reducer=None if self.keep_houses else _reduce_house, **kwargs):
+            if self.keep_houses:
+                self.houses_instances[house_id] = result
+                result = _reduce_house(result)
+            flow, start_time, nutrients = result
+
+            self._start_time = start_time if self._start_time is None else self._start_time
+            self._subcatchment_flows(house_id, flow)
+            if nutrients is not None:
+                self._house_nutrients.append((house_id, nutrients))
+
+
     def _house_subcatchment_mapping(self):
         """Generates a dictionary with subcatchment IDs as keys and lists of house IDs as values.
 
@@ -369,45 +476,30 @@ class Population:
 
     def calculate_subcatchment_profiles(self):
         """
-        Calculates the profiles of subcatchments based on household types.
+        Calculates the total flow profiles of subcatchments.
 
-        This method generates a dictionary where the keys are subcatchment IDs and the values
-        are dictionaries containing counts of each household type within that subcatchment.
-        """
-        self.subcatchment_houses = self._house_subcatchment_mapping()
+        The profiles are taken from the per-subcatchment buffers that are filled while the houses are
+        simulated (see `simulate_houses`), so the houses do not have to be kept in memory.
 
-        # Initialise a dictionary to store the aggregated profiles
+        Returns:
+            dict: A dictionary where keys are subcatchment IDs and values are the total flow of all houses
+                in the subcatchment (xr.DataArray with dimensions ['time', 'patterns']).
+        """
+        totals = self._subcatchment_flows.totals
         subcatchment_profiles = {}
 
-        # Iterate through each subcatchment and its associated house IDs
-        for subcatchment_id, house_ids in self.subcatchment_houses.items():
-            total_profile = None  # Initialise the total profile for this subcatchment
+        for subcatchment_id in self.subcatchment_houses:
+            if subcatchment_id not in totals:
+                # Skip subcatchments without simulated houses
+                continue
 
-            # Iterate through each house ID in the subcatchment
-            for house_id in house_ids:
-                # Retrieve the house instance from houses_instances
-                house_instance = self.houses_instances.get(house_id)
-
-                if house_instance is None:
-                    # Skip if the house instance is not found
-                    continue
-
-                # Extract the consumption DataArray and select the total flow
-                house_profile = (
-                    house_instance.consumption
-                    .sum(['enduse', 'user'])  # Sum across end uses and users
-                    .sel(flowtypes='totalflow')  # Select the total flow
-                )
-
-                # Aggregate the house profile into the total profile for the subcatchment
-                if total_profile is None:
-                    total_profile = house_profile
-                else:
-                    total_profile += house_profile
-
-            # Store the aggregated profile for the subcatchment
-            if total_profile is not None:
-                subcatchment_profiles[subcatchment_id] = total_profile
+            total_profile = totals[subcatchment_id]
+            time = pd.date_range(start=self._start_time, periods=len(total_profile), freq='1s')
+            subcatchment_profiles[subcatchment_id] = xr.DataArray(
+                data=total_profile,
+                coords={'time': time, 'patterns': np.arange(total_profile.shape[1]), 'flowtypes': 'totalflow'},
+                dims=['time', 'patterns']
+            )
 
         return subcatchment_profiles
 
@@ -416,8 +508,8 @@ class Population:
         """
         Aggregates wastewater flow and nutrient concentrations for each subcatchment.
 
-        This method processes the discharge data of all houses, calculates nutrient concentrations 
-        and flow rates using the `hh_discharge_nutrients` function, and aggregates the results 
+        This method uses the nutrient concentrations and flow rates of all houses, calculated with the
+        `hh_discharge_nutrients` function while the houses are simulated, and aggregates the results 
         by subcatchment and time. The aggregated data includes total flow and weighted average 
         nutrient concentrations for each subcatchment.
 
@@ -437,74 +529,41 @@ class Population:
                         nutrient concentrations for the subcatchment at each timestamp.
 
         Notes:
-            - The method skips houses that do not have discharge data.
+            - The method skips houses that do not have discharge data (returns an empty dictionary without discharge).
             - Nutrient concentrations are weighted by flow to calculate the average for each subcatchment.
             - Missing timestamps are filled with zeros during the aggregation process.
         """
-        # Initialise a list to store all house nutrient data
-        all_house_data = []
-
-        # Iterate through all houses and calculate nutrient data
-        for house_id, house_instance in self.houses_instances.items():
-            if house_instance is None or not hasattr(house_instance, 'discharge'):
-                # Skip if the house instance is not found or does not have discharge data
-                continue
-
-            # Extract the discharge data for the house
-            house_discharge = house_instance.discharge
+        if not self._house_nutrients:
+            return {}
 
-            # Apply the hh_discharge_nutrients function to calculate nutrient concentrations and flow
-            house_nutrients = wq.hh_discharge_nutrients(house_discharge)
+        # Combine all house nutrient data into a single DataFrame, with the subcatchment of every row
+        all_house_data_df = pd.concat([house_nutrients for _, house_nutrients in self._house_nutrients], ignore_index=True)
+        subcatchment_ids = np.repeat([self._house_groups[house_id][0] for house_id, _ in self._house_nutrients],
+                                     [len(house_nutrients) for _, house_nutrients in self._house_nutrients])
+        nutrient_columns = [col for col in all_house_data_df.columns if col not in ['time', 'flow']]
 
-            # Add the subcatchment ID to the house nutrient data
-            house_nutrients['subcatchment_id'] = self.houses.loc[self.houses['house_id'] == house_id, 'subcatchment_id'].values[0]
+        # Sum flow and flow-weighted nutrient concentrations per subcatchment and time in one grouped reduction
+        weighted = all_house_data_df[nutrient_columns].multiply(all_house_data_df['flow'], axis=0)
+        weighted['flow'] = all_house_data_df['flow']
+        sums = weighted.groupby([subcatchment_ids, all_house_data_df['time'].rename('time')]).sum()
+        sums.index = sums.index.set_names(['subcatchment_id', 'time'])
 
-            # Append the house nutrient data to the list
-            all_house_data.append(house_nutrients)
+        profiles = sums[nutrient_columns].div(sums['flow'], axis=0)
+        profiles.insert(0, 'flow', sums['flow'])
+        profiles = profiles.fillna(0).reset_index(level='time')
 
-        # Combine all house nutrient data into a single DataFrame
-        all_house_data_df = pd.concat(all_house_data, ignore_index=True)
+        # Calculate daily flow and hourly average flow
+        daily_flows = profiles.groupby([profiles.index, profiles['time'].dt.date])['flow'].sum()
 
-        # Group by subcatchment and time, and calculate total flow and weighted nutrient concentrations
-        grouped = all_house_data_df.groupby(['subcatchment_id', 'time'])
-        subcatchment_wq_profiles = {}
-
-        for (subcatchment_id, time), group in grouped:
-            # Aggregate flow and calculate weighted nutrient concentrations
-            total_flow = group['flow'].sum()
-
-            # Calculate weighted average for nutrient columns
-            nutrient_columns = [col for col in group.columns if col not in ['subcatchment_id', 'time', 'flow']]
-            weighted_nutrients = (group[nutrient_columns].multiply(group['flow'], axis=0).sum() / total_flow).to_dict()
-
-            # Create a row with aggregated data
-            aggregated_row = {'time': time, 'flow': total_flow, **weighted_nutrients}
-
-            # Append the aggregated row to the subcatchment's data
-            if subcatchment_id not in subcatchment_wq_profiles:
-                subcatchment_wq_profiles[subcatchment_id] = []
-            subcatchment_wq_profiles[subcatchment_id].append(aggregated_row)
-
-        # Convert lists of rows into DataFrames for each subcatchment and calculate additional metrics
         final_profiles = {}
-        for subcatchment_id, rows in subcatchment_wq_profiles.items():
-            # Combine rows into a single DataFrame
-            ww_profile = pd.DataFrame(rows).fillna(0)
-
-            # Calculate daily flow
-            ww_profile['date'] = ww_profile['time'].dt.date
-            daily_flow = ww_profile.groupby('date')['flow'].sum().to_dict()
-
-            # Calculate hourly average flow
-            hourly_average = {date: flow / 24 for date, flow in daily_flow.items()}
-            
-            ww_profile = ww_profile.drop(columns=['date'])
+        for subcatchment_id, ww_profile in profiles.groupby(level='subcatchment_id', sort=True):
+            daily_flow = daily_flows.loc[subcatchment_id].to_dict()
 
             # Store the results in the final dictionary
             final_profiles[subcatchment_id] = {
                 'daily_flow': daily_flow,
-                'hourly_average': hourly_average,
-                'ww_profile': ww_profile
+                'hourly_average': {date: flow / 24 for date, flow in daily_flow.items()},
+                'ww_profile': ww_profile.reset_index(drop=True)
             }
 
         return final_profiles
@@ -1,4 +1,6 @@
 import os
+import numpy as np
+import pandas as pd
 import toml
 from dataclasses import dataclass, field
 from pysimdeum.utils.patterns import complex_daily_pattern, complex_enduse_pattern, complex_discharge_pattern
@@ -7,7 +9,10 @@ import pickle
 
 @dataclass
 class Statistics:
-    """Statistics dataclass that contains all the relevant statistical information for pysimdeum."""
+    """Statistics dataclass that contains all the relevant statistical information for pysimdeum.
+
+    Loading the statistics is expensive; use `get_statistics` to reuse a shared instance.
+    """
 
     country: str = 'NL'   
     household: dict = field(default_factory=dict)
@@ -18,11 +23,9 @@ class Statistics:
     def __post_init__(self):
         
         # Check if pointing to a custom statistics directory or a country in the repository
+        self.statisticsdir = _statistics_dir(self.country)
         if os.path.isdir(self.country):
-            self.statisticsdir = self.country
             self.country = None #No country is set as its a custom directory
-        else:
-            self.statisticsdir = os.path.join(DATA_DIR, self.country)
 
         # Load household statistics
         household_file = os.path.join(self.statisticsdir, 'household_statistics.toml')
@@ -73,7 +76,125 @@ class Statistics:
             return [self._convert_to_dict(v) for v in data]
         else:
             return data
-    
+
+
+_registry = {}  # ... process-wide cache of Statistics objects, see `get_statistics`
+_toml_cache = {}  # ... process-wide cache of TOML files, see `load_toml`
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError('Shared statistics are read-only, create a separate Statistics object (or copy the data) to change them.')
+
+
+class FrozenDict(dict):
+    """Dictionary of the shared statistics that can not be changed, see `freeze`."""
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    """List of the shared statistics that can not be changed, see `freeze`."""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = append = clear = extend = insert = pop = remove = reverse = sort = _read_only
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+
+def freeze(data):
+    """Makes nested statistics read-only, so an object shared by all houses can not be changed by accident.
+
+    Dictionaries and lists are replaced by `FrozenDict` and `FrozenList` (still instances of dict and list, which
+    raise a TypeError when changed), numpy arrays and the data of pandas objects are made read-only in place.
+
+    Args:
+        data: statistics, e.g. the content of a TOML file.
+
+    Returns:
+        the read-only statistics
+    """
+    if isinstance(data, dict):
+        return FrozenDict({key: freeze(value) for key, value in data.items()})
+    if isinstance(data, list):
+        return FrozenList(freeze(value) for value in data)
+    if isinstance(data, (pd.Series, pd.DataFrame)):
+        data.values.flags.writeable = False
+    elif isinstance(data, np.ndarray):
+        data.flags.writeable = False
+    return data
+
+
+def _statistics_dir(country: str) -> str:
+    """Returns the statistics directory of a country in the repository or of a custom statistics directory."""
+
+    if os.path.isdir(country):
+        return country
+    return os.path.join(DATA_DIR, country)
+
+
+def _directory_state(path: str) -> tuple:
+    """Returns the modification times of all files under `path`, used to detect changes of the statistics files."""
+
+    state = []
+    for root, _, files in os.walk(path):
+        for name in files:
+            file = os.path.join(root, name)
+            state.append((os.path.relpath(file, path), os.stat(file).st_mtime_ns))
+    return tuple(sorted(state))
+
+
+def get_statistics(country: str = 'NL') -> Statistics:
+    """Returns the shared Statistics object of a country or custom statistics directory.
+
+    Statistics objects are cached for the whole process, keyed by the statistics directory. A cached object is
+    reused as long as none of the files under its `statisticsdir` is added, removed or modified; otherwise the
+    statistics are loaded again. The returned object is shared by all callers, so its household, diurnal pattern and
+    end-use statistics are read-only (see `freeze`); create a separate `Statistics` object to change them.
+
+    Args:
+        country (str, optional): country code (e.g., 'NL', 'UK') or path to a custom statistics directory. Defaults to 'NL'.
+
+    Returns:
+        Statistics: the (cached) statistics
+    """
+    statisticsdir = os.path.abspath(_statistics_dir(country))
+    state = _directory_state(statisticsdir)
+
+    cached = _registry.get(statisticsdir)
+    if cached is None or cached[0] != state:
+        statistics = Statistics(country=country)
+        statistics.household = freeze(statistics.household)
+        statistics.diurnal_pattern = freeze(statistics.diurnal_pattern)
+        statistics.end_uses = freeze(statistics.end_uses)
+        _registry[statisticsdir] = (state, statistics)
+
+    return _registry[statisticsdir][1]
+
+
+def load_toml(path: str) -> dict:
+    """Loads a TOML file, cached for the whole process until the file is modified.
+
+    The returned dictionary is shared by all callers and therefore read-only (see `freeze`).
+
+    Args:
+        path (str): path to the TOML file.
+
+    Returns:
+        dict: content of the TOML file
+    """
+    path = os.path.abspath(path)
+    mtime = os.stat(path).st_mtime_ns
+
+    cached = _toml_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        _toml_cache[path] = (mtime, freeze(toml.load(path)))
+
+    return _toml_cache[path][1]
+
+
 def main():
     print(DATA_DIR)
     stats = Statistics()
@@ -1,5 +1,5 @@
-import copy
 import numpy as np
+from functools import lru_cache
 import scipy.stats as sstats
 import pandas as pd
 from pysimdeum.utils.base import Base
@@ -15,6 +15,7 @@ class Presence:
     weekday: bool
     user: Any
     stats: Statistics
+    rng: Any = field(default=None, repr=False)  # random number generator, the global numpy random state is used if None
 
     up: pd.Timedelta = field(init=False)
     go: pd.Timedelta = field(init=False)
@@ -28,25 +29,8 @@ class Presence:
 
     def __post_init__(self) -> None:
 
-        if self.weekday:
-            diurnal = copy.deepcopy(self.stats.diurnal_pattern[self.user.age])
-        else:
-            diurnal = copy.deepcopy(self.stats.diurnal_pattern['weekend'])
-
-        for key, val in diurnal.items():
-            dist = val['dist']
-            del val['dist']
-            # dist = getattr(pm, dist)
-            dist = getattr(sstats, dist)
-            newval = dict()
-            translate = {'mu': 'loc',
-                         'sd': 'scale'}
-
-            for x, y in val.items():
-                newval[translate[x]] = round(pd.Timedelta(y).total_seconds() / 60)
-
-            # setattr(self, '_prob_' + key, dist.dist(**newval))
-            setattr(self, '_prob_' + key, dist(**newval))
+        for key, dist in presence_distributions(self.stats, self.user.age, self.weekday).items():
+            setattr(self, '_prob_' + key, dist)
 
         self.up = self.sample_single_property('_prob_getting_up')
 
@@ -77,7 +61,7 @@ class Presence:
         """Function to draw random time values from the single time properties (e.g., getting up, leave house, ...) of the users"""
 
         prob_fct = getattr(self, prop)
-        x = prob_fct.rvs()
+        x = prob_fct.rvs(random_state=self.rng)
         x = int(np.round(x))
         x = pd.Timedelta(minutes=x)
         return x
@@ -89,71 +73,95 @@ class Presence:
         return str(x.components.hours).zfill(2) + ':' + str(x.components.minutes).zfill(2) # + ':' + str(
         # x.components.seconds).zfill(2)
 
-    def timeindexer(self, l, value, a, b):
-        if a == b:
-            return l # skip assignment if start and end are the same
-        if a < b:
-            l[a:b] = value
-        else:
-            l[a:len(l)] = value
-            l[0:b] = value
-        return l
-
     def pdf(self, peak=0.65, normal=0.335, away=0.0, night=0.015):
-        index = pd.timedelta_range(start='00:00:00', end='24:00:00', freq='1Min')
-        pdf = pd.Series(index=index, dtype='object')
 
         up = int((self.up.total_seconds()) / 60) % 1440
-        up_p30 = int((up + 30)) % 1440
-
         go = int(self.go.total_seconds() / 60) % 1440
-        go_m30 = int(go - 30) % 1440
-
         home = int(self.home.total_seconds() / 60) % 1440
-        home_p30 = int(home + 30) % 1440
-
         sleep = int(self.sleep.total_seconds() / 60) % 1440
-        sleep_m30 = int(sleep - 30) % 1440
-
-        pdf = self.timeindexer(pdf, 'normal', up_p30, go_m30)
-        pdf = self.timeindexer(pdf, 'normal', home_p30, sleep_m30)
-        pdf = self.timeindexer(pdf, 'peak', up, up_p30)
-        pdf = self.timeindexer(pdf, 'peak', go_m30, go)
-        pdf = self.timeindexer(pdf, 'peak', home, home_p30)
-        pdf = self.timeindexer(pdf, 'peak', sleep_m30, sleep)
-        pdf = self.timeindexer(pdf, 'night', sleep, up)
-        pdf = self.timeindexer(pdf, 'away', go, home)
-
-        cnts = pdf.value_counts(normalize=True)
-        
-        try:
-            cnts = cnts.drop('away')
-        except:
-            pass
-        cnts /= cnts.sum()
-        try:
-            pdf[pdf == 'peak'] = peak / cnts['peak']
-        except:
-            pass
-        try:
-            pdf[pdf == 'normal'] = normal / cnts['normal']
-        except:
-            pass
-        try:
-            pdf[pdf == 'night'] = night / cnts['night']
-        except:
-            pass
-        try:
-            pdf[pdf == 'away'] = 0.0
-        except:
-            pass
-
-        pdf = pdf.astype('float').resample('1s').ffill()[:-1]
-
-        pdf /= np.sum(pdf)  # normalize
-
-        # transform timedeltas to strings for indexing later on
-        return pdf
+
+        pdf = _presence_pdf(up, go, home, sleep, peak, normal, away, night)
+
+        return pd.Series(pdf.copy(), index=_SECONDS_OF_DAY)
+
+
+def presence_distributions(stats: Statistics, age: str, weekday: bool = True) -> dict:
+    """Returns the distributions (in minutes) of the presence times of a user of a certain age.
+
+    Args:
+        stats (Statistics): statistics with the diurnal patterns.
+        age (str): age of the user (e.g., 'child' or 'work_ad'), only used on weekdays.
+        weekday (bool, optional): distributions of a weekday or of the weekend. Defaults to True.
+
+    Returns:
+        dict: frozen scipy distributions of 'getting_up', 'leaving_house', 'being_away' and 'sleep'
+    """
+    diurnal = stats.diurnal_pattern[age if weekday else 'weekend']
+
+    distributions = dict()
+    translate = {'mu': 'loc',
+                 'sd': 'scale'}
+    for key, val in diurnal.items():
+        dist = getattr(sstats, val['dist'])
+        newval = {translate[x]: round(pd.Timedelta(y).total_seconds() / 60) for x, y in val.items() if x != 'dist'}
+        distributions[key] = dist(**newval)
+
+    return distributions
+
+
+_SECONDS_OF_DAY = pd.timedelta_range(start='00:00:00', periods=24 * 60 * 60, freq='1s')
+_NORMAL, _PEAK, _NIGHT, _AWAY = range(4)
+
+
+@lru_cache(maxsize=4096)
+def _presence_pdf(up, go, home, sleep, peak, normal, away, night) -> np.ndarray:
+    """Computes the presence pdf (one value per second of the day) of `Presence.pdf`.
+
+    The day is divided into periods on an integer array of minutes (including minute 1440, as in the original
+    minute-based time index), the periods are weighted by their share of the (non-away) day, and the minutes are
+    expanded to seconds with `np.repeat`. Results are cached on the times and weights; the returned array is
+    read-only.
+    """
+    minutes = np.full(1441, -1, dtype=np.int8)
+
+    def assign(value, a, b):
+        if a == b:
+            return  # skip assignment if start and end are the same
+        if a < b:
+            minutes[a:b] = value
+        else:
+            minutes[a:] = value
+            minutes[:b] = value
+
+    up_p30 = (up + 30) % 1440
+    go_m30 = (go - 30) % 1440
+    home_p30 = (home + 30) % 1440
+    sleep_m30 = (sleep - 30) % 1440
+
+    assign(_NORMAL, up_p30, go_m30)
+    assign(_NORMAL, home_p30, sleep_m30)
+    assign(_PEAK, up, up_p30)
+    assign(_PEAK, go_m30, go)
+    assign(_PEAK, home, home_p30)
+    assign(_PEAK, sleep_m30, sleep)
+    assign(_NIGHT, sleep, up)
+    assign(_AWAY, go, home)
+
+    # share of every period in the day, without the time away
+    counts = np.bincount(minutes[minutes >= 0], minlength=4)[:_AWAY].astype(float)
+    counts /= counts.sum()
+
+    weights = np.full(5, np.nan)  # last entry for minutes without period
+    for period, weight in ((_PEAK, peak), (_NORMAL, normal), (_NIGHT, night)):
+        if counts[period] > 0:
+            weights[period] = weight / counts[period]
+    weights[_AWAY] = 0.0
+
+    pdf = np.repeat(weights[minutes[:-1]], 60)
+    pdf /= np.nansum(pdf)  # normalize
+    pdf.flags.writeable = False
+
+    return pdf
 
 # removed reference to house. house user belongs to house and not also vice versa
 
@@ -166,6 +174,7 @@ class User(Base):
     job: bool = True
 
     presence: Presence = field(init=False, repr=False)
+    rng: Any = field(default=None, repr=False)  # random number generator of the user, set by `House.populate_house`
 
     def __post_init__(self):
 
@@ -178,7 +187,7 @@ class User(Base):
 
     def compute_presence(self, weekday=True, statistics=None, peak=0.65, normal=0.335, away=0.0, night=0.015):
 
-        presence = Presence(user=self, weekday=weekday, stats=statistics)
+        presence = Presence(user=self, weekday=weekday, stats=statistics, rng=self.rng)
         pdf = presence.pdf(peak=peak, normal=normal, away=away, night=night)
         self.presence = pdf
 
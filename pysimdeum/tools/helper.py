@@ -1,25 +1,198 @@
+import numpy as np
 import pandas as pd
 from typing import Union
 
 from pysimdeum.core.house import House, Property
 from pysimdeum.core.statistics import Statistics
+from pysimdeum.core.user import presence_distributions, _SECONDS_OF_DAY, _NORMAL, _PEAK, _NIGHT, _AWAY
+from pysimdeum.utils.probability import chooser, normalize
 
-def create_diurnal_pattern(statistics: Statistics) -> pd.Series:
-    
-    num_sim = 500
-    time = pd.timedelta_range(start='00:00:00', end='23:59:59', freq='1S')
-    diurnal_pattern = pd.Series(index=time).fillna(0)
-
-    for i in range(num_sim):
-        prop = Property(statistics=statistics)
-        house = prop.built_house()
-        house.populate_house()
-
-        for user in house.users:
-            presence = user.compute_presence(weekday=True, statistics=statistics)
-            presence = presence.fillna(0)
-            diurnal_pattern = diurnal_pattern + presence
-    return diurnal_pattern
+
+def _with_job(age: np.ndarray, job: np.ndarray) -> np.ndarray:
+    """Replaces 'adult' by 'work_ad' or 'home_ad' depending on the job, as done by `User`."""
+
+    return np.where(age == 'adult', np.where(job, 'work_ad', 'home_ad'), age)
+
+
+def sample_user_ages(statistics: Statistics, num_houses: int, rng: np.random.Generator = None) -> np.ndarray:
+    """Draws the house types and the ages of the users of many houses at once.
+
+    The houses are populated as in `House.populate_house`, but all houses of a house type are drawn in one go and
+    only the age of the users (with 'work_ad' and 'home_ad' for adults with and without job) is kept.
+
+    Args:
+        statistics (Statistics): statistics of the country.
+        num_houses (int): number of houses.
+        rng (np.random.Generator, optional): random number generator. Defaults to None (a new unseeded generator).
+
+    Raises:
+        NotImplementedError: If the statistics contain a house type that is not implemented.
+
+    Returns:
+        np.ndarray: ages of the users of all houses
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    house_types = chooser(data=statistics.household, myproperty='households', size=num_houses, rng=rng)
+
+    ages = []
+    for house_type in np.unique(house_types):
+        n = int(np.sum(house_types == house_type))
+        household = statistics.household[house_type]
+        job_stats = normalize(pd.Series(household['job']))
+        age_stats = normalize(pd.Series(household['division_age']))
+        gender_stats = normalize(pd.Series(household['division_gender']))
+
+        if house_type == 'one_person':
+            age = chooser(data=age_stats, size=n, rng=rng)
+            gender = chooser(data=gender_stats, size=n, rng=rng)
+            job = rng.uniform(size=n) < job_stats[gender].to_numpy()
+            ages.append(_with_job(age, job))
+
+        elif house_type == 'two_person':
+            age1 = chooser(data=age_stats, size=n, rng=rng)
+            age2 = chooser(data=age_stats, size=n, rng=rng)
+            u = rng.uniform(size=n)
+            job = chooser(data=job_stats, size=n, rng=rng)
+
+            # both adults share the job statistic, an adult living with a senior has a job with the conditional probability
+            adults = (age1 == 'adult') & (age2 == 'adult')
+            p1 = job_stats['only_male'] / (job_stats['only_male'] + job_stats['neither_person'])
+            p2 = job_stats['only_female'] / (job_stats['only_female'] + job_stats['neither_person'])
+            job1 = np.where(adults, np.isin(job, ['both', 'only_male']), (age1 == 'adult') & (age2 == 'senior') & (u < p1))
+            job2 = np.where(adults, np.isin(job, ['both', 'only_female']), (age2 == 'adult') & (age1 == 'senior') & (u < p2))
+            ages += [_with_job(age1, job1), _with_job(age2, job2)]
+
+        elif house_type == 'family':
+            averagenumpeople = household['people']
+            minnum = 2
+            maxnum = 5
+            num_people = rng.binomial(n=maxnum - minnum, p=(averagenumpeople - minnum) / (maxnum - minnum), size=n) + minnum
+
+            # a single mother (two people) or a father and a mother with children
+            single = num_people == 2
+            job = chooser(data=job_stats, size=n, rng=rng)
+            mother_job = np.where(single, rng.uniform(size=n) < job_stats[['both', 'only_female']].sum(),
+                                  np.isin(job, ['both', 'only_female']))
+            father_job = np.isin(job[~single], ['both', 'only_male'])
+            num_children = int(np.where(single, 1, num_people - 2).sum())
+            children = chooser(data=age_stats[['child', 'teen']], size=num_children, rng=rng)
+            ages += [_with_job(np.full(n, 'adult'), mother_job), _with_job(np.full(len(father_job), 'adult'), father_job), children]
+
+        else:
+            raise NotImplementedError('Household type is not implemented')
+
+    return np.concatenate(ages)
+
+
+def sample_presence(statistics: Statistics, ages, weekday: bool = True, rng: np.random.Generator = None) -> pd.DataFrame:
+    """Draws the presence times of many users at once.
+
+    The times are drawn from the same distributions and corrected in the same way as in `Presence`, but for all
+    users of an age in one call per distribution.
+
+    Args:
+        statistics (Statistics): statistics of the country.
+        ages (array_like): ages of the users (e.g., from `sample_user_ages`).
+        weekday (bool, optional): presence on a weekday or in the weekend. Defaults to True.
+        rng (np.random.Generator, optional): random number generator. Defaults to None (a new unseeded generator).
+
+    Returns:
+        pd.DataFrame: 'up', 'go', 'home' and 'sleep' in minutes from the start of the day, one row per user
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    ages = np.asarray(ages)
+
+    times = {}
+    for age in (np.unique(ages) if weekday else [None]):
+        users = np.flatnonzero(ages == age) if weekday else np.arange(len(ages))
+        for key, dist in presence_distributions(statistics, age, weekday).items():
+            times.setdefault(key, np.zeros(len(ages), dtype=int))
+            times[key][users] = np.round(dist.rvs(size=len(users), random_state=rng))
+
+    up = times['getting_up']
+    sleep = up - times['sleep'] + 24 * 60
+    go = np.where(times['leaving_house'] < up, up + 30, times['leaving_house'])
+    home = np.maximum(go + times['being_away'], go)
+    home = np.where(sleep < home, sleep - 30, home)
+
+    return pd.DataFrame({'up': up, 'go': go, 'home': home, 'sleep': sleep})
+
+
+def presence_pattern(presence: pd.DataFrame, peak=0.65, normal=0.335, away=0.0, night=0.015) -> pd.Series:
+    """Sums the presence pdfs (see `Presence.pdf`) of many users with a difference array.
+
+    The pdf of a user is constant between the (at most 16) presence times of the day, so it is described by a few
+    segments instead of 86400 seconds. The periods of the segments are resolved in the same order as in
+    `Presence.pdf`, the value of every segment is added at its start and subtracted at its end of a difference array,
+    and the cumulative sum gives the sum of the pdfs of all users.
+
+    Args:
+        presence (pd.DataFrame): presence times in minutes, see `sample_presence`.
+        peak, normal, away, night (float, optional): weights of the periods, see `User.compute_presence`.
+
+    Returns:
+        pd.Series: sum of the presence pdfs per second of the day
+    """
+    minutes_per_day = 24 * 60
+    up, go, home, sleep = (presence[key].to_numpy(dtype=int) for key in ['up', 'go', 'home', 'sleep'])
+
+    # periods (start, end) in the order in which they are assigned in `Presence.pdf`, later periods overwrite earlier ones
+    periods = [(_NORMAL, up + 30, go - 30), (_NORMAL, home + 30, sleep - 30), (_PEAK, up, up + 30), (_PEAK, go - 30, go),
+               (_PEAK, home, home + 30), (_PEAK, sleep - 30, sleep), (_NIGHT, sleep, up), (_AWAY, go, home)]
+    starts = np.stack([start % minutes_per_day for _, start, _ in periods], axis=1)
+    ends = np.stack([end % minutes_per_day for _, _, end in periods], axis=1)
+
+    # segments between all times of a user, every segment belongs to (at most) one period
+    n = len(presence)
+    bounds = np.sort(np.concatenate([np.zeros((n, 1), dtype=int), starts, ends, np.full((n, 1), minutes_per_day)], axis=1), axis=1)
+    seg_start, seg_end = bounds[:, :-1], bounds[:, 1:]
+    labels = np.full(seg_start.shape, -1)
+    for i, (period, _, _) in enumerate(periods):
+        a, b = starts[:, [i]], ends[:, [i]]
+        covered = np.where(a < b, (seg_start >= a) & (seg_start < b), (a > b) & ((seg_start >= a) | (seg_start < b)))
+        labels[covered] = period
+
+    # minutes per period; `Presence.pdf` also counts the period of minute 1440, which is the one of minute 1439
+    lengths = np.stack([np.where(labels == period, seg_end - seg_start, 0).sum(axis=1) for period in range(_AWAY)], axis=1)
+    counts = lengths.astype(float)
+    last = labels[:, -1]
+    counts[np.flatnonzero((last >= 0) & (last < _AWAY)), last[(last >= 0) & (last < _AWAY)]] += 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        counts /= counts.sum(axis=1, keepdims=True)
+        weights = np.zeros((n, _AWAY))
+        for period, weight in ((_PEAK, peak), (_NORMAL, normal), (_NIGHT, night)):
+            weights[:, period] = np.where(counts[:, period] > 0, weight / counts[:, period], 0.0)
+        weights /= 60 * (weights * lengths).sum(axis=1, keepdims=True)  # normalize
+    weights = np.nan_to_num(weights, nan=0.0, posinf=0.0, neginf=0.0)
+
+    # value per second of every segment, zero for the time away and for minutes without period
+    values = np.where((labels >= 0) & (labels < _AWAY), np.take_along_axis(weights, np.clip(labels, 0, _AWAY - 1), axis=1), 0.0)
+    diff = np.bincount(seg_start.ravel(), weights=values.ravel(), minlength=minutes_per_day + 1)
+    diff -= np.bincount(seg_end.ravel(), weights=values.ravel(), minlength=minutes_per_day + 1)
+    pattern = np.cumsum(diff)[:minutes_per_day]
+
+    return pd.Series(np.repeat(pattern, 60), index=_SECONDS_OF_DAY)
+
+
+def create_diurnal_pattern(statistics: Statistics, num_houses: int = 500, weekday: bool = True, seed: int = None) -> pd.Series:
+    """Estimates the diurnal pattern (household presence) by summing the presence pdfs of the users of many houses.
+
+    The ages and presence times of all users are drawn at once (see `sample_user_ages` and `sample_presence`) and
+    their pdfs are summed with a difference array (see `presence_pattern`), so no `House` objects are built.
+
+    Args:
+        statistics (Statistics): statistics of the country.
+        num_houses (int, optional): number of sampled houses. Defaults to 500.
+        weekday (bool, optional): pattern of a weekday or of the weekend. Defaults to True.
+        seed (int, optional): seed of the random number generator. Defaults to None.
+
+    Returns:
+        pd.Series: sum of the presence pdfs of all users per second of the day
+    """
+    rng = np.random.default_rng(seed)
+    ages = sample_user_ages(statistics, num_houses, rng=rng)
+    presence = sample_presence(statistics, ages, weekday=weekday, rng=rng)
+    return presence_pattern(presence)
 
 def create_usage_data(houses: Union[list, House]): #TODO I am not able to tell that it should be a list[str], list[House] or House
     if type(houses) == list:
@@ -0,0 +1,179 @@
+import os
+import numpy as np
+import pandas as pd
+import xarray as xr
+from dataclasses import dataclass, field
+
+from pysimdeum.api import accumulate_multi_hh
+from pysimdeum.core.house import House
+
+
+def house_dataset(house: House) -> xr.Dataset:
+    """Reducer that reduces a simulated house to the dataset that is stored in a `ResultStore`.
+
+    The consumption (and discharge, if simulated) is summed over the users and put on the end-uses of the statistics,
+    so every house has the same shape no matter which appliances it has. End-uses the house does not have are zero.
+
+    Args:
+        house (House): simulated house.
+
+    Returns:
+        xr.Dataset: 'consumption' with dimensions ['time', 'enduse', 'patterns', 'flowtypes'] and, if simulated,
+        'discharge' with dimensions ['time', 'enduse', 'patterns', 'dischargetypes']
+    """
+    enduses = list(house.statistics.end_uses)
+    consumption = house.consumption if house.events is None else house.dense_consumption()
+    data = {'consumption': consumption.sum('user', keep_attrs=True).reindex(enduse=enduses, fill_value=0)}
+    if isinstance(house.discharge, xr.Dataset) and 'discharge' in house.discharge:
+        data['discharge'] = house.discharge['discharge'].sum('user', keep_attrs=True).reindex(enduse=enduses, fill_value=0)
+
+    return xr.Dataset(data)
+
+
+@dataclass
+class ResultStore:
+    """Chunked, compressed on-disk store (Zarr) of the output of many houses.
+
+    Houses are collected in a buffer and appended to the store along the 'house' dimension in bulk, one buffer of
+    `house_chunk` houses at a time, so writing stays a sequential append no matter the number of houses. Every house
+    has a 'subcatchment' coordinate, so a subcatchment can be read lazily without loading the other houses (see
+    `read_subcatchment`). Houses that are appended grouped by subcatchment end up in the same chunks.
+
+    The store can be used as accumulator of `accumulate_multi_hh` with `house_dataset` as reducer, see `write_store`.
+    Writing requires the optional dependency `zarr`.
+
+    Args:
+        path (str): path of the Zarr store.
+        groups (dict, optional): household ids as keys and subcatchment ids as values. Defaults to None (no subcatchments).
+        time_chunk (int, optional): number of time steps per chunk. Defaults to 3600.
+        house_chunk (int, optional): number of houses per chunk and per append. Defaults to 64.
+        mode (str, optional): 'w' to overwrite an existing store, 'a' to append to it. Defaults to 'w'.
+    """
+
+    path: str
+    groups: dict = None
+    time_chunk: int = 3600
+    house_chunk: int = 64
+    mode: str = 'w'
+
+    _buffer: list = field(default_factory=list, init=False, repr=False)
+    _time: pd.Index = field(default=None, init=False, repr=False)
+    _created: bool = field(default=False, init=False, repr=False)
+
+    def __post_init__(self):
+        if self.mode not in ('w', 'a'):
+            raise ValueError(f"Mode {self.mode} unknown, choose from 'w' and 'a'.")
+        if self.mode == 'a' and os.path.exists(self.path):
+            self._time = open_store(self.path).indexes['time']
+            self._created = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __call__(self, household_id, result) -> None:
+        """Adds a house to the store.
+
+        Args:
+            household_id: identifier of the household.
+            result (House | xr.Dataset): simulated house or its reduced output (see `house_dataset`).
+        """
+        if isinstance(result, House):
+            result = house_dataset(result)
+        self._buffer.append((household_id, result))
+        if len(self._buffer) >= self.house_chunk:
+            self.flush()
+
+    def flush(self) -> None:
+        """Appends the buffered houses to the store."""
+
+        if not self._buffer:
+            return
+
+        ids, datasets = zip(*self._buffer)
+        time = datasets[0].indexes['time']
+        if self._time is None:
+            self._time = time
+        for dataset in datasets:
+            if not dataset.indexes['time'].equals(self._time):
+                raise ValueError('All houses in a store have to be simulated over the same time steps.')
+
+        ds = xr.concat(datasets, dim='house', join='exact')
+        ds = ds.assign_coords(house=np.array([str(x) for x in ids], dtype=object),
+                              subcatchment=('house', np.array([self._group(x) for x in ids], dtype=object)))
+        # store labels as variable-length strings, so longer labels can be appended later
+        ds = ds.assign_coords({name: coord.astype(object) for name, coord in ds.coords.items() if coord.dtype.kind == 'U'})
+
+        if self._created:
+            ds.to_zarr(self.path, append_dim='house', consolidated=False)
+        else:
+            encoding = {}
+            for name, variable in ds.data_vars.items():
+                chunks = {'house': self.house_chunk, 'time': min(self.time_chunk, ds.sizes['time'])}
+                encoding[name] = {'chunks': tuple(chunks.get(dim, size) for dim, size in zip(variable.dims, variable.shape))}
+            ds.to_zarr(self.path, mode='w', encoding=encoding, consolidated=False)
+            self._created = True
+
+        self._buffer = []
+
+    def close(self) -> None:
+        """Appends the houses that are still buffered to the store."""
+
+        self.flush()
+
+    def _group(self, household_id) -> str:
+        if self.groups is None or household_id not in self.groups:
+            return ''
+        return str(self.groups[household_id])
+
+
+def write_store(household_data, path: str, groups: dict = None, time_chunk: int = 3600, house_chunk: int = 64, **kwargs) -> ResultStore:
+    """Simulates multiple houses and writes them one chunk after the other into a `ResultStore`.
+
+    Args:
+        household_data (dict | iterable): household ids as keys and house types as values, or (household id, house type) pairs.
+        path (str): path of the Zarr store, an existing store is overwritten.
+        groups (dict, optional): household ids as keys and subcatchment ids as values. Defaults to None.
+        time_chunk (int, optional): number of time steps per chunk. Defaults to 3600.
+        house_chunk (int, optional): number of houses per chunk and per append. Defaults to 64.
+        **kwargs: simulation options, see `build_multi_hh`.
+
+    Returns:
+        ResultStore: the (closed) store
+    """
+    with ResultStore(path, groups=groups, time_chunk=time_chunk, house_chunk=house_chunk) as store:
+        accumulate_multi_hh(household_data, accumulator=store, reducer=house_dataset, **kwargs)
+
+    return store
+
+
+def open_store(path: str) -> xr.Dataset:
+    """Opens a `ResultStore` lazily, data is only read from disk when it is accessed.
+
+    Args:
+        path (str): path of the Zarr store.
+
+    Returns:
+        xr.Dataset: 'consumption' (and 'discharge') with 'house' as first dimension and 'subcatchment' as coordinate
+    """
+    return xr.open_zarr(path, chunks=None, consolidated=False)
+
+
+def read_subcatchment(path: str, subcatchment_id) -> xr.Dataset:
+    """Lazily selects the houses of one subcatchment from a `ResultStore`.
+
+    Only the 'subcatchment' coordinate is read to find the houses, the data of the houses is read from disk when it
+    is accessed (e.g., with `.load()` or `.sum('house')`).
+
+    Args:
+        path (str): path of the Zarr store.
+        subcatchment_id: identifier of the subcatchment.
+
+    Returns:
+        xr.Dataset: the houses of the subcatchment
+    """
+    ds = open_store(path)
+    houses = np.flatnonzero(ds['subcatchment'].values == str(subcatchment_id))
+    return ds.isel(house=houses)
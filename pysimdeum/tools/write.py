@@ -1,9 +1,10 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from typing import Union
 
 from pysimdeum.tools.helper import create_usage_data
-from pysimdeum.core.house import HousePattern, Property, House
+from pysimdeum.core.house import House, load_house_patterns
 
 def export_water_use_distribution(inputproperty: Union[list, House], name: str='ApplianceWaterUse.xlsx'):
     appliance_data, total_water_usage, total_users, total_number_of_days = create_usage_data(inputproperty)
@@ -57,67 +58,103 @@ def write_simdeum_hot_patterns_to_xlsx(houses: list, timestep: int, Q_option: st
     output.to_excel(output_file)
 
 def __get_output_dataframe(houses, timestep, flowtype):
-    if type(houses[0]) == str:
-        count = 0
-        output = pd.DataFrame()
-        if '.housepattern' in houses[0]: #it are housepattern files
-            for housepattern in houses:
-                loadedhousepattern = HousePattern(housepattern)
-                __get_housepattern_output(count, output, loadedhousepattern, flowtype)
-                count +=1
-        else: #assumed to be house files
-            for house in houses:
-                prop = Property()
-                loadedhouse = prop.built_house(housefile=house)
-                __get_house_output(count, output, loadedhouse, flowtype)
-                count +=1
-        summedoutput = pd.DataFrame()
-        summedoutput['date'] = output['date'].values[0::timestep]
-        for column in output.columns:
-            if column != 'date':
-                summedoutput[column] = output[column].groupby(output.index // timestep).sum().values
-        return summedoutput
-
-    else: #.houses
-        count = 0
-        output = pd.DataFrame()
-        for house in houses:
-            __get_house_output(count, output, house, flowtype)
-            count += 1
-        summedoutput = pd.DataFrame()
-        summedoutput['date'] = output['date'].values[0::timestep]
-        for column in output.columns:
-            if column != 'date':
-                summedoutput[column] = output[column].groupby(output.index // timestep).sum().values
-        return summedoutput
-
-def __get_house_output(count, output, loadedhouse, flowtype):
-    if count == 0:
-        datelist = []
-        valueslist = []
-        for i in range(0, len(loadedhouse.consumption.patterns)):
-            datelist.extend(loadedhouse.consumption['time'].values)
-            valueslist.extend(loadedhouse.consumption.sel(patterns=i).sel(flowtypes=flowtype).sum('user').sum('enduse').values)
-        output['date'] = datelist
-    else:
-        valueslist = []
-        for i in range(0, len(loadedhouse.consumption.patterns)):
-            valueslist.extend(loadedhouse.consumption.sel(patterns=i).sel(flowtypes=flowtype).sum('user').sum('enduse').values)
-    output['pysimdeum ' + str(count)] = valueslist
-
-def __get_housepattern_output(count, output, loadedhousepattern, flowtype):
-    if count == 0:
-        datelist = []
-        valueslist = []
-        for i in range(0, len(loadedhousepattern.consumption.patterns)):
-            datelist.extend(loadedhousepattern.consumption['time'].values)
-            valueslist.extend(loadedhousepattern.consumption.sel(patterns=i).sel(flowtypes=flowtype).values)
-        output['date'] = datelist
-    else:
-        valueslist = []
-        for i in range(0, len(loadedhousepattern.consumption.patterns)):
-            valueslist.extend(loadedhousepattern.consumption.sel(patterns=i).sel(flowtypes=flowtype).values)
-    output['pysimdeum ' + str(count)] = valueslist
+    # houses can be simulated houses, housepatterns or a list of .housepattern or .house files
+    dates, values = summed_patterns(houses, timestep, flowtype=flowtype)
+    output = pd.DataFrame(values, columns=['pysimdeum ' + str(count) for count in range(values.shape[1])])
+    output.insert(0, 'date', dates)
+    return output
+
+
+def iter_summed_patterns(houses: list, timestep: int, flowtype: str = 'totalflow', chunksize: int = 1000):
+    """Sums the water use patterns of many houses per timestep, `chunksize` timesteps at a time.
+
+    The patterns of a house follow each other in time, as in the exports to Excel. The houses are loaded into a
+    memory-mapped array (see `load_house_patterns`) and every chunk of timesteps is summed directly from the
+    memory-mapped rows (a reshaped view, without copy), so only the summed chunk is held in memory. Houses simulated
+    at a coarser `resolution` are summed per `timestep // resolution` rows; the sums are volumes per timestep for
+    1 s flows and for binned volumes alike.
+
+    Args:
+        houses (list): simulated houses, HousePatterns, or paths of `.housepattern` or `.house` files.
+        timestep (int): number of seconds that are summed to one value, a multiple of the resolution of the houses.
+        flowtype (str, optional): flow type to sum. Defaults to 'totalflow'.
+        chunksize (int, optional): number of timesteps per chunk. Defaults to 1000.
+
+    Raises:
+        ValueError: If the timestep is not a multiple of the resolution of the houses.
+
+    Yields:
+        tuple: dates of the first second of every timestep (np.ndarray) and the summed flow (np.ndarray, timesteps x houses)
+    """
+    patterns = load_house_patterns(houses, flowtype=flowtype)
+    resolution = patterns.attrs['resolution']
+    if timestep % resolution:
+        raise ValueError(f'Timestep of {timestep} s is not a multiple of the resolution of the houses ({resolution} s).')
+    rows = timestep // resolution  # rows per timestep
+
+    values = patterns.values.reshape(len(patterns), -1)  # house x time, the patterns of a house one after the other
+    length = values.shape[1]
+    time = patterns['time'].values
+
+    for start in range(0, length, chunksize * rows):
+        end = min(start + chunksize * rows, length)
+        steps = (end - start) // rows
+        chunk = values[:, start:start + steps * rows].reshape(len(values), steps, rows)
+        summed = [chunk.sum(axis=2, dtype=np.float64)]
+        if start + steps * rows < end:  # the last timestep is shorter
+            summed.append(values[:, start + steps * rows:end].sum(axis=1, dtype=np.float64)[:, np.newaxis])
+        summed = np.concatenate(summed, axis=1).T
+        yield time[np.arange(start, end, rows) % len(time)], summed
+
+
+def summed_patterns(houses: list, timestep: int, flowtype: str = 'totalflow', chunksize: int = 1000) -> tuple:
+    """Sums the water use patterns of many houses per timestep (see `iter_summed_patterns`).
+
+    Args:
+        houses (list): simulated houses, HousePatterns, or paths of `.housepattern` or `.house` files.
+        timestep (int): number of seconds that are summed to one value.
+        flowtype (str, optional): flow type to sum. Defaults to 'totalflow'.
+        chunksize (int, optional): number of timesteps summed at once. Defaults to 1000.
+
+    Returns:
+        tuple: dates of the first second of every timestep (np.ndarray) and the summed flow (np.ndarray, timesteps x houses)
+    """
+    dates, summed = zip(*iter_summed_patterns(houses, timestep, flowtype=flowtype, chunksize=chunksize))
+    return np.concatenate(dates), np.concatenate(summed)
+
+
+def write_patterns(houses: list, timestep: int, output_file: str, flowtype: str = 'totalflow', chunksize: int = 1000):
+    """Exports the water use patterns of many houses to a CSV or Parquet file.
+
+    The patterns are summed per timestep (see `iter_summed_patterns`) and every chunk of `chunksize` rows is written
+    as soon as it is summed, with the same columns as the Excel exports ('date' and one column 'pysimdeum i' per
+    house). Parquet requires `pyarrow`.
+
+    Args:
+        houses (list): simulated houses, HousePatterns, or paths of `.housepattern` or `.house` files.
+        timestep (int): time resolution (in seconds) of the exported patterns.
+        output_file (str): name of the output file, written as Parquet if it ends with '.parquet', otherwise as CSV.
+        flowtype (str, optional): flow type to export. Defaults to 'totalflow'.
+        chunksize (int, optional): number of rows written at once. Defaults to 1000.
+    """
+    parquet = output_file.endswith('.parquet')
+    writer = None
+
+    for i, (dates, values) in enumerate(iter_summed_patterns(houses, timestep, flowtype=flowtype, chunksize=chunksize)):
+        output = pd.DataFrame(values, columns=['pysimdeum ' + str(count) for count in range(values.shape[1])])
+        output.insert(0, 'date', dates)
+        if parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(output, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output_file, table.schema)
+            writer.write_table(table)
+        else:
+            output.to_csv(output_file, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+
+    if writer is not None:
+        writer.close()
 
 
 def generate_infoworks_csv(subcatchment_profiles, output_dir):
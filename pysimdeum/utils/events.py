@@ -0,0 +1,367 @@
+import bisect
+import numpy as np
+import pandas as pd
+import xarray as xr
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class EventLog:
+    """Sparse (event-based) representation of the water consumption of a house.
+
+    Instead of writing every second of a water-use event into a dense array of shape
+    (time x user x enduse x patterns x flowtypes), every event is stored as a single row
+    (start, end, user, enduse, pattern, intensity, hot_fraction). The dense `xarray.DataArray`, as produced by
+    `House.simulate`, is only built when asked for with `to_dataarray`.
+
+    Events with a varying intensity (e.g., the cycles of a washing machine) are split into runs of constant
+    intensity, so every row describes a block of constant flow. Only the flow channels in `flowtypes` are built.
+    """
+
+    time: pd.DatetimeIndex
+    users: list
+    enduses: list
+    patterns: list
+    flowtypes: list = field(default_factory=lambda: ['totalflow', 'hotflow'])
+    dtype: Any = np.float64
+    binsize: int = 1  # seconds per time step of the dense array, see `BinnedArray`
+    columns = ['start', 'end', 'user', 'enduse', 'pattern', 'intensity', 'hot_fraction']
+
+    _rows: list = field(default_factory=list, init=False, repr=False)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def record(self, start: int, end: int, user: int, enduse: int, pattern: int, intensity, hot_fraction: float = 0.0) -> None:
+        """Add a water-use event to the log.
+
+        Args:
+            start (int): start of the event in seconds from the beginning of the simulation.
+            end (int): end of the event in seconds from the beginning of the simulation (exclusive).
+            user (int): index of the user (the last index is the household).
+            enduse (int): index of the end-use appliance.
+            pattern (int): pattern number.
+            intensity (float | np.ndarray): flow of the event, either constant or one value per second.
+            hot_fraction (float, optional): fraction of the flow that is hot water. Defaults to 0.0.
+        """
+        start, end = int(start), int(end)
+        if end <= start:
+            return
+
+        if np.ndim(intensity) == 0:
+            self._rows.append((start, end, user, enduse, pattern, float(intensity), float(hot_fraction)))
+            return
+
+        # split the per-second intensity into runs of constant flow
+        values = np.asarray(intensity, dtype=float)[:end - start]
+        bounds = np.concatenate(([0], np.flatnonzero(np.diff(values)) + 1, [len(values)]))
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            self._rows.append((start + int(a), start + int(b), user, enduse, pattern, float(values[a]), float(hot_fraction)))
+
+    def record_many(self, start, end, user, enduse, pattern, intensity, hot_fraction=0.0) -> None:
+        """Add many water-use events of constant intensity to the log at once.
+
+        The rows are the same as those of calling `record` for every event, in the same order.
+
+        Args:
+            start (np.ndarray): start of the events in seconds from the beginning of the simulation.
+            end (np.ndarray): end of the events in seconds from the beginning of the simulation (exclusive).
+            user (np.ndarray | int): index of the user of every event.
+            enduse (np.ndarray | int): index of the end-use appliance of every event.
+            pattern (np.ndarray | int): pattern number of every event.
+            intensity (np.ndarray | float): constant flow of every event.
+            hot_fraction (np.ndarray | float, optional): fraction of the flow that is hot water. Defaults to 0.0.
+        """
+        start, end = np.asarray(start, dtype=int), np.asarray(end, dtype=int)
+        valid = end > start
+        columns = [np.broadcast_to(column, start.shape)[valid] for column in (user, enduse, pattern)]
+        flows = [np.broadcast_to(np.asarray(column, dtype=float), start.shape)[valid] for column in (intensity, hot_fraction)]
+        self._rows.extend(zip(*(column.tolist() for column in [start[valid], end[valid]] + columns + flows)))
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Returns the event log as a pandas DataFrame with one row per event and user and end-use names resolved."""
+
+        df = pd.DataFrame(self._rows, columns=self.columns)
+        df['user'] = np.asarray(self.users, dtype=object)[df['user'].to_numpy(dtype=int)]
+        df['enduse'] = np.asarray(self.enduses, dtype=object)[df['enduse'].to_numpy(dtype=int)]
+        return df
+
+    def to_dataarray(self, dtype=None) -> xr.DataArray:
+        """Builds the dense consumption array from the event log.
+
+        Events are written in the order in which they were recorded, so the result is identical to the array that
+        is filled directly by a dense simulation. With a `binsize` above 1 second the volumes of the events are
+        accumulated per time bin (see `BinnedArray`).
+
+        Args:
+            dtype (optional): data type of the dense array. Defaults to None (`dtype` of the event log).
+
+        Returns:
+            xr.DataArray: consumption with dimensions ['time', 'user', 'enduse', 'patterns', 'flowtypes']
+        """
+        dtype = self.dtype if dtype is None else dtype
+        shape = (len(self.time), len(self.users), len(self.enduses), len(self.patterns))
+        data = allocate_channels(shape, self.flowtypes, dtype=dtype, binsize=self.binsize)
+        for start, end, j, k, p, intensity, hot_fraction in self._rows:
+            flows = {'totalflow': intensity, 'hotflow': intensity * hot_fraction}
+            for channel, flowtype in enumerate(self.flowtypes):
+                data[start:end, j, k, p, channel] = flows[flowtype]
+
+        if isinstance(data, ChannelArray):
+            data = data.data
+
+        return xr.DataArray(data=data,
+                            coords=[self.time[::self.binsize], self.users, self.enduses, self.patterns, self.flowtypes],
+                            dims=['time', 'user', 'enduse', 'patterns', 'flowtypes'], attrs=resolution_attrs(self.binsize))
+
+
+    def totals(self) -> xr.DataArray:
+        """Sums the events over all users and end-uses per time step and pattern, without building the dense array.
+
+        Every second of every event is added to its time step (and pattern) with `np.bincount`, so the work and memory
+        grow with the number of event seconds and the length of the output, not with the number of users and end-uses.
+        Events of the same user, end-use and pattern that overlap overwrite each other in the dense array; in that
+        (rare) case the totals are taken from `to_dataarray` to keep them identical.
+
+        Returns:
+            xr.DataArray: consumption with dimensions ['time', 'patterns', 'flowtypes']
+        """
+        rows = np.array(self._rows, dtype=float).reshape(-1, len(self.columns))
+        length, num_patterns = len(self.time), len(self.patterns)
+        start = rows[:, 0].astype(int)
+        end = np.minimum(rows[:, 1].astype(int), length)
+        user, enduse, pattern = rows[:, 2:5].astype(int).T
+
+        order = np.lexsort((start, pattern, enduse, user))
+        same_cell = (np.diff(user[order]) == 0) & (np.diff(enduse[order]) == 0) & (np.diff(pattern[order]) == 0)
+        if np.any(same_cell & (start[order][1:] < end[order][:-1])):
+            return self.to_dataarray().sum(['user', 'enduse'], keep_attrs=True)
+
+        # index of every event second in the (time step x pattern) output
+        lengths = np.maximum(end - start, 0)
+        event = np.repeat(np.arange(len(rows)), lengths)
+        seconds = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + start[event]
+        bins = -(-length // self.binsize)
+        index = seconds // self.binsize * num_patterns + pattern[event]
+
+        flows = {'totalflow': rows[:, 5], 'hotflow': rows[:, 5] * rows[:, 6]}
+        data = np.stack([np.bincount(index, weights=flows[flowtype][event], minlength=bins * num_patterns)
+                         for flowtype in self.flowtypes], axis=-1).reshape(bins, num_patterns, len(self.flowtypes))
+
+        return xr.DataArray(data=data.astype(self.dtype), coords=[self.time[::self.binsize], self.patterns, self.flowtypes],
+                            dims=['time', 'patterns', 'flowtypes'], attrs=resolution_attrs(self.binsize))
+
+
+class ChannelArray:
+    """Dense array of which only a selection of the channels (last axis, e.g. flow types) is allocated.
+
+    It is indexed like the full array, with the channel as last (integer) index. Writes to channels that are not
+    allocated are dropped and reads from them return zeros, so the end-uses can fill it like a full array.
+
+    Args:
+        shape (tuple): shape of the full array, without the channel axis.
+        channels (list): names of all channels, in the order used for indexing.
+        selected (list): names of the channels to allocate, in the order of the allocated array.
+        dtype (optional): data type of the array. Defaults to np.float64.
+    """
+
+    def __init__(self, shape, channels, selected, dtype=np.float64):
+        if not selected:
+            raise ValueError('At least one channel has to be selected.')
+        self.data = np.zeros(tuple(shape) + (len(selected),), dtype=dtype)
+        self._channels = {channels.index(name): i for i, name in enumerate(selected)}
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, key):
+        *index, channel = key
+        if channel not in self._channels:
+            return np.zeros_like(self.data[(*index, 0)])
+        return self.data[(*index, self._channels[channel])]
+
+    def __setitem__(self, key, value):
+        *index, channel = key
+        if channel in self._channels:
+            self.data[(*index, self._channels[channel])] = value
+
+
+class BinnedArray(ChannelArray):
+    """Array that accumulates per-second writes into time bins of `binsize` seconds.
+
+    It is indexed with seconds like the full 1 s array, but only one value per bin is allocated: the volume of the
+    bin, i.e. the sum of the bin in the full array. Per cell, the written seconds are kept as sorted segments, so a
+    write overwrites earlier writes to the same seconds (as in the full array). Single seconds can be read, as
+    `offset_simultaneous_discharge` does to find the next second without discharge.
+
+    The segments are kept in a dict of Python lists, which grows with the number of written events (a few tuples per
+    event), not with the number of seconds.
+
+    Args:
+        shape (tuple): shape of the full 1 s array, without the channel axis.
+        channels (list): names of all channels, in the order used for indexing.
+        selected (list, optional): names of the channels to allocate. Defaults to None (all channels).
+        dtype (optional): data type of the array. Defaults to np.float64.
+        binsize (int, optional): number of seconds per bin. Defaults to 60.
+    """
+
+    def __init__(self, shape, channels, selected=None, dtype=np.float64, binsize=60):
+        self.length = shape[0]
+        self.binsize = binsize
+        bins = -(-self.length // binsize)
+        super().__init__((bins,) + tuple(shape[1:]), channels, list(channels) if selected is None else selected, dtype=dtype)
+        self._segments = {}  # ... per cell: sorted starts, ends and (value, origin) of the written seconds
+
+    def __len__(self) -> int:
+        return self.length
+
+    def _seconds(self, time) -> tuple:
+        if isinstance(time, slice):
+            start, end, _ = time.indices(self.length)
+            return start, end
+        time = int(time)
+        time = time + self.length if time < 0 else time
+        return time, time + 1
+
+    @staticmethod
+    def _flows(value, origin, start, end) -> np.ndarray:
+        if np.ndim(value) == 0:
+            return np.full(end - start, float(value))
+        return np.asarray(value[start - origin:end - origin], dtype=float)
+
+    def _accumulate(self, cell, start, end, flows) -> None:
+        first = start // self.binsize
+        volumes = np.bincount(np.arange(start, end) // self.binsize - first, weights=flows)
+        self.data[(slice(first, first + len(volumes)),) + cell] += volumes
+
+    def __getitem__(self, key):
+        *index, channel = key
+        if isinstance(index[0], slice):
+            raise TypeError('Only single seconds can be read from a BinnedArray.')
+        if channel not in self._channels:
+            return 0.0
+        time, _ = self._seconds(index[0])
+        starts, ends, values = self._segments.get((*index[1:], channel), ([], [], []))
+        i = bisect.bisect_right(ends, time)
+        if i < len(starts) and starts[i] <= time:
+            value, origin = values[i]
+            return value if np.ndim(value) == 0 else value[time - origin]
+        return 0.0
+
+    def __setitem__(self, key, value):
+        *index, channel = key
+        if channel not in self._channels:
+            return
+        start, end = self._seconds(index[0])
+        if end <= start:
+            return
+
+        cell = (*index[1:], self._channels[channel])
+        starts, ends, values = self._segments.setdefault((*index[1:], channel), ([], [], []))
+
+        # remove the volume of the seconds that are overwritten and keep the parts of the segments outside the write
+        i = bisect.bisect_right(ends, start)
+        j = i
+        kept = []
+        while j < len(starts) and starts[j] < end:
+            a, b, (old, origin) = starts[j], ends[j], values[j]
+            self._accumulate(cell, max(a, start), min(b, end), -self._flows(old, origin, max(a, start), min(b, end)))
+            if a < start:
+                kept.append((a, start, (old, origin)))
+            if b > end:
+                kept.append((end, b, (old, origin)))
+            j += 1
+
+        kept.append((start, end, (value, start)))
+        kept.sort(key=lambda segment: segment[0])
+        starts[i:j] = [segment[0] for segment in kept]
+        ends[i:j] = [segment[1] for segment in kept]
+        values[i:j] = [segment[2] for segment in kept]
+
+        self._accumulate(cell, start, end, self._flows(value, start, start, end))
+
+
+def resolution_attrs(binsize: int = 1) -> dict:
+    """Attributes that mark the time step and unit of a simulated consumption or discharge array.
+
+    At 1 s the values are flows (l/s), at a coarser resolution they are volumes per time step (l), see `BinnedArray`.
+    Arrays without these attributes (e.g., of older pickled houses) are 1 s flows.
+
+    Args:
+        binsize (int, optional): number of seconds per time step. Defaults to 1.
+
+    Returns:
+        dict: 'resolution' (seconds per time step) and 'units'
+    """
+    return {'resolution': int(binsize), 'units': 'l/s' if binsize == 1 else 'l'}
+
+
+def select_channels(channels, selected=None) -> list:
+    """Validates a selection of channels.
+
+    Args:
+        channels (list): names of all channels.
+        selected (list, optional): names of the selected channels. Defaults to None (all channels).
+
+    Raises:
+        ValueError: If an unknown channel is selected.
+
+    Returns:
+        list: names of the selected channels
+    """
+    selected = list(channels) if selected is None else list(selected)
+    unknown = set(selected) - set(channels)
+    if unknown:
+        raise ValueError(f'Unknown channels {sorted(unknown)}, choose from {list(channels)}.')
+    return selected
+
+
+def allocate_channels(shape, channels, selected=None, dtype=np.float64, binsize=1):
+    """Allocates a dense array with the selected channels as last axis.
+
+    Args:
+        shape (tuple): shape of the array (time in seconds first), without the channel axis.
+        channels (list): names of all channels.
+        selected (list, optional): names of the channels to allocate. Defaults to None (all channels).
+        dtype (optional): data type of the array. Defaults to np.float64.
+        binsize (int, optional): number of seconds per time step, see `BinnedArray`. Defaults to 1.
+
+    Raises:
+        ValueError: If an unknown channel is selected.
+
+    Returns:
+        numpy.ndarray | ChannelArray: a plain numpy array if all channels are selected at 1 s, otherwise a
+        `ChannelArray` or `BinnedArray`.
+    """
+    selected = select_channels(channels, selected)
+    if binsize > 1:
+        return BinnedArray(shape, list(channels), selected, dtype=dtype, binsize=binsize)
+    if selected == list(channels):
+        return np.zeros(tuple(shape) + (len(channels),), dtype=dtype)
+    return ChannelArray(shape, list(channels), selected, dtype=dtype)
+
+
+def record_consumption(consumption, start, end, j, ind_enduse, pattern_num, intensity, hot_fraction=0.0):
+    """Writes a consumption event either into a dense consumption array or into an `EventLog`.
+
+    Args:
+        consumption (numpy.ndarray | EventLog): The array or event log storing the consumption data.
+        start (int): The start time of the event in seconds from the beginning of the simulation.
+        end (int): The end time of the event in seconds from the beginning of the simulation.
+        j (int): The index of the user.
+        ind_enduse (int): The index of the end-use appliance.
+        pattern_num (int): The pattern number.
+        intensity (float | numpy.ndarray): The flow of the event, constant or per second.
+        hot_fraction (float, optional): The fraction of hot water of the flow. Defaults to 0.0.
+
+    Returns:
+        numpy.ndarray | EventLog: The updated consumption.
+    """
+    if isinstance(consumption, EventLog):
+        consumption.record(start, end, j, ind_enduse, pattern_num, intensity, hot_fraction)
+    else:
+        consumption[start:end, j, ind_enduse, pattern_num, 0] = intensity
+        consumption[start:end, j, ind_enduse, pattern_num, 1] = np.multiply(intensity, hot_fraction)
+
+    return consumption
@@ -1,15 +1,44 @@
+import numpy as np
 import geopandas as gpd
 
 def fix_invalid_geometries(gdf):
     """
     Fixes invalid geometries in a GeoDataFrame using the buffer(0) trick.
 
+    Only the invalid geometries are buffered, valid geometries are left as they are.
+
     Args:
         gdf (gpd.GeoDataFrame): The GeoDataFrame to fix.
 
     Returns:
         gpd.GeoDataFrame: The GeoDataFrame with fixed geometries.
     """
-    gdf['geometry'] = gdf['geometry'].buffer(0)
+    invalid = ~gdf['geometry'].is_valid
+    if invalid.any():
+        gdf.loc[invalid, 'geometry'] = gdf.loc[invalid, 'geometry'].buffer(0)
     
-    return gdf
\ No newline at end of file
+    return gdf
+
+def locate_points(points, polygons, chunksize=100000):
+    """
+    Finds the polygon that contains each point, using the spatial index (STRtree) of the polygons.
+
+    The points are queried in chunks of `chunksize`, so memory use stays bounded for very large layers. A point
+    that lies in (or on the edge of) several polygons is assigned to the first of them.
+
+    Args:
+        points (gpd.GeoSeries): The points to locate (e.g., representative points of buildings).
+        polygons (gpd.GeoSeries | gpd.GeoDataFrame): The polygons to locate the points in.
+        chunksize (int, optional): Number of points queried at once. Defaults to 100000.
+
+    Returns:
+        np.ndarray: The position of the containing polygon for every point, -1 if no polygon contains the point.
+    """
+    tree = polygons.sindex
+    located = np.full(len(points), len(polygons))
+    for start in range(0, len(points), chunksize):
+        point_index, polygon_index = tree.query(points.iloc[start:start + chunksize], predicate='intersects')
+        np.minimum.at(located, point_index + start, polygon_index)
+
+    located[located == len(polygons)] = -1
+    return located
@@ -1,31 +1,241 @@
+import bisect
 import numpy as np
 import pandas as pd
 from pysimdeum.utils.probability import normalize
+from pysimdeum.utils.events import record_consumption
 
 
-def sample_start_time(prob_joint, day_num, duration, previous_events):
+class StartTimeSampler:
+    """Draws start times (seconds of the day) from a probability distribution.
+
+    The cumulative distribution is computed once when the sampler is created, so every draw only costs a binary
+    search (`numpy.searchsorted`) instead of the validation and accumulation of the full distribution that
+    `numpy.random.Generator.choice` does on every call. Draws are identical to `rng.choice(len(prob), p=prob)`
+    for the same random number generator.
+
+    Args:
+        prob (numpy.ndarray): The (joint) probability distribution, e.g. one value per second of the day.
+    """
+
+    def __init__(self, prob):
+        cdf = np.cumsum(prob, dtype=float)
+        cdf /= cdf[-1]
+        cdf.flags.writeable = False  # samplers are shared by all patterns and days
+        self.cdf = cdf
+
+    def __len__(self) -> int:
+        return len(self.cdf)
+
+    def draw(self, size=None, rng=None):
+        """Draws one or many indices (start times) from the distribution.
+
+        Args:
+            size (int, optional): The number of draws. A single int is returned if None. Defaults to None.
+            rng (numpy.random.Generator, optional): The random number generator. The global numpy random state is used if None.
+
+        Returns:
+            int | numpy.ndarray: The drawn indices.
+        """
+        rng = np.random if rng is None else rng
+        index = np.searchsorted(self.cdf, rng.random(size), side='right')
+        return index if size is not None else int(index)
+
+    def draw_outside(self, blocked, rng=None) -> int:
+        """Draws a single index from the distribution with the blocked regions masked out.
+
+        Only the probability mass of the allowed regions is used, so the draw can never land in a blocked region.
+        This is equivalent to redrawing with `draw` until the index lies outside of all blocked regions.
+
+        Args:
+            blocked (list): Sorted, non-overlapping (start, end) index ranges (end exclusive) that may not be drawn.
+            rng (numpy.random.Generator, optional): The random number generator. The global numpy random state is used if None.
+
+        Raises:
+            ValueError: If no probability mass is left outside of the blocked regions.
+
+        Returns:
+            int: The drawn index.
+        """
+        rng = np.random if rng is None else rng
+        cdf = np.concatenate(([0.0], self.cdf))
+
+        # allowed regions are the gaps between the blocked regions
+        bounds = np.asarray([0] + [x for region in blocked for x in region] + [len(self)]).reshape(-1, 2)
+        lower, upper = cdf[bounds[:, 0]], cdf[bounds[:, 1]]
+        mass = np.cumsum(upper - lower)
+        if mass[-1] <= 0:
+            raise ValueError('No valid start time left, all probability mass is blocked by previous events.')
+
+        u = rng.random() * mass[-1]
+        region = min(int(np.searchsorted(mass, u, side='right')), len(mass) - 1)
+        u = lower[region] + u - (mass[region - 1] if region > 0 else 0.0)
+        index = int(np.searchsorted(self.cdf, u, side='right'))
+        return min(max(index, bounds[region, 0]), bounds[region, 1] - 1)
+
+
+class Occupancy:
+    """Sorted, non-overlapping time intervals [start, end) of the events that are already placed on an appliance.
+
+    Collisions of a new event with the placed events are answered with a binary search instead of a scan over all
+    events. Overlapping or touching intervals are merged when they are added, which does not change which new events
+    collide.
+
+    Args:
+        events (list, optional): (start, end) tuples of events that are already placed.
+    """
+
+    def __init__(self, events=()):
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(events):
+            self.add(start, end)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self):
+        return iter(zip(self.starts, self.ends))
+
+    def add(self, start: int, end: int) -> None:
+        """Adds the interval [start, end) of an event."""
+
+        i = bisect.bisect_left(self.ends, start)  # first interval that ends at or after start
+        j = bisect.bisect_right(self.starts, end)  # first interval that starts after end
+        if i < j:
+            start = min(start, self.starts[i])
+            end = max(end, self.ends[j - 1])
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    def collides(self, start: int, duration: int) -> bool:
+        """Checks if an event [start, start + duration) overlaps with (or ends exactly at the start of) a placed event."""
+
+        i = bisect.bisect_right(self.ends, start)  # first interval that ends after start
+        return i < len(self.starts) and self.starts[i] - duration <= start
+
+    def blocked(self, duration: int, offset: int, length: int) -> list:
+        """Returns the regions in which a new event of the given duration may not start.
+
+        Args:
+            duration (int): The duration of the new event.
+            offset (int): The time of index 0 of the regions (e.g., the start of the day).
+            length (int): The number of indices (e.g., seconds of the day), regions are clipped to [0, length).
+
+        Returns:
+            list: Sorted, non-overlapping (start, end) index ranges (end exclusive).
+        """
+        i = bisect.bisect_right(self.ends, offset)
+        j = bisect.bisect_left(self.starts, offset + length + duration)
+        regions = []
+        for start, end in zip(self.starts[i:j], self.ends[i:j]):
+            a, b = max(start - duration - offset, 0), min(end - offset, length)
+            if a >= b:
+                continue
+            if regions and a <= regions[-1][1]:
+                regions[-1] = (regions[-1][0], max(regions[-1][1], b))
+            else:
+                regions.append((a, b))
+        return regions
+
+
+def sample_start_time(prob_joint, day_num, duration, previous_events, rng=None):
     """
     Samples a valid start time for an event, ensuring no overlap with previous events
     and no start within duration before the last sampled start time.
 
     Args:
-        prob_joint (numpy.ndarray): The joint probability distribution.
+        prob_joint (numpy.ndarray | StartTimeSampler): The joint probability distribution or a sampler built from it.
         day_num (int): The current day number in the simulation.
         duration (int): The duration of the event.
-        previous_events (list): List of tuples containing start and end times of previous events.
+        previous_events (Occupancy | list): The start and end times of previous events.
+        rng (numpy.random.Generator, optional): The random number generator. The global numpy random state is used if None.
 
     Returns:
         int: The sampled start time.
         int: The calculated end time.
     """
-    while True:
-        start_index = np.random.choice(len(prob_joint), p=prob_joint)
-        start = start_index + int(pd.to_timedelta('1 day').total_seconds()) * day_num
+    sampler = prob_joint if isinstance(prob_joint, StartTimeSampler) else StartTimeSampler(prob_joint)
+    occupancy = previous_events if isinstance(previous_events, Occupancy) else Occupancy(previous_events)
+    offset = int(pd.to_timedelta('1 day').total_seconds()) * day_num
+    duration = int(duration)
+
+    start = sampler.draw(rng=rng) + offset
+
+    # Check for overlapping events or events within duration before the last sample start, on a collision the start
+    # time is drawn again with the blocked regions masked out of the distribution, so it can not be rejected again
+    if occupancy.collides(start, duration):
+        blocked = occupancy.blocked(duration, offset, len(sampler))
+        start = sampler.draw_outside(blocked, rng=rng) + offset
+
+    return int(start), int(start + duration)
+
+
+def sample_start_times(prob_joint, user, group, day_num, duration, max_iter=1000, rng=None):
+    """Vectorised counterpart of `sample_start_time` that samples the start times of many events at once.
+
+    Start times of all events are drawn in one call per user. Events of the same group (e.g., the same pattern and
+    day of an appliance) that collide are redrawn until no collisions are left. As in `sample_start_time`, events
+    are treated as placed in the order of the input: an event collides with an earlier event if it overlaps with it
+    or ends exactly at its start (see `Occupancy.collides`), but it may start exactly at its end. Of two colliding
+    events, the one that comes later in the input is redrawn.
+
+    Args:
+        prob_joint (dict): The joint probability distribution (numpy.ndarray or StartTimeSampler) per user index.
+        user (numpy.ndarray): The user index of every event, used as key into `prob_joint`.
+        group (numpy.ndarray): The group of every event, events in the same group may not overlap.
+        day_num (numpy.ndarray): The day number of every event in the simulation.
+        duration (numpy.ndarray): The duration of every event.
+        max_iter (int, optional): The maximum number of redraw rounds. Defaults to 1000.
+        rng (numpy.random.Generator, optional): The random number generator. The global numpy random state is used if None.
+
+    Raises:
+        ValueError: If events still collide after `max_iter` rounds.
+
+    Returns:
+        numpy.ndarray: The sampled start times.
+        numpy.ndarray: The calculated end times.
+    """
+    samplers = {j: prob if isinstance(prob, StartTimeSampler) else StartTimeSampler(prob) for j, prob in prob_joint.items()}
+    n = len(duration)
+    duration = np.asarray(duration, dtype=int)
+    offset = np.asarray(day_num, dtype=int) * int(pd.to_timedelta('1 day').total_seconds())
+    group = np.asarray(group, dtype=int)
+    start_index = np.zeros(n, dtype=int)
+    redraw = np.ones(n, dtype=bool)
+
+    for _ in range(max_iter):
+        for j, sampler in samplers.items():
+            selection = redraw & (user == j)
+            if selection.any():
+                start_index[selection] = sampler.draw(size=np.count_nonzero(selection), rng=rng)
+
+        start = start_index + offset
         end = start + duration
 
-        # Check for overlapping events or events within duration before the last sample start
-        if not any((start < event_end and start >= event_start) or (start < event_start and start >= event_start - int(duration)) for event_start, event_end in previous_events):
-            return int(start), int(end)
+        # sort events by group and start time and compare every start with the latest end before it in its group
+        order = np.lexsort((np.arange(n), start, group))
+        sorted_start = start[order]
+        span = int(end.max(initial=0)) + 1
+        shifted_end = end[order] + group[order] * span
+        running_end = np.maximum.accumulate(shifted_end)
+        holder = np.maximum.accumulate(np.where(shifted_end == running_end, np.arange(n), 0))
+
+        # an event collides if it starts before the latest end, or exactly at it if that event comes later in the input
+        shifted_start = sorted_start[1:] + group[order][1:] * span
+        touching = (shifted_start == running_end[:-1]) & (order[holder[:-1]] > order[1:])
+        overlap = np.zeros(n, dtype=bool)
+        overlap[1:] = (group[order][1:] == group[order][:-1]) & ((shifted_start < running_end[:-1]) | touching)
+        if not overlap.any():
+            break
+
+        # redraw the event that comes later in the input
+        position = np.flatnonzero(overlap)
+        redraw[:] = False
+        redraw[np.maximum(order[position], order[holder[position - 1]])] = True
+    else:
+        raise ValueError(f'No valid start times found after {max_iter} rounds, events still overlap.')
+
+    return start, end
 
 
 def handle_spillover_consumption(consumption, pattern, start, end, j, ind_enduse, pattern_num, end_of_day, name, total_days):
@@ -34,7 +244,7 @@ def handle_spillover_consumption(consumption, pattern, start, end, j, ind_enduse
     Splits the consumption event into two parts: the part that fits within the current days and the part that spills over into the next day. The spillover part is moved to the start of the day, making an assumption that appliance had the same usage event beginning the previous day.
 
     Args:
-        consumption (numpy.ndarray): The array representing the consumption data.
+        consumption (numpy.ndarray | EventLog): The array or event log representing the consumption data.
         pattern (numpy.ndarray): The pattern of consumption to be applied.
         start (int): The start time of the consumption event in seconds from the beginning of the day.
         end (int): The end time of the consumption event in seconds from the beginning of the day.
@@ -51,8 +261,7 @@ def handle_spillover_consumption(consumption, pattern, start, end, j, ind_enduse
     print("A usage event for ", name, " use has spilled over to the next day. Adjusting spillover times...")
     # Part that fits within the current day
     difference = end_of_day - start
-    consumption[start:end_of_day, j, ind_enduse, pattern_num, 0] = pattern[:difference]
-    consumption[start:end_of_day, j, ind_enduse, pattern_num, 1] = 0
+    consumption = record_consumption(consumption, start, end_of_day, j, ind_enduse, pattern_num, pattern[:difference])
 
     # Part that spills over into the next day
     spillover_start = 0
@@ -63,14 +272,12 @@ def handle_spillover_consumption(consumption, pattern, start, end, j, ind_enduse
     next_day = (current_day + 1) % total_days # if next day exceeds total number of days in the sim, wraps around to the beginning (day 0)
 
     if next_day == 0:
-        consumption[spillover_start:spillover_start + spillover_end, j, ind_enduse, pattern_num, 0] = pattern[difference:difference + spillover_end]
-        consumption[spillover_start:spillover_start + spillover_end, j, ind_enduse, pattern_num, 1] = 0
+        consumption = record_consumption(consumption, spillover_start, spillover_start + spillover_end, j, ind_enduse, pattern_num, pattern[difference:difference + spillover_end])
     else:
         # Continue to the next day
         spillover_start = next_day * 24 * 60 * 60
         spillover_end = spillover_start + spillover_end
-        consumption[spillover_start:spillover_end, j, ind_enduse, pattern_num, 0] = pattern[difference:difference + (spillover_end - spillover_start)]
-        consumption[spillover_start:spillover_end, j, ind_enduse, pattern_num, 1] = 0
+        consumption = record_consumption(consumption, spillover_start, spillover_end, j, ind_enduse, pattern_num, pattern[difference:difference + (spillover_end - spillover_start)])
 
     print("Spillover consumption adjustment complete.")
 
@@ -4,14 +4,16 @@ from typing import Union
 from scipy.stats import truncnorm
 from scipy.optimize import minimize
 
-def chooser(data: Union[pd.Series, pd.DataFrame], myproperty: str=''):
+def chooser(data: Union[pd.Series, pd.DataFrame], myproperty: str='', size: int=None, rng: np.random.Generator=None):
     """Function to choose elements from a pd.Series randomly, which consists of keys representing the elements and probabilities as values [-> Statistics object].
 
     Args:
         data (pd.Series | pd.DataFrame): input data to chose from which can be either a pandas.Series or a pandas.DataFrame
         myproperty (str, optional): If the data is in form of a pandas.DataFrame then the myproperty property defines the column to chose from
+        size (int, optional): number of elements to choose. If given, a numpy array of chosen elements is returned.
+        rng (np.random.Generator, optional): random number generator. The global numpy random state is used if None.
     Returns:
-        _type_: randomly chosen element from pandas.Series or pandas.DataFrame
+        _type_: randomly chosen element (or array of elements) from pandas.Series or pandas.DataFrame
     """
 
     if not myproperty:
@@ -29,14 +31,46 @@ def chooser(data: Union[pd.Series, pd.DataFrame], myproperty: str=''):
     data /= (data.sum())
 
     # choose a random number between 0 and 1 from a uniform distribution
-    u = np.random.uniform()
+    rng = np.random if rng is None else rng
+    u = rng.uniform(size=size)
 
     # choose an element from the Series or DataFrame respectively randomly.
-    choose = data[u < data.cumsum()].index[0]
+    if size is None:
+        choose = data[u < data.cumsum()].index[0]
+    else:
+        index = np.searchsorted(data.cumsum().values, u, side='right')
+        choose = data.index.values[np.minimum(index, len(data) - 1)]
 
     return choose
 
 
+def seed_sequence(seed=None) -> np.random.SeedSequence:
+    """Turns a seed into a `numpy.random.SeedSequence` from which independent child streams can be spawned.
+
+    Args:
+        seed (None | int | np.random.SeedSequence, optional): seed, fresh entropy is used if None.
+
+    Returns:
+        np.random.SeedSequence: seed sequence
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    return np.random.SeedSequence(seed)
+
+
+def spawn_generators(seed_seq: np.random.SeedSequence, n: int) -> list:
+    """Spawns `n` independent random number generators from a seed sequence.
+
+    Args:
+        seed_seq (np.random.SeedSequence): parent seed sequence.
+        n (int): number of generators.
+
+    Returns:
+        list: list of `numpy.random.Generator`
+    """
+    return [np.random.default_rng(child) for child in seed_seq.spawn(n)]
+
+
 def duration_decorator(func):
     """Decorator function for duration.
 
@@ -98,25 +132,28 @@ def to_timedelta(time: Union[str, float, pd.Timedelta]) -> pd.Timedelta:
     return value
 
 
-def truncated_normal_dis_sampling(mean_value):
+def truncated_normal_dis_sampling(mean_value, rng=None, size=None):
     """Samples a value from a truncated normal distribution based on the given mean value.
 
     Distribution is truncated at 0 to prevent negative values.
 
     Args:
         mean_value (float): Mean value for the truncated normal distribution.
+        rng (np.random.Generator, optional): random number generator. The global numpy random state is used if None.
+        size (int, optional): number of values to sample in one call. Defaults to None (a single value).
 
     Returns:
-        float: Sampled value from the truncated normal distribution. If input value is 0, returns 0.
+        float | np.ndarray: Sampled value (or `size` values) from the truncated normal distribution. If input value
+        is 0, returns 0.
     """
     if mean_value == 0: # if input stat is 0, then should always sample 0
-        return 0
+        return 0 if size is None else np.zeros(size)
     std_dev = mean_value * 0.3 # 30% of meean value is just an educated guess based on data types
     lower_bound = 0
     upper_bound = np.inf
     a, b = (lower_bound - mean_value) / std_dev, (upper_bound - mean_value) / std_dev
     # sample from truncated normal distribution
-    sample = truncnorm.rvs(a, b, loc=mean_value, scale=std_dev)
+    sample = truncnorm.rvs(a, b, loc=mean_value, scale=std_dev, size=size, random_state=rng)
 
     return sample
 
@@ -171,4 +208,67 @@ def optimise_probabilities(starting_probs, total_population, total_households, h
     if not result.success:
         raise ValueError(f"Optimisation failed: {result.message}")
 
-    return result.x
\ No newline at end of file
+    return result.x
+
+def optimise_probabilities_batch(starting_probs, total_population, total_households, household_sizes, tol=1e-9):
+    """
+    Optimises the household probabilities of many areas at once, see `optimise_probabilities`.
+
+    For every area, the probabilities closest to the starting probabilities (least squares) are found that sum to 1
+    and give the total population. Without the bounds this is the projection of the starting probabilities onto the
+    two equality constraints, which has a closed form. Probabilities that become negative are fixed at 0 and the
+    projection is repeated for the other categories (active set). Areas for which this does not give an optimal,
+    feasible solution are solved with `optimise_probabilities` (SLSQP) instead.
+
+    Args:
+        starting_probs (list): Initial probabilities for each household category (e.g., census averages).
+        total_population (np.ndarray): Total population of every area.
+        total_households (np.ndarray): Total number of households of every area.
+        household_sizes (list): Average household sizes for each category.
+        tol (float, optional): tolerance of the constraints and the optimality check. Defaults to 1e-9.
+
+    Raises:
+        ValueError: If the optimisation of an area fails (see `optimise_probabilities`).
+
+    Returns:
+        np.ndarray: Optimised probabilities (areas x categories).
+    """
+    starting_probs = np.asarray(starting_probs, dtype=float)
+    sizes = np.asarray(household_sizes, dtype=float)
+    total_population = np.asarray(total_population, dtype=float)
+    total_households = np.asarray(total_households, dtype=float)
+    mean_size = total_population / total_households  # population constraint: probs @ sizes == mean_size
+
+    n, k = len(mean_size), len(sizes)
+    p0 = np.broadcast_to(starting_probs, (n, k))
+    free = np.ones((n, k), dtype=bool)
+    probs = p0.copy()
+    nu = np.zeros((n, 2))
+
+    for _ in range(k):
+        # projection onto the constraints with the free categories only (2 x 2 normal equations per area)
+        f = free.astype(float)
+        a11, a12, a22 = f @ sizes ** 2, f @ sizes, f.sum(1)
+        r1 = (p0 * f) @ sizes - mean_size
+        r2 = (p0 * f).sum(1) - 1
+        det = a11 * a22 - a12 ** 2
+        singular = np.abs(det) < tol
+        det = np.where(singular, 1.0, det)
+        nu = np.stack([(a22 * r1 - a12 * r2) / det, (a11 * r2 - a12 * r1) / det], axis=1)
+        probs = np.where(free, p0 - nu[:, :1] * sizes - nu[:, 1:], 0.0)
+
+        negative = free & (probs < -tol)
+        if not negative.any():
+            break
+        free &= ~negative
+
+    # optimality of the categories fixed at 0 (non-negative multipliers) and feasibility of the solution
+    multipliers = nu[:, :1] * sizes + nu[:, 1:] - p0
+    optimal = np.all(free | (multipliers >= -tol), axis=1)
+    feasible = ((probs >= -tol).all(1) & (np.abs(probs @ sizes - mean_size) < 1e-6) & (np.abs(probs.sum(1) - 1) < 1e-6))
+    probs = np.clip(probs, 0, 1)
+
+    for i in np.flatnonzero(singular | ~optimal | ~feasible):
+        probs[i] = optimise_probabilities(starting_probs, total_population[i], total_households[i], sizes)
+
+    return probs
@@ -1,15 +1,17 @@
 import pandas as pd
 import numpy as np
 import os
-import toml
 from pysimdeum.data import DATA_DIR
 from pysimdeum.utils.probability import truncated_normal_dis_sampling
+from pysimdeum.core.statistics import load_toml
 
 
 def xarray_to_metadata_df(ds, array, metadata):
     """Extract from xarray.Dataset to a pd.DataFrame and enrich with event metadata.
 
-    Adds 'usage' and 'event_label' columns to the DataFrame based on the metadata.
+    Adds 'usage' and 'event_label' columns to the DataFrame based on the metadata. Only the non-zero entries
+    of the array are kept. The rows are joined with the event intervals per end-use with a sorted search; where
+    events overlap, the event that comes last in the metadata labels the row.
 
     Args:
         ds (xarray.Dataset): The dataset containing the data and metadata.
@@ -19,43 +21,68 @@ def xarray_to_metadata_df(ds, array, metadata):
     Returns:
         pd.DataFrame: The enriched DataFrame containing the data and metadata.
     """
-    df_ = ds[array].to_dataframe(name='flow').reset_index()
-    ref_start = df_['time'].min()
-    ref_end = df_['time'].max()
-    
-    df = df_[df_['flow'] != 0].copy()
-    df['usage'] = None
-    df['event_label'] = None
-    df['discharge_temperature'] = None
-
-    events = ds[metadata].values
-
-    for event in events:
-        start_times = [ref_start + pd.Timedelta(seconds=start) for start in np.atleast_1d(event['start'])]
-        end_times = [ref_start + pd.Timedelta(seconds=end) for end in np.atleast_1d(event['end'])]
+    data = ds[array]
+    ref_start = data.indexes['time'].min()
+    ref_end = data.indexes['time'].max()
+
+    # only the non-zero entries, in the order (and with the row numbers) of data.to_dataframe()
+    values = data.values
+    nonzero = np.nonzero(values)
+    df = pd.DataFrame({dim: data.indexes[dim].values[index] for dim, index in zip(data.dims, nonzero)},
+                      index=np.ravel_multi_index(nonzero, values.shape))
+    df['flow'] = values[nonzero]
+
+    # flatten the events into intervals, in the order in which they are labelled (later events win)
+    intervals = []
+    for event in ds[metadata].values:
         usage = event['usage'].lower()
-        enduse = event['enduse']
-        discharge_temperatures = np.atleast_1d(event['discharge_temperature'])
-
-        for start, end, discharge_temperature in zip(start_times, end_times, discharge_temperatures):
-            condition = ((df['time'] >= start)
-                        & (df['time'] < end)
-                        & (df['enduse'] == enduse)
-                        & (df['flow'] != 0)
-                        )
-            
+        for start, end, discharge_temperature in zip(np.atleast_1d(event['start']), np.atleast_1d(event['end']),
+                                                     np.atleast_1d(event['discharge_temperature'])):
+            intervals.append((event['enduse'], start, end, usage, discharge_temperature))
+
+    usages = np.full(len(df), None, dtype=object)
+    labels = np.full(len(df), None, dtype=object)
+    temperatures = np.full(len(df), None, dtype=object)
+
+    seconds = ((df['time'] - ref_start) / pd.Timedelta(seconds=1)).to_numpy()
+    enduses = df['enduse'].to_numpy()
+
+    for enduse in set(interval[0] for interval in intervals):
+        members = [i for i, interval in enumerate(intervals) if interval[0] == enduse]
+        starts = np.array([intervals[i][1] for i in members], dtype=float)
+        ends = np.array([intervals[i][2] for i in members], dtype=float)
+
+        # elementary segments between all interval bounds, labelled with the last interval covering them
+        bounds = np.unique(np.concatenate([starts, ends]))
+        winner = np.full(len(bounds), -1)
+        for i, start, end in zip(members, np.searchsorted(bounds, starts), np.searchsorted(bounds, ends)):
+            winner[start:end] = i
+
+        rows = np.flatnonzero(enduses == enduse)
+        segments = np.searchsorted(bounds, seconds[rows], side='right') - 1
+        matched = winner[np.maximum(segments, 0)]
+        matched[segments < 0] = -1
+        rows, matched = rows[matched >= 0], matched[matched >= 0]
+
+        for i in np.unique(matched):
+            _, start, end, usage, discharge_temperature = intervals[i]
+            event_rows = rows[matched == i]
+            start, end = ref_start + pd.Timedelta(seconds=start), ref_start + pd.Timedelta(seconds=end)
+            usages[event_rows] = usage
+            labels[event_rows] = f"{usage}_{start.timestamp()}_{end.timestamp()}"
             if isinstance(discharge_temperature, (list, np.ndarray)):
-                df.loc[condition, 'discharge_temperature'] = discharge_temperature[:len(df[condition])]
+                temperatures[event_rows] = list(discharge_temperature[:len(event_rows)])
             else:
-                df.loc[condition, 'discharge_temperature'] = discharge_temperature
+                temperatures[event_rows] = discharge_temperature
 
-            df.loc[condition, 'usage'] = usage
-            df.loc[condition, 'event_label'] = f"{usage}_{start.timestamp()}_{end.timestamp()}"
+    df['usage'] = usages
+    df['event_label'] = labels
+    df['discharge_temperature'] = temperatures
 
     return df, ref_start, ref_end
     
 
-def discharge_postprocessing(ds, process_type, nutrient_data=None):
+def discharge_postprocessing(ds, process_type, nutrient_data=None, rng=None):
     """
     Helper function to perform post-processing on discharge data. 
     Called by assign_discharge_nutrients and assign_discharge_temperature.
@@ -64,10 +91,17 @@ def discharge_postprocessing(ds, process_type, nutrient_data=None):
         ds (xarray.Dataset): The dataset containing discharge data and discharge events metadata.
         process_type (str): The type of post-processing to perform.
         calculation (function): The function to calculate nutrient concentrations.
+        rng (np.random.Generator, optional): random number generator for the nutrient sampling. The global numpy random state is used if None.
+
+    Raises:
+        ValueError: If the discharge is not simulated at a resolution of 1 s.
 
     Returns:
         pd.DataFrame: The updated DataFrame containing the discharge data and the nutrient concentrations.
     """
+    resolution = ds['discharge'].attrs.get('resolution', 1)
+    if resolution != 1:
+        raise ValueError(f'Discharge post-processing requires 1 s discharge, the discharge has a resolution of {resolution} s.')
 
     df, ref_start, ref_end = xarray_to_metadata_df(ds, 'discharge', 'discharge_events')
 
@@ -75,51 +109,38 @@ def discharge_postprocessing(ds, process_type, nutrient_data=None):
     for nutrient in nutrients:
         df[nutrient] = 0.0
 
-    # group by event_label
-    grouped = df.groupby('event_label')
-
-    results = []
-
-    for event_label, event_data in grouped:
-        if pd.isna(event_label):
-            continue
-
-        # Compute total flow for the event
-        total_flow = event_data['flow'].sum()
-
-        if process_type == 'nutrients':
-            enduse = event_data['enduse'].iloc[0]
-            usage = event_data['usage'].iloc[0]
-
-            # Calculate nutrient concentrations for the event
-            nutrient_values = {}
-            for nutrient in nutrients:
+    # keep the labelled rows grouped by event_label (in sorted order), with an integer index per event
+    df = df[df['event_label'].notna()]
+    codes, labels = pd.factorize(df['event_label'], sort=True)
+    order = np.argsort(codes, kind='stable')
+    df, codes = df.iloc[order].copy(), codes[order]
+
+    # Compute total flow per event
+    flow = df['flow'].to_numpy(dtype=float)
+    total_flow = np.bincount(codes, weights=flow, minlength=len(labels))
+
+    if process_type == 'nutrients':
+        # draw the nutrient loads of all events of an end-use and usage at once
+        first = np.unique(codes, return_index=True)[1]
+        events = pd.DataFrame({'enduse': df['enduse'].to_numpy()[first], 'usage': df['usage'].to_numpy()[first]})
+        for nutrient in nutrients:
+            nutrient_per_use = np.zeros(len(labels))
+            for (enduse, usage), event_index in events.groupby(['enduse', 'usage']).indices.items():
                 mean_value = nutrient_data[enduse][usage][nutrient]
-                nutrient_per_use = truncated_normal_dis_sampling(mean_value)
-                nutrient_concentration = nutrient_per_use / total_flow if total_flow > 0 else 0
-                nutrient_values[nutrient] = nutrient_concentration
-
-            # Assign nutrient concentrations to the event
-            for nutrient, value in nutrient_values.items():
-                event_data[nutrient] = value
-
-        elif process_type == 'temperature':
-            if total_flow > 0:
-                temperature_sum = (event_data['discharge_temperature'] * event_data['flow']).sum()
-                avg_temperature = temperature_sum / total_flow
-            else:
-                avg_temperature = 0.0 # No flo
+                nutrient_per_use[event_index] = truncated_normal_dis_sampling(mean_value, rng=rng, size=len(event_index))
 
-            event_data['discharge_temperature'] = avg_temperature
+            # Calculate nutrient concentrations per event and assign them to the rows of the event
+            nutrient_concentration = np.divide(nutrient_per_use, total_flow, out=np.zeros(len(labels)), where=total_flow > 0)
+            df[nutrient] = nutrient_concentration[codes]
 
-        results.append(event_data)
-
-    # Combine results back into a single DataFrame
-    df = pd.concat(results)
+    elif process_type == 'temperature':
+        temperature_sum = np.bincount(codes, weights=df['discharge_temperature'].to_numpy(dtype=float) * flow, minlength=len(labels))
+        avg_temperature = np.divide(temperature_sum, total_flow, out=np.zeros(len(labels)), where=total_flow > 0)
+        df['discharge_temperature'] = avg_temperature[codes]
 
     return df, ref_start, ref_end
 
-def assign_discharge_nutrients(ds, country):
+def assign_discharge_nutrients(ds, country, rng=None):
     """Calculates nutrient concentrations based on simulated discharge flow data.
 
     Calls the discharge_postprocessing function to extract discharge data and metadata from the dataset,
@@ -128,69 +149,86 @@ def assign_discharge_nutrients(ds, country):
     Args:
         ds (xarray.Dataset): The dataset containing discharge data and discharge events metadata.
         country (str): NL or UK. The country for which the nutrient concentrations are calculated.
+        rng (np.random.Generator, optional): random number generator for the nutrient sampling. The global numpy random state is used if None.
 
     Returns:
         pd.DataFrame: The updated DataFrame containing the discharge data and the nutrient concentrations.
     """
     toml_file_path = os.path.join(DATA_DIR, country, 'ww_nutrients.toml')
-    nutrient_data = toml.load(toml_file_path)
+    nutrient_data = load_toml(toml_file_path)
     
     # Call the helper funcion
-    df, ref_start, ref_end = discharge_postprocessing(ds, 'nutrients', nutrient_data)
+    df, ref_start, ref_end = discharge_postprocessing(ds, 'nutrients', nutrient_data, rng=rng)
 
     return df, ref_start, ref_end
 
-def discharge_time_agg(df, time_agg='h'):
+_TIME_AGG = {'s': 's', 'm': 'min', '15min': '15min', '30min': '30min', 'h': 'h'}
+
+
+def discharge_time_agg(df, time_agg='h', ref_start=None, ref_end=None):
     """
-    Helper function to aggregate the data by time based on the specified time aggregation level.
+    Helper function to assign the rows of a discharge DataFrame to time intervals.
+
+    The intervals start at `ref_start` and follow each other with the frequency `time_agg`. Every row gets the
+    integer index of the interval it falls into, so the intervals can be reduced with `np.bincount`. The input
+    DataFrame is not changed.
 
     Args:
-        ds (xarray.Dataset): The dataset containing discharge data and discharge event metadata.
-        process_type (str): The type of post-processing to perform.
+        df (pd.DataFrame): The DataFrame containing a 'time' column.
         time_agg (str, optional): The time aggregation level. Options are:
             - 's': Aggregate by seconds.
             - 'm': Aggregate by minutes.
             - '15min': Aggregate by 15-minute intervals.
             - '30min': Aggregate by 30-minute intervals.
             - 'h': Aggregate by hours (default).
-        process_calculation (function): The function to calculate nutrient concentrations or temperature.
+            - any other pandas offset alias (e.g., '5min', '2h', 'D').
+        ref_start (pd.Timestamp, optional): Start of the first interval. Defaults to None (first time of `df`).
+        ref_end (pd.Timestamp, optional): End of the simulation. Defaults to None (last time of `df`).
 
     Raises:
-        ValueError: If the input DataFrame does not contain the required columns ('time', 'flow', and nutrient types).
         ValueError: If an invalid `time_agg` value is provided.
 
     Returns:
-        pd.DataFrame: A DataFrame containing the aggregated data with the following columns:
-            - 'time': The aggregated time intervals.
-            - 'flow': The total flow for each time interval.
-            - 'value_columns': Nutrient concentrations or temperature values.
+        tuple: The interval index of every row (np.ndarray) and the start times of the intervals (pd.DatetimeIndex).
     """
-    # Round time to the specified aggregation level
-    if time_agg == 's':
-        df['agg_time'] = df['time']
-        freq = 'S'
-    elif time_agg == 'm':
-        df['agg_time'] = df['time'].dt.floor('min')  # Round to the nearest minute
-        freq = 'min'
-    elif time_agg == '15min':
-        df['agg_time'] = df['time'].dt.floor('15T')  # Round to the nearest 15 minutes
-        freq = '15T'
-    elif time_agg == '30min':
-        df['agg_time'] = df['time'].dt.floor('30T')  # Round to the nearest 30 minutes
-        freq = '30T'
-    elif time_agg == 'h':
-        df['agg_time'] = df['time'].dt.floor('h')  # Round to the nearest hour
-        freq = 'h'
-    else:
-        raise ValueError("Invalid time_agg value. Use 's' for seconds, 'm' for minutes, '15min' for 15mins, '30min' for 30mins, or 'h' for hours.")
-
-    # Group by date and the aggregated time
-    df['date'] = df['time'].dt.date
-    grouped = df.groupby(['date', 'agg_time'])
-
-    return df, grouped, freq
-
-def hh_discharge_nutrients(ds, country='NL', time_agg='h'):
+    freq = _TIME_AGG.get(time_agg, time_agg)
+    try:
+        freq = pd.tseries.frequencies.to_offset(freq)
+    except ValueError:
+        raise ValueError("Invalid time_agg value. Use 's' for seconds, 'm' for minutes, '15min' for 15mins, '30min' for 30mins, 'h' for hours, or another pandas offset alias.")
+
+    ref_start = df['time'].min() if ref_start is None else ref_start
+    ref_end = df['time'].max() if ref_end is None else ref_end
+
+    # Generate a complete range of interval starts between ref_start and ref_end
+    time_index = pd.date_range(start=ref_start, end=ref_end, freq=freq)
+    if len(time_index) == 0 or time_index[0] > ref_start:
+        time_index = time_index.insert(0, ref_start)
+
+    bins = np.searchsorted(time_index.values, df['time'].values, side='right') - 1
+
+    return bins, time_index
+
+
+def _weighted_time_agg(df, columns, time_agg, ref_start, ref_end):
+    """Sums the flow and computes the flow-weighted mean of `columns` per time interval (0 for intervals without flow)."""
+
+    bins, time_index = discharge_time_agg(df, time_agg, ref_start, ref_end)
+    flow = df['flow'].to_numpy(dtype=float)
+    total_flow = np.bincount(bins, weights=flow, minlength=len(time_index))
+
+    aggregated = pd.DataFrame({'time': time_index, 'flow': total_flow})
+    for column in columns:
+        weighted = np.bincount(bins, weights=df[column].to_numpy(dtype=float) * flow, minlength=len(time_index))
+        aggregated[column] = np.divide(weighted, total_flow, out=np.zeros(len(time_index)), where=total_flow > 0)
+
+    # drop the interval that starts at the end of the simulation (it only holds the last time step)
+    if time_index[-1] == ref_end and len(aggregated) > 1:
+        aggregated = aggregated.iloc[:-1]
+    return aggregated
+
+
+def hh_discharge_nutrients(ds, country='NL', time_agg='h', rng=None):
     """
     Aggregates discharge data and calculates nutrient concentrations over specified time intervals.
 
@@ -206,6 +244,8 @@ def hh_discharge_nutrients(ds, country='NL', time_agg='h'):
             - '15min': Aggregate by 15-minute intervals.
             - '30min': Aggregate by 30-minute intervals.
             - 'h': Aggregate by hours (default).
+            - any other pandas offset alias (e.g., '5min', '2h', 'D').
+        rng (np.random.Generator, optional): random number generator for the nutrient sampling. The global numpy random state is used if None.
 
     Raises:
         ValueError: If the input DataFrame does not contain the required columns ('time', 'flow', and nutrient types).
@@ -217,7 +257,7 @@ def hh_discharge_nutrients(ds, country='NL', time_agg='h'):
             - 'flow': The total flow for each time interval.
             - Nutrient columns (e.g., 'n', 'p', 'cod', 'bod5', 'ss', 'amm'): Nutrient concentrations.
     """
-    df, ref_start, ref_end = assign_discharge_nutrients(ds, country)
+    df, ref_start, ref_end = assign_discharge_nutrients(ds, country, rng=rng)
 
     nutrients = ['n', 'p', 'cod', 'bod5', 'ss', 'amm']
 
@@ -225,27 +265,8 @@ def hh_discharge_nutrients(ds, country='NL', time_agg='h'):
     if not all(col in df.columns for col in ['time', 'flow'] + nutrients):
         raise ValueError("Input DataFrame must contain columns for time, flow, and all nutrient types.")
 
-    # time aggregation helper function
-    df, grouped, freq = discharge_time_agg(df, time_agg)
-
-    # Group by time and calculate total flow
-    flow = grouped['flow'].sum()
-
-    # Calculate weighted averages for each nutrient
-    weighted_nutrients = {
-        nutrient: grouped.apply(lambda g: (g[nutrient] * g['flow']).sum() / g['flow'].sum())
-        for nutrient in nutrients
-    }
-
-    # Combine results into a single DataFrame
-    hh_nutrients = pd.DataFrame(weighted_nutrients)
-    hh_nutrients['flow'] = flow
-
-    hh_nutrients = hh_nutrients.reset_index()[['agg_time','flow'] + nutrients].rename(columns={'agg_time': 'time'})
-
-    # Generate a complete range of timestamps between ref_start and ref_end
-    full_time_index = pd.date_range(start=ref_start, end=ref_end, freq=freq)
-    hh_nutrients = hh_nutrients.set_index('time').reindex(full_time_index, fill_value=0).rename_axis('time').reset_index().iloc[:-1]
+    # Sum the flow and calculate weighted averages for each nutrient per time interval
+    hh_nutrients = _weighted_time_agg(df, nutrients, time_agg, ref_start, ref_end)
 
     return hh_nutrients
 
@@ -266,6 +287,7 @@ def hh_discharge_temperature(ds, time_agg='h'):
             - '15min': Aggregate by 15-minute intervals.
             - '30min': Aggregate by 30-minute intervals.
             - 'h': Aggregate by hours (default).
+            - any other pandas offset alias (e.g., '5min', '2h', 'D').
 
     Raises:
         ValueError: If the input DataFrame does not contain the required columns ('time', 'flow', and 'discharge_temperature').
@@ -284,20 +306,7 @@ def hh_discharge_temperature(ds, time_agg='h'):
     if not all(col in df.columns for col in ['time', 'flow', 'discharge_temperature']):
         raise ValueError("Input DataFrame must contain columns for time, flow, and discharge_temperature.")
 
-    # time aggregation helper function
-    df, grouped, freq = discharge_time_agg(df, time_agg)
-
-    # Group by time and calculate total flow
-    flow = grouped['flow'].sum()    
-
-    # Weighted average discharge temperature
-    weighted_temperature = grouped.apply(lambda g: (g['flow'] * g['discharge_temperature']).sum() / g['flow'].sum() if g['flow'].sum() > 0 else None)
-
-    # Combine results
-    hh_temp = pd.DataFrame({'flow': flow, 'discharge_temperature': weighted_temperature}).reset_index()
-
-    # Ensure full time range
-    full_time_index = pd.date_range(start=ref_start, end=ref_end, freq=freq)
-    hh_temp = hh_temp.set_index('agg_time').reindex(full_time_index, fill_value=0).rename_axis('time').reset_index().iloc[:-1]
+    # Sum the flow and calculate the weighted average discharge temperature per time interval
+    hh_temp = _weighted_time_agg(df, ['discharge_temperature'], time_agg, ref_start, ref_end)
 
     return hh_temp
@@ -0,0 +1,48 @@
+import zlib
+import numpy as np
+from pysimdeum.api import _house_seed, build_multi_hh, accumulate_multi_hh, total_flow, SumAccumulator
+
+
+def test_build_multi_hh_independent_of_workers():
+    household_data = {'hh_1': 'one_person', 'hh_2': 'two_person', 'hh_3': 'one_person'}
+
+    sequential = build_multi_hh(household_data, seed=42)
+    parallel = build_multi_hh(household_data, seed=42, n_workers=2, chunksize=2)
+
+    for household_id in household_data:
+        assert np.array_equal(sequential[household_id].consumption.values, parallel[household_id].consumption.values)
+
+    reduced = build_multi_hh(household_data, seed=42, n_workers=2, chunksize=2, reducer=total_flow)
+    for household_id in household_data:
+        assert np.array_equal(reduced[household_id], total_flow(sequential[household_id]))
+
+def test_accumulate_multi_hh_matches_houses():
+    household_data = {'hh_1': 'one_person', 'hh_2': 'two_person', 'hh_3': 'family'}
+    groups = {'hh_1': 'a', 'hh_2': 'a', 'hh_3': 'b'}
+
+    houses = build_multi_hh(household_data, seed=7)
+    accumulator = accumulate_multi_hh(household_data, SumAccumulator(groups=groups), seed=7, n_workers=2)
+
+    for group in ['a', 'b']:
+        expected = sum(total_flow(houses[household_id]) for household_id in household_data if groups[household_id] == group)
+        assert np.allclose(accumulator.totals[group], expected)
+    assert accumulator.counts == {'a': 2, 'b': 1}
+
+def test_sum_accumulator_multiple_groups():
+    accumulator = SumAccumulator(groups={'hh_1': ['a', 'b'], 'hh_2': 'a'})
+    accumulator('hh_1', np.ones(3))
+    accumulator('hh_2', np.ones(3))
+    accumulator('hh_3', np.ones(3))
+
+    assert np.array_equal(accumulator.totals['a'], 2 * np.ones(3))
+    assert np.array_equal(accumulator.totals['b'], np.ones(3))
+    assert accumulator.counts == {'a': 2, 'b': 1, None: 1}
+
+
+def test_house_seed_distinct_for_crc32_collisions():
+    ids = ['osgb0000000009685295', 'osgb0000000012060020']
+    assert zlib.crc32(ids[0].encode()) == zlib.crc32(ids[1].encode())
+
+    streams = [np.random.default_rng(_house_seed(42, household_id)).random(4) for household_id in ids]
+    assert not np.array_equal(streams[0], streams[1])
+    assert np.array_equal(streams[0], np.random.default_rng(_house_seed(42, ids[0])).random(4))
@@ -2,7 +2,9 @@ import pandas as pd
 import numpy as np
 import xarray as xr
 import pytest
-from pysimdeum.tools.helper import _create_data
+from pysimdeum.core.statistics import get_statistics
+from pysimdeum.core.user import _presence_pdf
+from pysimdeum.tools.helper import _create_data, create_diurnal_pattern, presence_pattern, sample_presence, sample_user_ages
 
 def setUp():
         # Mocking inputproperty for testing
@@ -49,4 +51,29 @@ def test_create_data():
     # Assertions for total number of days
     expected_number_of_seconds = len(input.consumption)
     expected_total_number_of_days = expected_number_of_seconds/(60*60*24)
-    assert pytest.approx(total_number_of_days) == expected_total_number_of_days
\ No newline at end of file
+    assert pytest.approx(total_number_of_days) == expected_total_number_of_days
+
+
+def test_presence_pattern():
+    # the difference array gives the sum of the presence pdfs of the single users
+    stats = get_statistics('NL')
+    rng = np.random.default_rng(42)
+    presence = sample_presence(stats, sample_user_ages(stats, 50, rng=rng), rng=rng)
+    presence.loc[0, 'go'] = presence.loc[0, 'up'] + 30  # period from up + 30 to go - 30 wraps around the day
+    presence.loc[1, 'home'] = presence.loc[1, 'go']  # no time away
+
+    expected = np.zeros(24 * 60 * 60)
+    for user in presence.itertuples():
+        pdf = _presence_pdf(user.up % 1440, user.go % 1440, user.home % 1440, user.sleep % 1440, 0.65, 0.335, 0.0, 0.015)
+        expected += np.nan_to_num(pdf)
+
+    np.testing.assert_allclose(presence_pattern(presence).values, expected, atol=1e-12)
+
+
+def test_create_diurnal_pattern():
+    stats = get_statistics('NL')
+    pattern = create_diurnal_pattern(stats, num_houses=1000, seed=1)
+
+    assert len(pattern) == 24 * 60 * 60
+    assert (pattern >= -1e-12).all()
+    pd.testing.assert_series_equal(pattern, create_diurnal_pattern(stats, num_houses=1000, seed=1))
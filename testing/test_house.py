@@ -1,6 +1,11 @@
-from pysimdeum.core.house import Property
+import numpy as np
+import pandas as pd
+import pytest
+from pysimdeum.core.house import Property, HousePattern, load_house_patterns
 from pysimdeum.core.statistics import Statistics
 from statistics import mean
+import pysimdeum.core.end_use as EndUses
+from pysimdeum.utils.wastewater_quality import discharge_postprocessing
 
 def test_usersminimal1():
     number_of_users = []
@@ -38,3 +43,165 @@ def test_save_and_load_house():
     assert house.id == house2.id
 
 
+
+def seeded_house(stats, seed):
+    prop = Property(statistics=stats, seed=seed)
+    house = prop.built_house(house_type='family')
+    house.populate_house()
+    house.furnish_house()
+    for user in house.users:
+        user.compute_presence(statistics=stats)
+    return house
+
+def test_seeded_house_is_reproducible():
+    stats = Statistics()
+    consumption1, _ = seeded_house(stats, seed=1).simulate(num_patterns=2)
+    consumption2, _ = seeded_house(stats, seed=1).simulate(num_patterns=2)
+    consumption3, _ = seeded_house(stats, seed=2).simulate(num_patterns=2)
+
+    assert np.array_equal(consumption1.values, consumption2.values)
+    assert not np.array_equal(consumption1.values, consumption3.values)
+
+def test_sparse_simulation_matches_dense():
+    stats = Statistics()
+    consumption, _ = seeded_house(stats, seed=1).simulate(num_patterns=2)
+    house = seeded_house(stats, seed=1)
+    events, _ = house.simulate(num_patterns=2, sparse=True)
+
+    assert len(events) > 0
+    assert np.array_equal(consumption.values, house.dense_consumption().values)
+
+def test_batch_simulation():
+    stats = Statistics()
+    prop = Property(statistics=stats)
+    house = prop.built_house(house_type='family')
+    house.populate_house()
+    house.furnish_house()
+    for user in house.users:
+        user.compute_presence(statistics=stats)
+
+    consumption, _ = house.simulate(duration='2 days', num_patterns=3, batch=True)
+
+    assert consumption.shape == (2 * 24 * 60 * 60 + 1, len(house.users) + 1, len(house.appliances), 3, 2)
+    assert (consumption.sel(flowtypes='totalflow').sum(['time', 'user', 'enduse']) > 0).all()
+
+    with pytest.raises(ValueError):
+        house.simulate(batch=True, simulate_discharge=True)
+
+    # events added in bulk to an event log give the same consumption as the dense batch simulation
+    dense, _ = seeded_house(stats, seed=2).simulate(duration='2 days', num_patterns=3, batch=True)
+    sparse_house = seeded_house(stats, seed=2)
+    sparse_house.simulate(duration='2 days', num_patterns=3, batch=True, sparse=True)
+    assert np.array_equal(dense.values, sparse_house.dense_consumption().values)
+
+def merged_events(events):
+    # merge the runs of constant intensity of an event (see `EventLog.record`) back into one row per event
+    df = events.to_dataframe()
+    keys = df[['user', 'enduse', 'pattern']]
+    new = (df['start'] != df['end'].shift()) | keys.ne(keys.shift()).any(axis=1)
+    df['volume'] = (df['end'] - df['start']) * df['intensity']
+    return df.groupby(new.cumsum()).agg(start=('start', 'first'), end=('end', 'last'), enduse=('enduse', 'first'),
+                                        pattern=('pattern', 'first'), volume=('volume', 'sum'))
+
+def test_batch_simulation_matches_sequential():
+    stats = Statistics()
+    batch = merged_events(seeded_house(stats, seed=1).simulate(num_patterns=200, sparse=True, batch=True)[0])
+    sequential = merged_events(seeded_house(stats, seed=1).simulate(num_patterns=200, sparse=True)[0])
+
+    # events of an end-use do not overlap within a pattern and day
+    batch['day'] = batch['start'] // (24 * 60 * 60)
+    for _, group in batch.sort_values('start').groupby(['enduse', 'pattern', 'day']):
+        assert (group['start'].values[1:] >= group['end'].values[:-1]).all()
+
+    # number of events and volume per end-use are close to the sequential simulation
+    counts = batch.groupby('enduse').size()
+    expected_counts = sequential.groupby('enduse').size()
+    volumes = batch.groupby('enduse')['volume'].sum()
+    expected_volumes = sequential.groupby('enduse')['volume'].sum()
+    assert set(counts.index) == set(expected_counts.index)
+    for enduse in expected_counts.index[expected_counts >= 500]:
+        assert counts[enduse] == pytest.approx(expected_counts[enduse], rel=0.1)
+        assert volumes[enduse] == pytest.approx(expected_volumes[enduse], rel=0.15)
+
+def test_selected_flowtypes_and_dtype():
+    stats = Statistics()
+    consumption, discharge = seeded_house(stats, seed=1).simulate(num_patterns=2, simulate_discharge=True)
+    consumption32, discharge32 = seeded_house(stats, seed=1).simulate(num_patterns=2, simulate_discharge=True, dtype=np.float32,
+                                                                      flowtypes=['totalflow'], dischargetypes=['greywater'])
+
+    assert consumption32.dtype == np.float32
+    assert list(consumption32['flowtypes'].values) == ['totalflow']
+    assert list(discharge32['discharge']['dischargetypes'].values) == ['greywater']
+    assert np.allclose(consumption32.values[..., 0], consumption.sel(flowtypes='totalflow').values)
+    assert np.allclose(discharge32['discharge'].values[..., 0], discharge['discharge'].sel(dischargetypes='greywater').values)
+
+def test_coarse_resolution_matches_resampled():
+    stats = Statistics()
+    consumption, discharge = seeded_house(stats, seed=3).simulate(duration='2 days', simulate_discharge=True)
+    binned, binned_discharge = seeded_house(stats, seed=3).simulate(duration='2 days', simulate_discharge=True, resolution='15min')
+
+    assert binned.shape[0] == 2 * 24 * 4 + 1
+    assert np.allclose(binned.values, consumption.resample(time='15min').sum().values)
+    assert np.allclose(binned_discharge['discharge'].values, discharge['discharge'].resample(time='15min').sum().values)
+
+    # coarse output holds volumes per time step and is marked as such
+    assert consumption.attrs == {'resolution': 1, 'units': 'l/s'}
+    assert binned.attrs == binned_discharge['discharge'].attrs == {'resolution': 900, 'units': 'l'}
+    with pytest.raises(ValueError):
+        discharge_postprocessing(binned_discharge, 'temperature')
+
+def test_house_pattern_save_and_bulk_load(tmp_path):
+    stats = Statistics()
+    houses = [seeded_house(stats, seed=seed) for seed in [1, 2]]
+    files = []
+    for i, house in enumerate(houses):
+        house.simulate(num_patterns=2, simulate_discharge=True)
+        HousePattern(house).save_house_pattern(str(tmp_path / f'house{i}'))
+        files.append(str(tmp_path / f'house{i}.housepattern'))
+
+    pattern = HousePattern(files[0])
+    assert pattern.consumption.dtype == np.float32
+    assert pattern.consumption.dims == ('time', 'patterns', 'flowtypes')
+    assert pattern.discharge.dims == ('time', 'patterns', 'dischargetypes')
+
+    patterns = load_house_patterns(files, flowtype='hotflow')
+    assert patterns.shape == (2, 2, len(houses[0].consumption['time']))
+    for i, house in enumerate(houses):
+        expected = house.consumption.sel(flowtypes='hotflow').sum(['user', 'enduse']).transpose('patterns', 'time').values
+        assert np.allclose(patterns[i].values, expected, rtol=1e-6)
+
+def test_daily_usage_pdf_is_read_only_copy():
+    stats = Statistics()
+    for classname in ['KitchenTap', 'Dishwasher', 'WashingMachine']:
+        appliance = getattr(EndUses, classname)(statistics=stats.end_uses[classname])
+        pdf = appliance.usage_pdf()
+        daily_pattern = stats.end_uses[classname]['daily_pattern']
+
+        assert not pdf.flags.writeable
+        assert not np.shares_memory(pdf, daily_pattern.values)
+        assert np.array_equal(pdf, daily_pattern.values)
+        assert appliance.usage_pdf() is pdf
+
+def test_house_pattern_of_sparse_house():
+    stats = Statistics()
+    dense = seeded_house(stats, seed=4)
+    dense.simulate(num_patterns=2)
+    sparse = seeded_house(stats, seed=4)
+    sparse.simulate(num_patterns=2, sparse=True)
+
+    pattern = HousePattern(sparse)
+    assert sparse.consumption.size <= 1  # the dense array is not built
+    assert np.allclose(pattern.consumption.values, HousePattern(dense).consumption.values, atol=1e-6)
+
+def test_load_house_patterns_without_houses():
+    with pytest.raises(ValueError):
+        load_house_patterns([])
+
+def test_load_house_patterns_rejects_other_dates():
+    stats = Statistics()
+    houses = [seeded_house(stats, seed=seed) for seed in [1, 2]]
+    houses[0].simulate(date=pd.Timestamp('2024-01-01'))
+    houses[1].simulate(date=pd.Timestamp('2024-01-02'))
+
+    with pytest.raises(ValueError):
+        load_house_patterns(houses)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from pysimdeum.utils.patterns import StartTimeSampler, Occupancy, sample_start_times
+
+
+def test_start_time_sampler_matches_choice():
+    prob = np.random.default_rng(0).random(24 * 60 * 60)
+    prob /= prob.sum()
+    sampler = StartTimeSampler(prob)
+
+    rng1 = np.random.default_rng(1)
+    rng2 = np.random.default_rng(1)
+    expected = [rng1.choice(len(prob), p=prob) for _ in range(100)]
+
+    assert [sampler.draw(rng=rng2) for _ in range(100)] == expected
+    assert np.array_equal(sampler.draw(size=100, rng=rng2), rng1.choice(len(prob), size=100, p=prob))
+
+def test_occupancy_collides():
+    events = [(100, 200), (150, 250), (400, 450)]
+    occupancy = Occupancy(events)
+
+    for start in range(0, 600, 7):
+        expected = any(event_start - 30 <= start < event_end for event_start, event_end in events)
+        assert occupancy.collides(start, 30) == expected
+
+def test_draw_outside_blocked_regions():
+    sampler = StartTimeSampler(np.full(1000, 1 / 1000))
+    occupancy = Occupancy([(100, 200), (500, 900)])
+    blocked = occupancy.blocked(50, 0, 1000)
+    rng = np.random.default_rng(0)
+
+    assert blocked == [(50, 200), (450, 900)]
+    for _ in range(100):
+        start = sampler.draw_outside(blocked, rng=rng)
+        assert not occupancy.collides(start, 50)
+
+def test_sample_start_times_no_collisions():
+    prob = {0: np.full(1000, 1 / 1000)}
+    n = 20
+    group = np.repeat([0, 1], n // 2)
+    duration = np.full(n, 40)
+    start, end = sample_start_times(prob, np.zeros(n, dtype=int), group, np.zeros(n, dtype=int), duration,
+                                    rng=np.random.default_rng(0))
+
+    # events of a group are accepted by the sequential rejection rule in the order of the input
+    for g in [0, 1]:
+        occupancy = Occupancy([])
+        for a, b in zip(start[group == g], end[group == g]):
+            assert not occupancy.collides(a, b - a)
+            occupancy.add(a, b)
+
+def test_sample_start_times_raises_on_remaining_overlap():
+    # three events of 60 s do not fit into 100 s
+    prob = {0: np.full(100, 1 / 100)}
+    with pytest.raises(ValueError):
+        sample_start_times(prob, np.zeros(3, dtype=int), np.zeros(3, dtype=int), np.zeros(3, dtype=int),
+                           np.full(3, 60), max_iter=20, rng=np.random.default_rng(0))
+
+def test_sample_start_times_touching_events_as_sequential():
+    # user 0 can only start at 100 and user 1 only at 140, events of 40 s touch
+    prob = {0: np.eye(1000)[100], 1: np.eye(1000)[140]}
+    zeros = np.zeros(2, dtype=int)
+
+    # a later event may start at the end of an earlier one ...
+    start, end = sample_start_times(prob, np.array([0, 1]), zeros, zeros, np.full(2, 40), rng=np.random.default_rng(0))
+    assert start.tolist() == [100, 140]
+    assert not Occupancy([(100, 140)]).collides(140, 40)
+
+    # ... but may not end at its start
+    assert Occupancy([(140, 180)]).collides(100, 40)
+    with pytest.raises(ValueError):
+        sample_start_times(prob, np.array([1, 0]), zeros, zeros, np.full(2, 40), max_iter=5, rng=np.random.default_rng(0))
+
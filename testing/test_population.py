@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('geopandas')
+from pysimdeum.core.population import Population
+
+
+def test_assign_occupancy_types_matches_counts():
+    population = Population.__new__(Population)
+    population.houses = pd.DataFrame({'house_id': range(12), 'hh_boundary_id': ['a'] * 7 + ['b'] * 5})
+    population.results = pd.DataFrame({'one_person': [2, 1], 'two_person': [3, 1], 'family': [1, 3]}, index=['a', 'b'])
+
+    houses = population.assign_occupancy_types(seed=1)
+    counts = houses.groupby(['hh_boundary_id', 'occupancy_type']).size()
+
+    assert counts.to_dict() == {('a', 'family'): 1, ('a', 'one_person'): 2, ('a', 'two_person'): 3,
+                                ('b', 'family'): 3, ('b', 'one_person'): 1, ('b', 'two_person'): 1}
+    assert houses['occupancy_type'].isna().sum() == 1
+    assert houses['occupancy_type'].equals(population.assign_occupancy_types(seed=1)['occupancy_type'])
+
+
+@pytest.mark.parametrize('keep_houses', [True, False])
+def test_simulate_houses_streams_subcatchment_profiles(keep_houses):
+    from pysimdeum.api import build_multi_hh
+
+    population = Population.__new__(Population)
+    population.houses = pd.DataFrame({'house_id': ['h1', 'h2', 'h3'], 'subcatchment_id': ['s1', 's1', 's2']})
+    population.household_data = {'h1': 'one_person', 'h2': 'two_person', 'h3': 'family'}
+    population.keep_houses = keep_houses
+    population.simulate_houses(duration='1 day', seed=1)
+    profiles = population.calculate_subcatchment_profiles()
+
+    houses = build_multi_hh(population.household_data, duration='1 day', seed=1)
+    assert list(population.houses_instances) == (list(houses) if keep_houses else [])
+    assert sorted(profiles) == ['s1', 's2']
+    for subcatchment_id, house_ids in {'s1': ['h1', 'h2'], 's2': ['h3']}.items():
+        expected = sum(houses[house_id].consumption.sel(flowtypes='totalflow').sum(['enduse', 'user']) for house_id in house_ids)
+        assert profiles[subcatchment_id].dims == ('time', 'patterns')
+        np.testing.assert_array_equal(profiles[subcatchment_id]['time'].values, expected['time'].values)
+        np.testing.assert_allclose(profiles[subcatchment_id].values, expected.values)
+
+
+
+def reference_ww_nutrient_profiles(house_nutrients, house_groups):
+    # row-wise implementation of `calculate_subcatchment_ww_nutrient_profiles` before it was vectorised
+    all_house_data = []
+    for house_id, nutrients in house_nutrients:
+        nutrients = nutrients.copy()
+        nutrients['subcatchment_id'] = house_groups[house_id][0]
+        all_house_data.append(nutrients)
+    all_house_data_df = pd.concat(all_house_data, ignore_index=True)
+
+    profiles = {}
+    for (subcatchment_id, time), group in all_house_data_df.groupby(['subcatchment_id', 'time']):
+        total_flow = group['flow'].sum()
+        nutrient_columns = [col for col in group.columns if col not in ['subcatchment_id', 'time', 'flow']]
+        weighted_nutrients = (group[nutrient_columns].multiply(group['flow'], axis=0).sum() / total_flow).to_dict()
+        profiles.setdefault(subcatchment_id, []).append({'time': time, 'flow': total_flow, **weighted_nutrients})
+
+    return {subcatchment_id: pd.DataFrame(rows).fillna(0) for subcatchment_id, rows in profiles.items()}
+
+
+def test_subcatchment_ww_nutrient_profiles_match_row_wise():
+    rng = np.random.default_rng(0)
+    time = pd.date_range('2024-01-01', periods=30, freq='h')
+    house_groups = {'h1': ['s1'], 'h2': ['s1'], 'h3': ['s1'], 'h4': ['s2'], 'h5': ['s2']}
+    house_nutrients = []
+    for house_id in house_groups:
+        nutrients = pd.DataFrame({'time': time, 'flow': rng.uniform(0, 10, len(time)),
+                                  'n': rng.uniform(0, 5, len(time)), 'p': rng.uniform(0, 1, len(time))})
+        nutrients.loc[[3, 7], 'flow'] = 0.0  # no flow in any house of a subcatchment
+        if house_id == 'h2':
+            nutrients.loc[5, 'flow'] = 0.0  # no flow in a single house
+        house_nutrients.append((house_id, nutrients))
+
+    population = Population.__new__(Population)
+    population._house_nutrients = house_nutrients
+    population._house_groups = house_groups
+    profiles = population.calculate_subcatchment_ww_nutrient_profiles()
+    expected = reference_ww_nutrient_profiles(house_nutrients, house_groups)
+
+    assert sorted(profiles) == ['s1', 's2']
+    for subcatchment_id, ww_profile in expected.items():
+        pd.testing.assert_frame_equal(profiles[subcatchment_id]['ww_profile'], ww_profile[['time', 'flow', 'n', 'p']])
+        assert (profiles[subcatchment_id]['ww_profile'].loc[[3, 7], ['flow', 'n', 'p']] == 0).all().all()
+        daily_flow = ww_profile.groupby(ww_profile['time'].dt.date)['flow'].sum().to_dict()
+        assert profiles[subcatchment_id]['daily_flow'] == pytest.approx(daily_flow)
+        assert profiles[subcatchment_id]['hourly_average'] == pytest.approx({d: f / 24 for d, f in daily_flow.items()})
+
+def test_locate_points_in_chunks():
+    import geopandas as gpd
+    from shapely.geometry import Point, box
+    from pysimdeum.utils.misc import locate_points
+
+    polygons = gpd.GeoSeries([box(0, 0, 1, 1), box(1, 0, 2, 1)])
+    points = gpd.GeoSeries([Point(0.5, 0.5), Point(1.5, 0.5), Point(3, 3), Point(1, 0.5)])
+
+    assert locate_points(points, polygons, chunksize=3).tolist() == [0, 1, -1, 0]
+
+
+def test_data_prep_reads_mapped_columns_and_caches(tmp_path):
+    import geopandas as gpd
+    from shapely.geometry import Point, box
+    from pysimdeum.core.population import DataPrep
+
+    polygons = gpd.GeoDataFrame({'code': ['s1', 's2'], 'unused': [1, 2]}, geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1)], crs='EPSG:27700')
+    houses = gpd.GeoDataFrame({'toid': ['h1', 'h2'], 'kind': ['DWELLING', 'OTHER'], 'unused': [1, 2]},
+                              geometry=[Point(0.5, 0.5), Point(1.5, 0.5)], crs='EPSG:27700')
+    polygons.to_file(tmp_path / 'polygons.geojson')
+    houses.to_file(tmp_path / 'houses.geojson')
+    pd.DataFrame({'code': ['s1', 's2'], 'total': [3, 4], 'unused': [0, 0]}).to_csv(tmp_path / 'population.csv', index=False)
+    (tmp_path / 'config.toml').write_text(f"""
+[datasets]
+subcatchments = "{(tmp_path / 'polygons.geojson').as_posix()}"
+boundaries = "{(tmp_path / 'polygons.geojson').as_posix()}"
+boundaries_pop = "{(tmp_path / 'population.csv').as_posix()}"
+houses = "{(tmp_path / 'houses.geojson').as_posix()}"
+
+[columns.subcatchments]
+geometry = "geometry"
+subcatchment_id = "code"
+
+[columns.boundaries]
+geometry = "geometry"
+boundary_id = "code"
+
+[columns.boundaries_pop]
+boundary_id_code = "code"
+population = "total"
+
+[columns.houses]
+geometry = "geometry"
+house_id = "toid"
+function = "kind"
+""")
+
+    data_prep = DataPrep(config_path=str(tmp_path / 'config.toml'), cache_dir=str(tmp_path / 'cache'))
+    assert list(data_prep.datasets['houses'].columns) == ['geometry', 'house_id', 'function']
+    assert list(data_prep.datasets['boundaries_pop'].columns) == ['boundary_id_code', 'population']
+    assert len(list((tmp_path / 'cache').iterdir())) == 4
+
+    cached = DataPrep(config_path=str(tmp_path / 'config.toml'), cache_dir=str(tmp_path / 'cache'))
+    for key, dataset in data_prep.datasets.items():
+        assert cached.datasets[key].equals(dataset)
+
+    clipped = DataPrep(config_path=str(tmp_path / 'config.toml'), cache_dir=str(tmp_path / 'cache'), bbox=(0, 0, 1, 1))
+    assert clipped.datasets['houses']['house_id'].tolist() == ['h1']
@@ -0,0 +1,17 @@
+import numpy as np
+from pysimdeum.utils.probability import optimise_probabilities, optimise_probabilities_batch
+
+
+def test_optimise_probabilities_batch_matches_slsqp():
+    starting_probs = np.array([0.30, 0.34, 0.36])
+    household_sizes = np.array([1, 2, 3.75])
+    total_households = np.array([50, 120, 80, 200, 35])
+    total_population = np.array([60, 250, 290, 420, 120])  # includes areas where a category is clipped at 0
+
+    batch = optimise_probabilities_batch(starting_probs, total_population, total_households, household_sizes)
+
+    for i in range(len(total_households)):
+        expected = optimise_probabilities(starting_probs, total_population[i], total_households[i], household_sizes)
+        assert np.allclose(batch[i], expected, atol=1e-6)
+    assert np.allclose(batch.sum(1), 1)
+    assert (batch >= 0).all()
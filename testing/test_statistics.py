@@ -0,0 +1,45 @@
+import copy
+import os
+import pickle
+import shutil
+import pytest
+from pysimdeum.core.statistics import get_statistics, load_toml
+from pysimdeum.data import DATA_DIR
+
+
+def test_statistics_are_shared():
+    assert get_statistics('NL') is get_statistics('NL')
+    assert get_statistics('NL') is not get_statistics('UK')
+
+def test_statistics_reload_on_change(tmp_path):
+    statisticsdir = str(tmp_path / 'custom')
+    shutil.copytree(os.path.join(DATA_DIR, 'NL'), statisticsdir)
+    stats = get_statistics(statisticsdir)
+    assert get_statistics(statisticsdir) is stats
+
+    household_file = os.path.join(statisticsdir, 'household_statistics.toml')
+    mtime = os.stat(household_file).st_mtime_ns
+    os.utime(household_file, ns=(mtime + 10**9, mtime + 10**9))
+
+    assert get_statistics(statisticsdir) is not stats
+
+def test_shared_statistics_are_read_only():
+    stats = get_statistics('NL')
+    with pytest.raises(TypeError):
+        stats.household['one_person']['job'] = 1.0
+    with pytest.raises(TypeError):
+        stats.end_uses['Shower'].pop('frequency')
+    with pytest.raises(ValueError):
+        stats.end_uses['KitchenTap']['daily_pattern'].values[0] = 1.0
+
+    unpickled = pickle.loads(pickle.dumps(stats))
+    assert unpickled.end_uses['Shower']['frequency'] == stats.end_uses['Shower']['frequency']
+    assert copy.deepcopy(stats.household) == stats.household
+
+def test_load_toml_has_its_own_cache():
+    config_file = os.path.join(DATA_DIR, 'NL', 'household_statistics.toml')
+    config = load_toml(config_file)
+    assert load_toml(config_file) is config
+    with pytest.raises(TypeError):
+        config['one_person'] = {}
+    assert get_statistics('NL') is get_statistics('NL')
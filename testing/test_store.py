@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+from pysimdeum.api import iter_multi_hh
+
+pytest.importorskip('zarr')
+from pysimdeum.tools.store import write_store, open_store, read_subcatchment
+
+
+def test_store_round_trip(tmp_path):
+    household_data = {'hh_1': 'one_person', 'hh_2': 'two_person', 'hh_3': 'family'}
+    groups = {'hh_1': 'a', 'hh_2': 'b', 'hh_3': 'a'}
+    path = str(tmp_path / 'houses.zarr')
+
+    write_store(household_data, path, groups=groups, house_chunk=2, seed=3)
+    expected = dict(iter_multi_hh(household_data, seed=3))
+
+    ds = open_store(path)
+    assert list(ds['house'].values) == ['hh_1', 'hh_2', 'hh_3']
+
+    subcatchment = read_subcatchment(path, 'a')
+    assert list(subcatchment['house'].values) == ['hh_1', 'hh_3']
+    total = subcatchment['consumption'].sel(flowtypes='totalflow').sum('enduse').values
+    assert np.allclose(total, np.stack([expected['hh_1'], expected['hh_3']]))
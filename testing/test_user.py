@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pysimdeum.core.user import _presence_pdf
+
+
+def timeindexer(l, value, a, b):
+    if a == b:
+        return l  # skip assignment if start and end are the same
+    if a < b:
+        l[a:b] = value
+    else:
+        l[a:len(l)] = value
+        l[0:b] = value
+    return l
+
+
+def reference_pdf(up, go, home, sleep, peak=0.65, normal=0.335, away=0.0, night=0.015):
+    # Series-based implementation of `Presence.pdf` before it was vectorised, times in minutes of the day
+    index = pd.timedelta_range(start='00:00:00', end='24:00:00', freq='1Min')
+    pdf = pd.Series(index=index, dtype='object')
+
+    up_p30 = (up + 30) % 1440
+    go_m30 = (go - 30) % 1440
+    home_p30 = (home + 30) % 1440
+    sleep_m30 = (sleep - 30) % 1440
+
+    pdf = timeindexer(pdf, 'normal', up_p30, go_m30)
+    pdf = timeindexer(pdf, 'normal', home_p30, sleep_m30)
+    pdf = timeindexer(pdf, 'peak', up, up_p30)
+    pdf = timeindexer(pdf, 'peak', go_m30, go)
+    pdf = timeindexer(pdf, 'peak', home, home_p30)
+    pdf = timeindexer(pdf, 'peak', sleep_m30, sleep)
+    pdf = timeindexer(pdf, 'night', sleep, up)
+    pdf = timeindexer(pdf, 'away', go, home)
+
+    cnts = pdf.value_counts(normalize=True)
+    cnts = cnts.drop('away', errors='ignore')
+    cnts /= cnts.sum()
+    for period, weight in (('peak', peak), ('normal', normal), ('night', night)):
+        if period in cnts:
+            pdf[pdf == period] = weight / cnts[period]
+    pdf[pdf == 'away'] = 0.0
+
+    pdf = pdf.astype('float').resample('1s').ffill()[:-1]
+    pdf /= np.sum(pdf)  # normalize
+    return pdf
+
+
+@pytest.mark.parametrize('up, go, home, sleep', [
+    (420, 510, 1020, 1380),  # night from 23:00 wraps past midnight to 07:00
+    (420, 510, 1020, 1500 % 1440),  # sleep after midnight
+    (420, 480, 1020, 1380),  # zero-length normal period between up + 30 and go - 30
+    (420, 600, 600, 1380),  # no time away
+    (420, 450, 1020, 1380),  # go = up + 30, the normal period up + 30 to go - 30 wraps around the day
+    (1410, 60, 120, 1300),  # up shortly before midnight
+])
+def test_presence_pdf_matches_series_implementation(up, go, home, sleep):
+    expected = reference_pdf(up, go, home, sleep)
+    pdf = _presence_pdf(up, go, home, sleep, 0.65, 0.335, 0.0, 0.015)
+
+    assert len(pdf) == len(expected) == 24 * 60 * 60
+    np.testing.assert_allclose(pdf, expected.values.astype(float), rtol=1e-12, atol=0, equal_nan=True)
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from pysimdeum.api import built_house
+from pysimdeum.utils.wastewater_quality import (xarray_to_metadata_df, assign_discharge_nutrients, discharge_time_agg,
+                                               hh_discharge_temperature)
+
+
+def test_event_labels_match_event_intervals():
+    house = built_house('family', seed=3, simulate_discharge=True)
+    df, ref_start, _ = xarray_to_metadata_df(house.discharge, 'discharge', 'discharge_events')
+
+    assert (df['flow'] != 0).all()
+    assert len(df) == (house.discharge['discharge'].values != 0).sum()
+
+    for event in house.discharge['discharge_events'].values[:20]:
+        start = ref_start + pd.Timedelta(seconds=pd.Series(event['start']).iloc[0])
+        end = ref_start + pd.Timedelta(seconds=pd.Series(event['end']).iloc[0])
+        label = f"{event['usage'].lower()}_{start.timestamp()}_{end.timestamp()}"
+        rows = df[df['event_label'] == label]
+        assert (rows['enduse'] == event['enduse']).all()
+        assert ((rows['time'] >= start) & (rows['time'] < end)).all()
+
+
+def test_nutrients_constant_per_event():
+    house = built_house('family', seed=3, simulate_discharge=True)
+    df, _, _ = assign_discharge_nutrients(house.discharge, 'NL', rng=np.random.default_rng(0))
+    nutrients = ['n', 'p', 'cod', 'bod5', 'ss', 'amm']
+
+    assert df['event_label'].notna().all()
+    assert (df.groupby('event_label')[nutrients].nunique() == 1).all().all()
+    assert (df[nutrients] >= 0).all().all()
+
+
+def test_hh_discharge_temperature_offsets():
+    house = built_house('family', seed=3, simulate_discharge=True)
+    hourly = hh_discharge_temperature(house.discharge, time_agg='h')
+    two_hourly = hh_discharge_temperature(house.discharge, time_agg='2h')
+
+    assert len(hourly) == 24 and len(two_hourly) == 12
+    assert np.isclose(hourly['flow'].sum(), two_hourly['flow'].sum())
+    assert np.isclose((hourly['flow'] * hourly['discharge_temperature']).sum(),
+                      (two_hourly['flow'] * two_hourly['discharge_temperature']).sum())
+
+
+def test_discharge_time_agg_does_not_change_input():
+    df = pd.DataFrame({'time': pd.date_range('2024-01-01', periods=7200, freq='s'), 'flow': 1.0})
+    bins, time_index = discharge_time_agg(df, '15min')
+
+    assert list(df.columns) == ['time', 'flow']
+    assert len(time_index) == 8
+    assert np.array_equal(np.bincount(bins), np.full(8, 900))
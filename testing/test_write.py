@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pysimdeum.api import built_house
+from pysimdeum.tools.write import summed_patterns, write_patterns
+
+
+def test_write_patterns_chunked(tmp_path):
+    houses = [built_house('two_person', seed=seed) for seed in [1, 2]]
+    dates, values = summed_patterns(houses, 3600)
+
+    assert values.shape == (25, 2)
+    assert np.array_equal(summed_patterns(houses, 3600, chunksize=7)[1], values)
+    for i, house in enumerate(houses):
+        assert np.isclose(values[:, i].sum(), house.consumption.sel(flowtypes='totalflow').sum().item(), rtol=1e-5)
+
+    write_patterns(houses, 3600, str(tmp_path / 'patterns.csv'), chunksize=10)
+    output = pd.read_csv(tmp_path / 'patterns.csv', parse_dates=['date'])
+    assert list(output.columns) == ['date', 'pysimdeum 0', 'pysimdeum 1']
+    assert np.allclose(output.iloc[:, 1:].values, values)
+    assert (output['date'].values == dates).all()
+
+
+def test_summed_patterns_of_coarse_resolution():
+    houses = [built_house('two_person', seed=seed) for seed in [1, 2]]
+    binned = [built_house('two_person', seed=seed, resolution='15min') for seed in [1, 2]]
+
+    # timesteps are seconds, also for houses with a coarser resolution
+    dates, values = summed_patterns(houses, 3600)
+    binned_dates, binned_values = summed_patterns(binned, 3600)
+    assert (binned_dates == dates).all()
+    assert np.allclose(binned_values, values, rtol=1e-5)
+
+    with pytest.raises(ValueError):
+        summed_patterns(binned, 60)
+    with pytest.raises(ValueError):
+        summed_patterns([houses[0], binned[1]], 3600)